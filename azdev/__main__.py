@@ -7,30 +7,68 @@
 import sys
 
 from knack import CLI, CLICommandsLoader
+from knack.events import EVENT_PARSER_GLOBAL_CREATE
 
 from azdev.help import helps  # pylint: disable=unused-import
-from azdev.utilities import get_azdev_config_dir
+from azdev.utilities import get_azdev_config_dir, span, start_tracing, stop_tracing, write_trace
+
+TRACE_OUT_ARG = '--trace-out'
+
+
+def _get_trace_out(args):
+    """ The --trace-out path is needed before the command table is loaded, so before the arguments are parsed. """
+    for index, arg in enumerate(args):
+        if arg == TRACE_OUT_ARG and index + 1 < len(args):
+            return args[index + 1]
+        if arg.startswith(TRACE_OUT_ARG + '='):
+            return arg.split('=', 1)[1]
+    return None
 
 
 class AzDevCli(CLI):
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.register_event(EVENT_PARSER_GLOBAL_CREATE, AzDevCli.on_global_arguments)
+
+    @staticmethod
+    def on_global_arguments(_, **kwargs):
+        arg_group = kwargs.get('arg_group')
+        arg_group.add_argument(TRACE_OUT_ARG, dest='_trace_out', metavar='FILE',
+                               help='Write a trace of the command in Chrome trace event format, '
+                                    'to view in https://ui.perfetto.dev.')
+
     def get_cli_version(self):
         from azdev import __VERSION__
         return __VERSION__
 
+    def invoke(self, args, initial_invocation_data=None, out_file=None):
+        trace_out = _get_trace_out(args)
+        if not trace_out:
+            return super().invoke(args, initial_invocation_data, out_file)
+
+        start_tracing()
+        try:
+            with span('azdev {}'.format(' '.join(args)), 'command'):
+                return super().invoke(args, initial_invocation_data, out_file)
+        finally:
+            write_trace(trace_out, stop_tracing())
+
 
 class AzDevCommandsLoader(CLICommandsLoader):
     def load_command_table(self, args):
         from azdev.commands import load_command_table
 
-        load_command_table(self, args)
-        return super().load_command_table(args)
+        with span('load command table', 'azdev'):
+            load_command_table(self, args)
+            return super().load_command_table(args)
 
     def load_arguments(self, command):
         from azdev.params import load_arguments
 
-        load_arguments(self, command)
-        super().load_arguments(command)
+        with span('load arguments', 'azdev'):
+            load_arguments(self, command)
+            super().load_arguments(command)
 
 
 def main():
@@ -6,7 +6,7 @@
 
 from knack.commands import CommandGroup
 
-from .transformers import performance_benchmark_data_transformer
+from .transformers import performance_benchmark_data_transformer, performance_memory_data_transformer
 
 
 # pylint: disable=too-many-statements
@@ -64,6 +64,18 @@ def load_command_table(self, _):
         g.command('load-times', 'check_load_time')
         g.command('benchmark', 'benchmark', is_preview=True, table_transformer=performance_benchmark_data_transformer)
 
+    with CommandGroup(self, 'perf', operation_group('performance.memory')) as g:
+        g.command('memory', 'check_memory', is_preview=True, table_transformer=performance_memory_data_transformer)
+
+    with CommandGroup(self, 'perf', operation_group('performance.extension_load')) as g:
+        g.command('extension-load', 'check_extension_load', is_preview=True)
+
+    with CommandGroup(self, 'perf', operation_group('performance.history')) as g:
+        g.command('compare', 'compare', is_preview=True)
+
+    with CommandGroup(self, 'perf', operation_group('performance.ab')) as g:
+        g.command('ab', 'benchmark_ab', is_preview=True)
+
     with CommandGroup(self, 'extension', operation_group('extensions')) as g:
         g.command('add', 'add_extension')
         g.command('remove', 'remove_extension')
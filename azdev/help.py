@@ -103,8 +103,14 @@ helps['verify history'] = """
 helps['style'] = """
     short-summary: Check code style (pylint and PEP8).
     examples:
-        - name: Check style for only those modules which have changed based on a git diff.
+        - name: Check style for only those files which have changed based on a git diff.
           text: azdev style --repo azure-cli --tgt upstream/master --src upstream/dev
+
+        - name: Check style of all modules with 8 processes.
+          text: azdev style CLI --jobs 8
+
+        - name: Check style of all files of a module, ignoring the cached results.
+          text: azdev style vm --no-cache
 """
 
 
@@ -150,6 +156,21 @@ helps['test'] = """
 
         - name: Run tests for only those modules which have changed based on a git diff.
           text: azdev test --repo azure-cli --tgt upstream/master --src upstream/dev
+
+        - name: Run tests in parallel with as many workers as fit in the available memory, assuming 1GB per worker.
+          text: azdev test {mod} --worker-memory 1024
+
+        - name: Run tests from workers which have already imported the CLI and the module under test.
+          text: azdev test {mod} --warm-workers
+
+        - name: Run all tests of a module, including those which passed before and whose sources did not change.
+          text: azdev test {mod} --no-result-cache
+
+        - name: Run tests of a module against several profiles concurrently.
+          text: azdev test {mod} --profile latest,2020-09-01-hybrid
+
+        - name: Run tests of a module and re-run the failed ones up to twice.
+          text: azdev test {mod} --retries 2
 """
 
 
@@ -190,12 +211,27 @@ helps['scan'] = r"""
         - name: Scan secrets for raw string and save results to file
           text: |
                 azdev scan --data "my string waiting to be scanned" --save-scan-result True
-        - name: Recursively scan secrets for a directory and save results to specific file
+        - name: Recursively scan secrets for a directory and save results to specific file, as a single JSON document held in memory
           text: |
                 azdev scan --directory-path /path/to/my/folder --recursive --scan-result-path /path/to/scan_result.json
         - name: Scan secrets for all json files and yaml files within a directory
           text: |
                 azdev scan --directory-path /path/to/my/folder --include-pattern *.yaml *.json
+        - name: Recursively scan a directory and report how many files pass the literal prefilter of the patterns
+          text: |
+                azdev scan --directory-path /path/to/my/folder --recursive --prefilter-stats
+        - name: Recursively scan a directory with 4 processes, streaming the results of each file as JSON lines
+          text: |
+                azdev scan --directory-path /path/to/my/folder --recursive --jobs 4 --scan-result-path /path/to/scan_result.ndjson
+        - name: Scan the files changed between two branches, reading them from git, and only their added lines
+          text: |
+                azdev scan --repo /path/to/repo --tgt upstream/dev --src HEAD --added-only
+        - name: Scan the files staged for the next commit, e.g. in a pre-commit hook
+          text: |
+                azdev scan --staged
+        - name: Scan the history of a repo since a tag with 4 processes, streaming the findings as JSON lines
+          text: |
+                azdev scan --git-history /path/to/repo --since v1.0.0 --jobs 4 --scan-result-path /path/to/history.ndjson
 """
 
 helps['mask'] = """
@@ -206,6 +242,10 @@ helps['mask'] = """
                 Redaction type 'SECRET_NAME' redaction type will mask secrets with their secret name (type).
                 Redaction type 'CUSTOM' will mask secrets with 'redaction_token' value you specify through saved scan result file.
                 Check built-in scanning rules at https://github.com/microsoft/security-utilities/blob/main/GeneratedRegexPatterns/PreciselyClassifiedSecurityKeys.json
+    examples:
+        - name: Mask the secrets of a directory from a streamed scan result
+          text: |
+                azdev mask --directory-path /path/to/my/folder --recursive --saved-scan-result-path /path/to/scan_result.ndjson
 """
 
 helps['statistics'] = """
@@ -260,13 +300,80 @@ helps['perf'] = """
 
 helps['perf load-times'] = """
     short-summary: Verify that all modules load within an acceptable timeframe.
+    examples:
+        - name: Show the 30 command modules and packages that take the longest to import for `az -h`, and the azure.mgmt SDKs imported eagerly.
+          text: azdev perf load-times --import-time --top 30
+        - name: Time the loaders of each command module and extension over 5 runs of 1 cold and 3 warm loads, against the budgets of the repo.
+          text: azdev perf load-times --loaders --runs 5 --warm-runs 3 --budgets scripts/ci/load_budgets.yml
 """
 
 helps['perf benchmark'] = """
     short-summary: Display benchmark staticstic of Azure CLI (Extensions) commands via execute it with "python -m azure.cli {COMMAND}" in a separate process.
+    long-summary: |
+        Runs outside of 1.5 interquartile ranges from the quartiles are rejected as outliers before computing the statistics.
+        CI95 is the half-width of the 95% confidence interval of the average.
     examples:
         - name: Run benchmark on "network application-gateway" and "storage account"
           text: azdev perf benchmark "network application-gateway -h" "storage account" "version" "group list"
+        - name: Run benchmark on "version" with 3 warmup runs and 50 measured runs, 4 at a time, within 10 minutes
+          text: azdev perf benchmark "version" --warmup 3 --runs 50 --concurrency 4 --time-budget 600
+        - name: Break the time of "vm create -h" down into the phases of the invocation
+          text: azdev perf benchmark "vm create -h" --phases
+        - name: Profile "vm create -h" and render a flamegraph of its sampled stacks
+          text: |
+            azdev perf benchmark "vm create -h" --profile --profile-dir ./profiles
+            flamegraph.pl ./profiles/vm_create_-h.collapsed > vm_create.svg
+"""
+
+helps['perf memory'] = """
+    short-summary: Display the peak resident memory of Azure CLI (Extensions) commands executed in a separate process.
+    long-summary: |
+        Without commands, the load of the whole command table and every command with --help are measured.
+        The peak memory is recorded in the same history as the benchmarks and can be checked with `azdev perf compare --kind memory`.
+    examples:
+        - name: Measure the peak memory of "vm create -h" and show the 5 modules holding the most memory at the end of the command.
+          text: azdev perf memory "vm create -h" --trace --top 5
+"""
+
+helps['perf extension-load'] = """
+    short-summary: Rank the installed dev extensions by the time and memory they add to every `az` invocation.
+    long-summary: |
+        The commands run in a temporary copy of the Azure CLI configuration whose only extension is the measured dev
+        extension, and once more with no extension at all as the baseline. The first run of each command, which builds
+        the command index, is discarded.
+    examples:
+        - name: Measure the overhead of all installed dev extensions on `az -h` and `az version`.
+          text: azdev perf extension-load
+        - name: Measure the overhead of the containerapp extension on `az group list -h` and `az vm list -h` over 10 runs.
+          text: azdev perf extension-load -e containerapp --commands "group list -h" "vm list -h" --runs 10
+"""
+
+helps['perf compare'] = """
+    short-summary: Detect performance regressions between the samples recorded for two CLI commits or dates.
+    long-summary: |
+        `azdev perf benchmark`, `azdev perf load-times` and `azdev perf memory` record their samples in perf_history.db in the azdev
+        config directory, along with the azure-cli commit, the azdev version and a fingerprint of the machine.
+        Only samples recorded on the current machine are compared. A command regressed if its timings are
+        significantly greater according to a Mann-Whitney U test and its median grew by more than the threshold.
+        The command fails if any command regressed.
+    examples:
+        - name: Compare the benchmark of the latest recorded commit against the one of the dev branch.
+          text: azdev perf compare --base $(git -C ~/azure-cli rev-parse dev)
+        - name: Compare the module load times recorded on two days, failing on a 10% slowdown.
+          text: azdev perf compare --base 2024-01-01 --head 2024-02-01 --kind load-time --threshold 0.1
+"""
+
+helps['perf ab'] = """
+    short-summary: Compare the command timings of two azure-cli git refs, alternating between them in a randomized order.
+    long-summary: |
+        Each ref is checked out in a git worktree of the azure-cli repo with its own virtual environment. They are
+        reused as long as the ref points to the same commit. Every round runs each command once on both sides in a
+        random order, so that the noise of the machine affects them alike. Outliers are rejected, and a command is
+        reported as a regression or improvement if the Mann-Whitney U test is significant and its median changed by
+        more than the threshold.
+    examples:
+        - name: Check the impact of the current branch on `az version` and `az vm create -h`.
+          text: azdev perf ab "version" "vm create -h" --base origin/dev --head HEAD --runs 30
 """
 
 helps['extension'] = """
@@ -12,7 +12,7 @@ import packaging.version
 from knack.log import get_logger
 
 from azdev.operations.statistics import _create_invoker_and_load_cmds  # pylint: disable=protected-access
-from azdev.utilities import require_azure_cli, display, heading, output, calc_selected_mod_names
+from azdev.utilities import require_azure_cli, display, heading, output, calc_selected_mod_names, span
 
 # pylint: disable=no-else-return
 
@@ -47,7 +47,8 @@ def _load_commands():
     # This is because we generate the `deprecate_info` and `upcoming_breaking_change` tags from pre-announcement data
     # during the event.
     # If the arguments are not loaded beforehand, this information will not be included.
-    _create_invoker_and_load_cmds(az_cli, load_arguments=True)
+    with span('load command table', 'breaking_change'):
+        _create_invoker_and_load_cmds(az_cli, load_arguments=True)
 
     stop = time.time()
     logger.info('Commands loaded in %i sec', stop - start)
@@ -12,7 +12,7 @@ import yaml
 from knack.log import get_logger
 from knack.util import CLIError
 from azdev.utilities import (
-    heading, display, get_path_table, require_azure_cli, filter_by_git_diff)
+    heading, display, get_path_table, require_azure_cli, filter_by_git_diff, span)
 from azdev.utilities.path import get_cli_repo_path, get_ext_repo_paths
 from .cmdcov import CmdcovManager
 
@@ -131,8 +131,10 @@ def run_cmdcov(modules=None, git_source=None, git_target=None, git_repo=None, le
     az_cli = get_default_cli()
 
     # load commands, args, and help
-    create_invoker_and_load_cmds_and_args(az_cli)
-    loaded_help = get_all_help(az_cli)
+    with span('load command table', 'cmdcov'):
+        create_invoker_and_load_cmds_and_args(az_cli)
+    with span('load help', 'cmdcov'):
+        loaded_help = get_all_help(az_cli)
 
     stop = time.time()
     logger.info('Commands and help loaded in %i sec', stop - start)
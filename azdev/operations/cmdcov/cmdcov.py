@@ -16,6 +16,7 @@ from knack.log import get_logger
 from tqdm import tqdm
 from azdev.operations.regex import get_all_tested_commands_from_regex
 from azdev.utilities.path import get_azdev_repo_path, get_cli_repo_path, find_files
+from azdev.utilities.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -87,6 +88,7 @@ class CmdcovManager:
             self._render_cli_html(command_test_coverage)
         self._browse(html_file)
 
+    @traced(category='cmdcov')
     def _get_all_commands(self):
         """
         GLOBAL_EXCLUDE_COMMANDS: List[str]
@@ -142,6 +144,7 @@ class CmdcovManager:
                     else:
                         self.all_commands[module].append(f'{y.command}')
 
+    @traced(category='cmdcov')
     def _get_all_tested_commands_from_regex(self):
         """
         get all tested commands from test_*.py
@@ -164,6 +167,7 @@ class CmdcovManager:
                 ref = get_all_tested_commands_from_regex(lines)
                 self.all_tested_commands[self.selected_mod_names[idx]] += ref
 
+    @traced(category='cmdcov')
     def _get_all_tested_commands_from_record(self):
         """
         get all tested commands from recording files
@@ -192,6 +196,7 @@ class CmdcovManager:
                             cmd = command + ' ' + argument
                             self.all_tested_commands[self.selected_mod_names[idx]].append(cmd)
 
+    @traced(category='cmdcov')
     def _run_command_test_coverage(self):
         """
         all_commands: All commands that need to be test
@@ -244,6 +249,7 @@ class CmdcovManager:
         logger.warning(self.command_test_coverage)
         return self.command_test_coverage
 
+    @traced(category='cmdcov')
     def _render_html(self):
         """
         :return: Return a HTML string
@@ -289,6 +295,7 @@ class CmdcovManager:
 
         return index_html
 
+    @traced(category='cmdcov')
     def _render_cli_html(self, command_test_coverage):
         """
         render cli own html string
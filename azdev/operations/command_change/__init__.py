@@ -11,7 +11,7 @@ import time
 from knack.log import get_logger
 import azure_cli_diff_tool
 from azdev.utilities import display, require_azure_cli, heading, get_path_table, filter_by_git_diff, \
-    calc_selected_mod_names
+    calc_selected_mod_names, span
 from .custom import DiffExportFormat, get_commands_meta, STORED_DEPRECATION_KEY
 from .util import export_commands_meta, dump_command_tree, add_to_command_tree
 from ..statistics import _create_invoker_and_load_cmds, _get_command_source, \
@@ -66,7 +66,8 @@ def export_command_meta(modules=None, git_source=None, git_target=None, git_repo
     az_cli = get_default_cli()
 
     # load commands, args, and help
-    _create_invoker_and_load_cmds(az_cli)
+    with span('load command table', 'command_change'):
+        _create_invoker_and_load_cmds(az_cli)
 
     stop = time.time()
     logger.info('Commands loaded in %i sec', stop - start)
@@ -157,7 +158,8 @@ def export_command_tree(modules, output_file=None):
     az_cli = get_default_cli()
 
     # load commands, args, and help
-    _create_invoker_and_load_cmds(az_cli)
+    with span('load command table', 'command_change'):
+        _create_invoker_and_load_cmds(az_cli)
 
     stop = time.time()
     logger.info('Commands loaded in %i sec', stop - start)
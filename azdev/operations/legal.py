@@ -4,13 +4,11 @@
 # license information.
 # -----------------------------------------------------------------------------
 
-import os
-import pathlib
-
 from knack.util import CLIError
 
 from azdev.utilities import (
-    display, heading, subheading, get_cli_repo_path, get_ext_repo_paths)
+    display, heading, subheading, get_cli_repo_path, get_ext_repo_paths, walk_files)
+from azdev.utilities.path import VCS_DIRS
 
 
 LICENSE_HEADER = """# Copyright (c) Microsoft Corporation. All rights reserved.
@@ -36,31 +34,24 @@ def check_license_headers():
         all_paths.append(path)
 
     files_without_header = []
-    for path in all_paths:
-        py_files = pathlib.Path(path).glob('**' + os.path.sep + '*.py')
+    py_files = walk_files(all_paths, patterns='*.py', ignore_dirs=VCS_DIRS + tuple(_IGNORE_SUBDIRS),
+                          use_gitignore=True, skip_virtual_envs=True)
+    for py_file in py_files:
+        if py_file.endswith('azure_cli_bdist_wheel.py'):
+            continue
 
-        for py_file in py_files:
-            py_file = str(py_file)
+        with open(py_file, 'r', encoding='utf-8') as f:
+            file_text = f.read()
 
-            if py_file.endswith('azure_cli_bdist_wheel.py'):
+            if not file_text:
                 continue
 
-            for ignore_token in _IGNORE_SUBDIRS:
-                if ignore_token in py_file:
-                    break
-            else:
-                with open(str(py_file), 'r', encoding='utf-8') as f:
-                    file_text = f.read()
-
-                    if not file_text:
-                        continue
-
-                    test_results = [
-                        LICENSE_HEADER in file_text,
-                        WRAPPED_LICENSE_HEADER in file_text
-                    ]
-                    if not any(test_results):
-                        files_without_header.append(py_file)
+            test_results = [
+                LICENSE_HEADER in file_text,
+                WRAPPED_LICENSE_HEADER in file_text
+            ]
+            if not any(test_results):
+                files_without_header.append(py_file)
 
     subheading('Results')
     if files_without_header:
@@ -14,7 +14,7 @@ from knack.log import get_logger
 from knack.util import CLIError
 
 from azdev.utilities import (
-    heading, subheading, display, get_path_table, require_azure_cli, filter_by_git_diff)
+    heading, subheading, display, get_path_table, require_azure_cli, filter_by_git_diff, span)
 from azdev.utilities.path import get_cli_repo_path, get_ext_repo_paths
 from azdev.operations.style import run_pylint
 
@@ -117,8 +117,10 @@ def run_linter(modules=None, rule_types=None, rules=None, ci_exclusions=None,
     az_cli = get_default_cli()
 
     # load commands, args, and help
-    create_invoker_and_load_cmds_and_args(az_cli)
-    loaded_help = get_all_help(az_cli)
+    with span('load command table', 'linter'):
+        create_invoker_and_load_cmds_and_args(az_cli)
+    with span('load help', 'linter'):
+        loaded_help = get_all_help(az_cli)
 
     stop = time.time()
     logger.info('Commands and help loaded in %i sec', stop - start)
@@ -182,7 +184,8 @@ def pylint_rules(selected_modules):
     checkers = [os.path.splitext(f)[0] for f in os.listdir(checker_path) if
                 os.path.isfile(os.path.join(checker_path, f)) and f != '__init__.py']
     enable = [s.replace('_', '-') for s in checkers]
-    pylint_result = run_pylint(selected_modules, env=my_env, checkers=checkers, disable_all=True, enable=enable)
+    with span('custom pylint rules', 'linter'):
+        pylint_result = run_pylint(selected_modules, env=my_env, checkers=checkers, disable_all=True, enable=enable)
     if pylint_result and not pylint_result.error:
         display(os.linesep + 'No violations found for custom pylint rules.')
         display('Linter: PASSED\n')
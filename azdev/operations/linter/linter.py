@@ -23,7 +23,7 @@ from azdev.operations.regex import (
     search_command,
     search_deleted_command,
     search_command_group)
-from azdev.utilities import diff_branches_detail, diff_branch_file_patch
+from azdev.utilities import diff_branches_detail, diff_branch_file_patch, span
 from azdev.utilities.path import get_cli_repo_path, get_ext_repo_paths
 from .util import (share_element, exclude_commands, LinterError, get_cmd_example_configurations,
                    get_cmd_example_threshold)
@@ -609,7 +609,8 @@ class LinterManager:
                 # if the rule's severity is lower than the linter's severity skip it.
                 if self._linter_severity_is_applicable(rule_severity, rule_name):
                     # print('enter violations', rule_func)
-                    violations = sorted(rule_func()) or []
+                    with span(rule_name, 'linter.rule'):
+                        violations = sorted(rule_func()) or []
                     # print('enter to find')
                     if violations:
                         if rule_severity == LinterSeverity.HIGH:
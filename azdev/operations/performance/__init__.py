@@ -0,0 +1,364 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import re
+import timeit
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import (
+    display, heading, subheading, cmd, py_cmd, require_azure_cli)
+
+logger = get_logger(__name__)
+
+TOTAL = 'ALL'
+TOTAL_THRESHOLD = 300
+DEFAULT_THRESHOLD = 10
+THRESHOLDS = {
+    # threshold value: num of exceptions allowed
+    50: 2,
+    40: 3
+}
+
+
+# pylint: disable=too-many-statements,too-many-locals
+def check_load_time(runs=3, import_time=False, top=20, loaders=False, warm_runs=2, budgets=None):
+
+    require_azure_cli()
+
+    heading('Module Load Performance')
+
+    if import_time:
+        from .import_time import check_import_time
+        check_import_time(runs, top)
+        return
+
+    if loaders:
+        from .loaders import check_loader_time
+        check_loader_time(runs, warm_runs, budgets)
+        return
+
+    regex = r"[^']*'(?P<mod>[^']*)'[\D]*(?P<val>[\d\.]*)"
+
+    results = {TOTAL: []}
+    # Time the module loading X times
+    for i in range(0, runs + 1):
+        lines = cmd('az -h --debug', show_stderr=True).result
+        if i == 0:
+            # Ignore the first run since it can be longer due to *.pyc file compilation
+            continue
+
+        try:
+            lines = lines.decode().splitlines()
+        except AttributeError:
+            lines = lines.splitlines()
+        total_time = 0
+        for line in lines:
+            if line.startswith('DEBUG: Loaded module'):
+                matches = re.match(regex, line)
+                mod = matches.group('mod')
+                val = float(matches.group('val')) * 1000
+                total_time = total_time + val
+                if mod in results:
+                    results[mod].append(val)
+                else:
+                    results[mod] = [val]
+        results[TOTAL].append(total_time)
+
+    from .history import record_samples
+    record_samples('load-time', results)
+
+    passed_mods = {}
+    failed_mods = {}
+    # exceptions claimed by this check only
+    thresholds = dict(THRESHOLDS)
+
+    def _claim_higher_threshold(val):
+        avail_thresholds = {k: v for k, v in thresholds.items() if v}
+        new_threshold = None
+        for threshold in sorted(avail_thresholds):
+            if val < threshold:
+                thresholds[threshold] = thresholds[threshold] - 1
+                new_threshold = threshold
+            break
+        return new_threshold
+
+    mods = sorted(results.keys())
+    for mod in mods:
+        val = results[mod]
+        mean_val = mean(val)
+        stdev_val = pstdev(val)
+        threshold = TOTAL_THRESHOLD if mod == TOTAL else DEFAULT_THRESHOLD
+        statistics = {
+            'average': mean_val,
+            'stdev': stdev_val,
+            'threshold': threshold,
+            'values': val
+        }
+        if mean_val > threshold:
+            # claim a threshold exception if available
+            new_threshold = _claim_higher_threshold(mean_val)
+            if new_threshold:
+                statistics['threshold'] = new_threshold
+                passed_mods[mod] = statistics
+            else:
+                failed_mods[mod] = statistics
+        else:
+            passed_mods[mod] = statistics
+
+    subheading('Results')
+    if failed_mods:
+        display('== PASSED MODULES ==')
+        display_table(passed_mods)
+        display('\nFAILED MODULES')
+        display_table(failed_mods)
+        raise CLIError("""
+FAILED: Some modules failed. If values are close to the threshold, rerun. If values
+are large, check that you do not have top-level imports like azure.mgmt or msrestazure
+in any modified files.
+""")
+
+    display("== PASSED MODULES ==")
+    display_table(passed_mods)
+    display(
+        "\nPASSED: Average load time all modules: {} ms".format(
+            int(passed_mods[TOTAL]["average"])
+        )
+    )
+
+
+def mean(data):
+    """Return the sample arithmetic mean of data."""
+    n = len(data)
+    if n < 1:
+        raise ValueError("len < 1")
+    return sum(data) / float(n)
+
+
+def sq_deviation(data):
+    """Return sum of square deviations of sequence data."""
+    c = mean(data)
+    return sum((x - c) ** 2 for x in data)
+
+
+def pstdev(data):
+    """Calculates the population standard deviation."""
+    n = len(data)
+    if n < 2:
+        raise ValueError('len < 2')
+    ss = sq_deviation(data)
+    return (ss / n) ** 0.5
+
+
+def display_table(data):
+    display('{:<20} {:>12} {:>12} {:>12} {:>25}'.format('Module', 'Average', 'Threshold', 'Stdev', 'Values'))
+    for key, val in data.items():
+        display('{:<20} {:>12.0f} {:>12.0f} {:>12.0f} {:>25}'.format(
+            key, val['average'], val['threshold'], val['stdev'], str(val['values'])))
+
+
+# require azdev setup
+# pylint: disable=too-many-locals
+def benchmark(commands=None, runs=20, concurrency=1, warmup=1, time_budget=3600, phases=False, profile=False,
+              profile_dir=None):
+    if runs <= 0:
+        raise CLIError("Number of runs must be greater than 0.")
+    if concurrency <= 0:
+        raise CLIError("Concurrency must be greater than 0.")
+
+    if not commands:
+        commands = _benchmark_load_all_commands()
+
+    if profile:
+        import os
+        from azdev.utilities import get_azdev_config_dir
+        profile_dir = os.path.abspath(profile_dir or os.path.join(get_azdev_config_dir(), 'perf_profiles'))
+        os.makedirs(profile_dir, exist_ok=True)
+
+    result = []
+    samples = {}
+
+    timer = _benchmark_cmd_timer
+    if phases:
+        from .phases import _benchmark_phase_timer as timer
+
+    import multiprocessing
+
+    # Runs executed at the same time compete for CPU and disk, so they are sequential unless asked otherwise.
+    # The pool is shared by all commands to avoid paying its startup for each of them.
+    # pylint: disable=consider-using-with
+    pool = multiprocessing.Pool(concurrency, _benchmark_process_pool_init)
+    deadline = timeit.default_timer() + time_budget if time_budget else None
+
+    # try/except like this because of a bug of Python multiprocessing.Pool (https://bugs.python.org/issue8296)
+    # Discussion on StackOverflow:
+    # https://stackoverflow.com/questions/1408356/keyboard-interrupts-with-pythons-multiprocessing-pool/1408476
+    try:
+        # Measure every wanted commands
+        for raw_command in commands:
+            logger.info("Measuring %s...", raw_command)
+
+            if warmup > 0:
+                # warm up the file system cache and *.pyc files, the timings are discarded
+                pool.map_async(timer, [raw_command] * warmup).get(_remaining_time(deadline))
+            time_series = pool.map_async(timer, [raw_command] * runs).get(_remaining_time(deadline))
+            phase_series = None
+            if phases:
+                from .phases import TOTAL_PHASE
+                phase_series = time_series
+                time_series = [p[TOTAL_PHASE] for p in phase_series]
+            samples[raw_command] = list(time_series)
+
+            time_series, outliers = _benchmark_reject_outliers(time_series)
+            staticstic = _benchmark_cmd_staticstic(time_series)
+            staticstic.update({
+                "Command": raw_command,
+                "Runs": runs,
+                "Outliers": outliers,
+            })
+            if phase_series:
+                from .phases import summarize_phases
+                staticstic["Phases"] = summarize_phases(phase_series)
+            if profile:
+                # an extra run, since the profilers slow the command down
+                from .profiling import profile_command
+                staticstic["Profile"] = profile_command(raw_command, profile_dir)
+
+            logger.info(staticstic)
+
+            result.append(staticstic)
+    except multiprocessing.TimeoutError:
+        logger.warning("Time budget of %s seconds exhausted, %s command(s) were not measured.",
+                       time_budget, len(commands) - len(result))
+        pool.terminate()
+    else:
+        pool.close()
+    pool.join()
+
+    from .history import record_samples
+    record_samples('benchmark', samples)
+
+    if profile:
+        from .profiling import display_profiles
+        display_profiles(result)
+
+    return result
+
+
+def _remaining_time(deadline):
+    if deadline is None:
+        return None
+    return max(0, deadline - timeit.default_timer())
+
+
+def _benchmark_load_all_commands():
+    try:
+        from azure.cli.core import get_default_cli
+        from azure.cli.core.file_util import create_invoker_and_load_cmds_and_args
+    except ImportError:
+        raise CLIError("Azure CLI is not installed")
+
+    az_cli = get_default_cli()
+
+    create_invoker_and_load_cmds_and_args(az_cli)
+
+    commands = list(az_cli.invocation.commands_loader.command_table.keys())
+
+    commands = [cmd + " --help" for cmd in commands]
+
+    return sorted(commands)
+
+
+def _benchmark_process_pool_init():
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _benchmark_cmd_timer(raw_command):
+    s = timeit.default_timer()
+    py_cmd("azure.cli {}".format(raw_command), is_module=True)
+    e = timeit.default_timer()
+    return round(e - s, 4)
+
+
+def _benchmark_reject_outliers(time_series: list):
+    """ Drop the runs outside of the Tukey fences (1.5 IQR beyond the quartiles).
+
+    :returns: (kept time series, number of rejected runs)
+    """
+    if len(time_series) < 4:
+        return time_series, 0
+
+    ordered = sorted(time_series)
+    q1 = _benchmark_percentile(ordered, 25)
+    q3 = _benchmark_percentile(ordered, 75)
+    low = q1 - 1.5 * (q3 - q1)
+    high = q3 + 1.5 * (q3 - q1)
+    kept = [t for t in ordered if low <= t <= high]
+    return kept, len(ordered) - len(kept)
+
+
+def _benchmark_percentile(sorted_series: list, percent):
+    """ Percentile with linear interpolation between the closest ranks. """
+    rank = (len(sorted_series) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_series) - 1)
+    return sorted_series[lower] + (sorted_series[upper] - sorted_series[lower]) * (rank - lower)
+
+
+# two-sided 95% critical values of Student's t distribution by degrees of freedom
+_T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def _benchmark_t_critical(degrees_of_freedom):
+    if degrees_of_freedom <= 0:
+        return float('nan')
+    if degrees_of_freedom <= len(_T_95):
+        return _T_95[degrees_of_freedom - 1]
+    return 1.96
+
+
+def _benchmark_cmd_staticstic(time_series: list):
+    from math import sqrt
+
+    time_series.sort()
+
+    size = len(time_series)
+
+    if size % 2 == 0:
+        mid_time = (time_series[size // 2 - 1] + time_series[size // 2]) / 2
+    else:
+        mid_time = time_series[(size - 1) // 2]
+
+    min_time = time_series[0]
+    max_time = time_series[-1]
+    avg_time = sum(time_series) / size
+
+    std_deviation = sqrt(
+        sum((t - avg_time) * (t - avg_time) for t in time_series) / size
+    )
+
+    # half-width of the 95% confidence interval of the mean, from the sample standard deviation
+    if size > 1:
+        sample_std = sqrt(sum((t - avg_time) * (t - avg_time) for t in time_series) / (size - 1))
+        ci = _benchmark_t_critical(size - 1) * sample_std / sqrt(size)
+    else:
+        ci = 0.0
+
+    return {
+        "Min": round(min_time, 4),
+        "Max": round(max_time, 4),
+        "Media": round(mid_time, 4),
+        "Avg": round(avg_time, 4),
+        "Std": round(std_deviation, 4),
+        "P50": round(_benchmark_percentile(time_series, 50), 4),
+        "P90": round(_benchmark_percentile(time_series, 90), 4),
+        "P99": round(_benchmark_percentile(time_series, 99), 4),
+        "CI95": round(ci, 4),
+    }
@@ -0,0 +1,140 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Interleaved A/B benchmark of two azure-cli git refs, each in its own worktree and virtual environment."""
+
+import os
+import platform
+import random
+import sys
+from contextlib import contextmanager
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import (
+    display, heading, subheading, cmd, get_azdev_config_dir, get_cli_repo_path, ENV_VAR_VIRTUAL_ENV)
+
+logger = get_logger(__name__)
+
+BASE = 'base'
+HEAD = 'head'
+READY_MARKER = '.azdev_ab_ready'
+
+
+def _git(repo, args):
+    result = cmd('git -C {} {}'.format(repo, args), show_stderr=True)
+    if result.exit_code != 0:
+        raise CLIError('`git {}` failed:\n{}'.format(args, result.result))
+    return result.result
+
+
+def _env_python(env_path):
+    return os.path.join(env_path, 'Scripts' if sys.platform == 'win32' else 'bin', 'python')
+
+
+def _prepare_ref(repo, ref, workspace):
+    """ Check out the ref in a worktree with its own virtual environment, reusing the ones from a previous run.
+
+    :returns: (commit, path of the virtual environment)
+    """
+    commit = _git(repo, 'rev-parse --verify {}^{{commit}}'.format(ref)).strip()
+    worktree = os.path.join(workspace, commit[:12])
+    env_path = os.path.join(worktree, '.azdev_env')
+    marker = os.path.join(worktree, READY_MARKER)
+    if os.path.isfile(marker):
+        display('Reusing the worktree of {} ({}) at {}'.format(ref, commit[:12], worktree))
+        return commit, env_path
+
+    subheading('Preparing {} ({})'.format(ref, commit[:12]))
+    if not os.path.isdir(worktree):
+        _git(repo, 'worktree add --detach {} {}'.format(worktree, commit))
+
+    python = _env_python(env_path)
+    if not os.path.isfile(python):
+        cmd('{} -m venv {}'.format(sys.executable, env_path), 'Creating the virtual environment...', raise_error=True)
+
+    # same installation as `azdev setup` of an azure-cli repo, without the test SDK
+    cli_src = os.path.join(worktree, 'src')
+    pip = '{} -m pip install '.format(python)
+    cmd(pip + '--upgrade pip', 'Upgrading pip...', raise_error=True)
+    cmd(pip + '-r {}'.format(os.path.join(worktree, 'requirements.txt')), 'Installing `requirements.txt`...',
+        raise_error=True)
+    for package in ['azure-cli-telemetry', 'azure-cli-core', 'azure-cli']:
+        cmd(pip + '-e {} --no-deps'.format(os.path.join(cli_src, package)), 'Installing `{}`...'.format(package),
+            raise_error=True)
+    req_file = 'requirements.py3.{}.txt'.format(platform.system())
+    cmd(pip + '-r {}'.format(os.path.join(cli_src, 'azure-cli', req_file)), 'Installing `{}`...'.format(req_file),
+        raise_error=True)
+
+    with open(marker, 'w') as f:
+        f.write(commit)
+    return commit, env_path
+
+
+@contextmanager
+def _use_env(env_path):
+    """ Make `py_cmd` run the python of the given virtual environment. """
+    saved = {name: os.environ.get(name) for name in ENV_VAR_VIRTUAL_ENV}
+    for name in ENV_VAR_VIRTUAL_ENV:
+        os.environ.pop(name, None)
+    os.environ[ENV_VAR_VIRTUAL_ENV[0]] = env_path
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _interleave(commands, runs, rng):
+    """ The (command, side) schedule: every round times each command on both sides in a random order, so that
+    drifts of the machine load affect base and head alike. """
+    schedule = []
+    for _ in range(runs):
+        for command in commands:
+            sides = [BASE, HEAD]
+            rng.shuffle(sides)
+            schedule.extend((command, side) for side in sides)
+    return schedule
+
+
+# pylint: disable=too-many-locals
+def benchmark_ab(commands, base, head, runs=20, warmup=1, workspace=None, threshold=0.05, alpha=0.05, seed=None):
+    from . import _benchmark_cmd_timer, _benchmark_reject_outliers
+    from .history import compare_samples
+
+    if not commands:
+        raise CLIError('usage error: specify at least one command to benchmark.')
+    if runs <= 1:
+        raise CLIError('Number of runs must be greater than 1.')
+
+    repo = get_cli_repo_path()
+    workspace = os.path.abspath(workspace or os.path.join(get_azdev_config_dir(), 'perf_ab'))
+    os.makedirs(workspace, exist_ok=True)
+
+    heading('A/B Benchmark: {} vs {}'.format(base, head))
+    envs = {}
+    for side, ref in [(BASE, base), (HEAD, head)]:
+        _, envs[side] = _prepare_ref(repo, ref, workspace)
+
+    rng = random.Random(seed)
+    samples = {BASE: {}, HEAD: {}}
+    schedule = _interleave(commands, warmup, rng) + _interleave(commands, runs, rng)
+    subheading('Measuring {} command(s), {} run(s) each'.format(len(commands), runs))
+    for index, (command, side) in enumerate(schedule):
+        with _use_env(envs[side]):
+            elapsed = _benchmark_cmd_timer(command)
+        # the warmup rounds fill the file system cache and compile the *.pyc files, their timings are discarded
+        if index >= 2 * warmup * len(commands):
+            samples[side].setdefault(command, []).append(elapsed)
+        logger.info('%s (%s): %ss', command, side, elapsed)
+
+    for side in samples:
+        samples[side] = {command: _benchmark_reject_outliers(series)[0] for command, series in samples[side].items()}
+    return compare_samples(samples[BASE], samples[HEAD], threshold, alpha)
@@ -0,0 +1,129 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Measure the startup overhead each dev extension adds to every `az` invocation."""
+
+import configparser
+import os
+import shutil
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import display, heading, subheading, copy_azure_config_dir, require_azure_cli, IS_WINDOWS
+
+logger = get_logger(__name__)
+
+DEFAULT_COMMANDS = ['-h', 'version']
+
+
+def _create_extension_config_dir(ext_path=None):
+    """ Copy the Azure CLI configuration files into a temporary directory whose only dev extension is `ext_path`. """
+    config_dir = copy_azure_config_dir('azdev_ext_load_')
+
+    dev_sources = os.path.join(config_dir, 'dev_sources')
+    os.makedirs(dev_sources)
+    if ext_path:
+        os.symlink(ext_path, os.path.join(dev_sources, os.path.basename(ext_path)))
+
+    config_path = os.path.join(config_dir, 'config')
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    if not config.has_section('extension'):
+        config.add_section('extension')
+    config.set('extension', 'dev_sources', dev_sources)
+    with open(config_path, 'w') as f:
+        config.write(f)
+    return config_dir
+
+
+@contextmanager
+def isolated_extensions(ext_path=None):
+    """ Run `az` with no extension but the dev extension at `ext_path`, if any. """
+    config_dir = _create_extension_config_dir(ext_path)
+    saved = {name: os.environ.get(name) for name in ('AZURE_CONFIG_DIR', 'AZURE_EXTENSION_DIR')}
+    os.environ['AZURE_CONFIG_DIR'] = config_dir
+    os.environ['AZURE_EXTENSION_DIR'] = os.path.join(config_dir, 'cliextensions')
+    try:
+        yield config_dir
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def _measure(commands, runs):
+    """ The median wall time (s) of each command and the median peak memory (MB) of the first one. """
+    from . import _benchmark_cmd_timer, _benchmark_percentile
+    from .memory import _peak_rss
+
+    result = OrderedDict()
+    for raw_command in commands:
+        # the first run builds the command index of the isolated configuration
+        _benchmark_cmd_timer(raw_command)
+        result[raw_command] = _benchmark_percentile(sorted(_benchmark_cmd_timer(raw_command) for _ in range(runs)), 50)
+    memory = _benchmark_percentile(sorted(_peak_rss(commands[0]) for _ in range(runs)), 50)
+    return result, memory
+
+
+def rank_extensions(baseline, measurements):
+    """ The time and memory each extension adds to the baseline, the most expensive extension first.
+
+    :param baseline: (times, memory) without any extension.
+    :param measurements: Dict of extension name to its (times, memory).
+    """
+    base_times, base_memory = baseline
+    result = []
+    for name, (times, memory) in measurements.items():
+        item = OrderedDict([('Extension', name)])
+        for raw_command, elapsed in times.items():
+            item['Added `{}` (s)'.format(raw_command)] = round(elapsed - base_times[raw_command], 4)
+        item['Added memory (MB)'] = round(memory - base_memory, 2)
+        result.append(item)
+    first_key = 'Added `{}` (s)'.format(next(iter(base_times)))
+    return sorted(result, key=lambda item: (item[first_key], item['Added memory (MB)']), reverse=True)
+
+
+def check_extension_load(extensions=None, commands=None, runs=5):
+    from azdev.operations.extensions import list_extensions
+
+    require_azure_cli()
+    if IS_WINDOWS:
+        raise CLIError('`azdev perf extension-load` relies on the resource usage of child processes, which is not '
+                       'available on Windows.')
+    if runs <= 0:
+        raise CLIError('Number of runs must be greater than 0.')
+    commands = commands or DEFAULT_COMMANDS
+
+    installed = [ext for ext in list_extensions() if ext['install']]
+    if extensions:
+        unknown = set(extensions) - {ext['name'] for ext in installed}
+        if unknown:
+            raise CLIError('extension(s) not installed: {}'.format(' '.join(sorted(unknown))))
+        installed = [ext for ext in installed if ext['name'] in extensions]
+    if not installed:
+        raise CLIError('No dev extension is installed. Use `azdev extension add` first.')
+
+    heading('Extension Load Overhead')
+    subheading('Baseline without extensions')
+    with isolated_extensions():
+        baseline = _measure(commands, runs)
+    for raw_command, elapsed in baseline[0].items():
+        display('`az {}`: {:.4f} s'.format(raw_command, elapsed))
+    display('Peak memory of `az {}`: {:.2f} MB'.format(commands[0], baseline[1]))
+
+    measurements = OrderedDict()
+    for ext in installed:
+        logger.warning('Measuring %s...', ext['name'])
+        with isolated_extensions(ext['path']):
+            measurements[ext['name']] = _measure(commands, runs)
+
+    return rank_extensions(baseline, measurements)
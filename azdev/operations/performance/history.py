@@ -0,0 +1,218 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Local SQLite store of the performance samples and detection of regressions between two sets of runs."""
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import re
+import sqlite3
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import get_azdev_config_dir, get_cli_repo_path
+
+logger = get_logger(__name__)
+
+HISTORY_DB_NAME = 'perf_history.db'
+KINDS = ['benchmark', 'load-time', 'memory']
+DATE_REGEX = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    cli_commit TEXT NOT NULL,
+    azdev_version TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    command TEXT NOT NULL,
+    samples TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_lookup ON samples (machine, kind, cli_commit, timestamp);
+"""
+
+
+def get_history_db_path():
+    return os.path.join(get_azdev_config_dir(), HISTORY_DB_NAME)
+
+
+def _connect(db_path=None):
+    db_path = db_path or get_history_db_path()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def get_machine_fingerprint():
+    """ Identify the machine the samples were taken on, since timings are only comparable on the same hardware. """
+    parts = [platform.node(), platform.system(), platform.machine(), platform.processor(),
+             str(os.cpu_count()), platform.python_implementation(), platform.python_version()]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def get_cli_commit():
+    """ The HEAD commit of the azure-cli repo under test, or 'unknown' if it cannot be determined. """
+    try:
+        from git import Repo
+        return Repo(get_cli_repo_path()).head.commit.hexsha
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.debug('Unable to determine the azure-cli commit: %s', ex)
+        return 'unknown'
+
+
+def record_samples(kind, samples, db_path=None):
+    """ Append the samples of a run to the history.
+
+    :param kind: One of KINDS.
+    :param samples: Dict of command (or module) to its list of timings.
+    """
+    from azdev import __VERSION__
+    timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+    rows = [(timestamp, get_cli_commit(), __VERSION__, get_machine_fingerprint(), kind, command, json.dumps(values))
+            for command, values in samples.items() if values]
+    try:
+        conn = _connect(db_path)
+        with conn:
+            conn.executemany('INSERT INTO samples (timestamp, cli_commit, azdev_version, machine, kind, command, '
+                             'samples) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.close()
+    except sqlite3.Error as ex:
+        logger.warning('Unable to record the samples in the performance history: %s', ex)
+        return
+    logger.info('Recorded %s %s sample set(s) in %s', len(rows), kind, db_path or get_history_db_path())
+
+
+def load_samples(kind, ref, machine=None, db_path=None):
+    """ Gather the samples recorded for a commit or a date.
+
+    :param ref: A YYYY-MM-DD date, or a (prefix of a) CLI commit.
+    :returns: Dict of command to the list of all its timings.
+    """
+    machine = machine or get_machine_fingerprint()
+    query = 'SELECT command, samples FROM samples WHERE machine = ? AND kind = ? AND '
+    if DATE_REGEX.match(ref):
+        query += 'substr(timestamp, 1, 10) = ?'
+    else:
+        query += 'cli_commit LIKE ?'
+        ref = ref + '%'
+    conn = _connect(db_path)
+    result = {}
+    for command, values in conn.execute(query, (machine, kind, ref)):
+        result.setdefault(command, []).extend(json.loads(values))
+    conn.close()
+    return result
+
+
+def get_latest_commit(kind, machine=None, db_path=None):
+    conn = _connect(db_path)
+    row = conn.execute('SELECT cli_commit FROM samples WHERE machine = ? AND kind = ? ORDER BY id DESC LIMIT 1',
+                       (machine or get_machine_fingerprint(), kind)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def mann_whitney_u(base, head):
+    """ Two-sided Mann-Whitney U test with the normal approximation and tie correction.
+
+    :returns: (U statistic of head, p-value)
+    """
+    n1, n2 = len(base), len(head)
+    values = sorted([(v, 0) for v in base] + [(v, 1) for v in head])
+
+    # average the ranks of tied values
+    ranks = [0.0] * len(values)
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, values) if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    # continuity correction
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def _median(values):
+    ordered = sorted(values)
+    size = len(ordered)
+    if size % 2 == 0:
+        return (ordered[size // 2 - 1] + ordered[size // 2]) / 2
+    return ordered[size // 2]
+
+
+def compare_samples(base, head, threshold=0.05, alpha=0.05):
+    """ Compare the timings of the commands measured in both sets.
+
+    A command regressed if its head timings are stochastically greater than its base ones (Mann-Whitney U test at the
+    `alpha` level) and its median grew by more than `threshold` (relative).
+    """
+    result = []
+    for command in sorted(set(base) & set(head)):
+        base_median, head_median = _median(base[command]), _median(head[command])
+        _, p_value = mann_whitney_u(base[command], head[command])
+        change = (head_median - base_median) / base_median if base_median else 0.0
+        significant = p_value < alpha and abs(change) > threshold
+        if significant and change > 0:
+            status = 'regression'
+        elif significant:
+            status = 'improvement'
+        else:
+            status = 'unchanged'
+        result.append({
+            'Command': command,
+            'Base': round(base_median, 4),
+            'Head': round(head_median, 4),
+            'Change': round(change, 4),
+            'P': round(p_value, 4),
+            'Status': status,
+        })
+    return result
+
+
+def compare(base, head=None, kind='benchmark', threshold=0.05, alpha=0.05):
+    from azdev.utilities import display, heading
+
+    if kind not in KINDS:
+        raise CLIError('usage error: --kind must be one of: {}'.format(', '.join(KINDS)))
+    head = head or get_latest_commit(kind)
+    if not head:
+        raise CLIError('No {} samples are recorded for this machine.'.format(kind))
+
+    base_samples = load_samples(kind, base)
+    head_samples = load_samples(kind, head)
+    for ref, samples in [(base, base_samples), (head, head_samples)]:
+        if not samples:
+            raise CLIError('No {} samples are recorded for {} on this machine.'.format(kind, ref))
+
+    heading('Performance Comparison: {} -> {}'.format(base, head))
+    result = compare_samples(base_samples, head_samples, threshold, alpha)
+    display('{:<60} {:>10} {:>10} {:>9} {:>8}  {}'.format('Command', 'Base', 'Head', 'Change', 'P', 'Status'))
+    for item in result:
+        display('{:<60} {:>10.4f} {:>10.4f} {:>8.1f}% {:>8.4f}  {}'.format(
+            item['Command'], item['Base'], item['Head'], item['Change'] * 100, item['P'], item['Status']))
+
+    regressions = [item['Command'] for item in result if item['Status'] == 'regression']
+    if regressions:
+        raise CLIError('{} command(s) regressed: {}'.format(len(regressions), ', '.join(regressions)))
+    display('\nNo significant regression.')
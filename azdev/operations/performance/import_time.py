@@ -0,0 +1,148 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Profile the full import tree of `az -h` with `python -X importtime`."""
+
+import re
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import display, subheading, py_cmd
+
+logger = get_logger(__name__)
+
+# import time:       580 |        815 |     json.scanner
+IMPORT_TIME_REGEX = re.compile(
+    r'^import time:\s*(?P<self>\d+)\s*\|\s*(?P<cumulative>\d+)\s*\| (?P<indent> *)(?P<name>\S+)\s*$')
+
+COMMAND_MODULE_PREFIX = 'azure.cli.command_modules.'
+MGMT_SDK_PREFIX = 'azure.mgmt.'
+
+
+class ImportNode:
+
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.parent = None
+        self.children = []
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def parse_import_time(lines):
+    """ Build the import tree from the output of `python -X importtime`.
+
+    A module is reported once all of its own imports are, so children come before their parent.
+
+    :returns: List of the top-level ImportNode.
+    """
+    pending = {}  # depth -> nodes whose parent has not been reported yet
+    for line in lines:
+        match = IMPORT_TIME_REGEX.match(line)
+        if not match:
+            continue
+        depth = len(match.group('indent')) // 2
+        node = ImportNode(match.group('name'), int(match.group('self')), int(match.group('cumulative')))
+        node.children = pending.pop(depth + 1, [])
+        for child in node.children:
+            child.parent = node
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def get_import_group(name):
+    """ Group a module by the command module, extension or package that owns it. """
+    parts = name.split('.')
+    if name.startswith(COMMAND_MODULE_PREFIX):
+        return '.'.join(parts[:4])
+    if name.startswith(MGMT_SDK_PREFIX) or name.startswith('azure.cli.'):
+        return '.'.join(parts[:3])
+    if name.startswith('azure.'):
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+def summarize_import_time(roots):
+    """ Attribute the self and cumulative time of the import tree to each import group.
+
+    The cumulative time of a group only counts the modules imported from outside of the group, so that nested
+    imports within a package are not counted twice.
+
+    :returns: (groups, eager_mgmt_imports) where groups maps a group to its 'self' and 'cumulative' time in ms and
+        eager_mgmt_imports maps each azure.mgmt group to the command modules or extensions importing it.
+    """
+    groups = {}
+    eager_mgmt_imports = {}
+    for root in roots:
+        for node in root.walk():
+            group = get_import_group(node.name)
+            stats = groups.setdefault(group, {'self': 0.0, 'cumulative': 0.0})
+            stats['self'] += node.self_us / 1000
+            if node.parent is None or get_import_group(node.parent.name) != group:
+                stats['cumulative'] += node.cumulative_us / 1000
+                if group.startswith(MGMT_SDK_PREFIX):
+                    eager_mgmt_imports.setdefault(group, set()).add(_get_importer(node))
+    return groups, eager_mgmt_imports
+
+
+def _get_importer(node):
+    """ The closest command module or extension which (indirectly) imported the node. """
+    parent = node.parent
+    while parent is not None:
+        if parent.name.startswith(COMMAND_MODULE_PREFIX) or parent.name.startswith('azext_'):
+            return get_import_group(parent.name)
+        parent = parent.parent
+    return 'azure.cli.core'
+
+
+def check_import_time(runs=3, top=20):
+    groups_series = {}
+    eager_mgmt_imports = {}
+    # the first run is ignored since it can be longer due to *.pyc file compilation
+    for i in range(0, runs + 1):
+        result = py_cmd('-X importtime -m azure.cli -h', is_module=False, show_stderr=True)
+        output = result.result
+        try:
+            output = output.decode()
+        except AttributeError:
+            pass
+        if result.exit_code != 0:
+            raise CLIError('Failed to run `az -h` with -X importtime:\n{}'.format(output))
+        if i == 0:
+            continue
+
+        groups, mgmt_imports = summarize_import_time(parse_import_time(output.splitlines()))
+        for group, stats in groups.items():
+            groups_series.setdefault(group, []).append(stats)
+        for group, importers in mgmt_imports.items():
+            eager_mgmt_imports.setdefault(group, set()).update(importers)
+
+    averages = {
+        group: {key: sum(s[key] for s in series) / runs for key in ('self', 'cumulative')}
+        for group, series in groups_series.items()
+    }
+    offenders = sorted(averages.items(), key=lambda item: item[1]['cumulative'], reverse=True)
+
+    subheading('Import Time')
+    display('{:<60} {:>16} {:>16}'.format('Package', 'Self (ms)', 'Cumulative (ms)'))
+    for group, stats in offenders[:top] if top else offenders:
+        display('{:<60} {:>16.1f} {:>16.1f}'.format(group, stats['self'], stats['cumulative']))
+
+    if eager_mgmt_imports:
+        display('\nEAGER AZURE.MGMT IMPORTS')
+        display('These SDKs are imported by `az -h`. Import them inside the command implementations instead.')
+        display('{:<60} {:>16}  {}'.format('SDK', 'Cumulative (ms)', 'Imported by'))
+        for group in sorted(eager_mgmt_imports, key=lambda g: averages[g]['cumulative'], reverse=True):
+            display('{:<60} {:>16.1f}  {}'.format(
+                group, averages[group]['cumulative'], ', '.join(sorted(eager_mgmt_imports[group]))))
+
+    return averages
@@ -0,0 +1,172 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Time the command table and arguments loading of each command module and extension loader.
+
+The loading is timed in-process, by wrapping the loaders created while azure-cli loads all of its commands. Each sample
+is taken in a new process whose first load is cold, i.e. includes importing the modules, and the next ones are warm.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import yaml
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import display, subheading, py_cmd
+
+logger = get_logger(__name__)
+
+COMMAND_TABLE = 'command_table'
+ARGUMENTS = 'arguments'
+TOTAL = 'ALL'
+DEFAULT_BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_budgets.yml')
+
+
+def _timed(func, timings, key):
+    def _wrapper(*args, **kwargs):
+        start = timeit.default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[key] = timings.get(key, 0.0) + (timeit.default_timer() - start) * 1000
+    return _wrapper
+
+
+def _load_all(timings):
+    """ Load all commands and arguments like `create_invoker_and_load_cmds_and_args`, timing each loader.
+
+    :param timings: Dict filled with the name of each command module or extension to its COMMAND_TABLE and
+        ARGUMENTS load time (ms).
+    """
+    import azure.cli.core
+    from azure.cli.core import get_default_cli
+    from azure.cli.core.file_util import create_invoker_and_load_cmds_and_args
+
+    load_command_loader = azure.cli.core._load_command_loader  # pylint: disable=protected-access
+
+    def _timed_load_command_loader(loader, args, name, prefix):
+        mod_timings = timings.setdefault(name, {})
+        loaders_count = len(loader.loaders)
+        result = _timed(load_command_loader, mod_timings, COMMAND_TABLE)(loader, args, name, prefix)
+        for command_loader in loader.loaders[loaders_count:]:
+            command_loader.load_arguments = _timed(command_loader.load_arguments, mod_timings, ARGUMENTS)
+        return result
+
+    azure.cli.core._load_command_loader = _timed_load_command_loader  # pylint: disable=protected-access
+    try:
+        create_invoker_and_load_cmds_and_args(get_default_cli())
+    finally:
+        azure.cli.core._load_command_loader = load_command_loader  # pylint: disable=protected-access
+
+
+def _measure(output_path, warm_runs):
+    """ Entry point of the child process: a cold load followed by `warm_runs` warm ones. """
+    passes = []
+    for _ in range(warm_runs + 1):
+        timings = {}
+        _load_all(timings)
+        passes.append(timings)
+    with open(output_path, 'w') as f:
+        json.dump(passes, f)
+
+
+def load_budgets(path=None):
+    """ Read the budgets (ms) of the cold command table load.
+
+    :returns: (default module budget, total budget, dict of module or extension name to its budget)
+    """
+    path = path or DEFAULT_BUDGETS_PATH
+    try:
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as ex:
+        raise CLIError('Unable to read the load time budgets from {}: {}'.format(path, ex))
+    return config.get('default', 10), config.get('total', 300), config.get('modules') or {}
+
+
+def summarize_samples(samples):
+    """ Average the cold and warm timings of each module over the samples.
+
+    :param samples: List of the passes of each sample, the first pass of a sample being cold.
+    :returns: Dict of module to its 'cold' and 'warm' averages of COMMAND_TABLE and ARGUMENTS (ms), TOTAL included.
+    """
+    series = {}
+    for passes in samples:
+        for index, timings in enumerate(passes):
+            temperature = 'cold' if index == 0 else 'warm'
+            totals = {COMMAND_TABLE: 0.0, ARGUMENTS: 0.0}
+            for mod, mod_timings in list(timings.items()) + [(TOTAL, totals)]:
+                for key in (COMMAND_TABLE, ARGUMENTS):
+                    value = mod_timings.get(key, 0.0)
+                    if mod != TOTAL:
+                        totals[key] += value
+                    series.setdefault(mod, {}).setdefault(temperature, {}).setdefault(key, []).append(value)
+
+    return {
+        mod: {
+            temperature: {key: sum(values) / len(values) for key, values in stats.items()}
+            for temperature, stats in temperatures.items()
+        }
+        for mod, temperatures in series.items()
+    }
+
+
+def check_budgets(summary, budgets):
+    """ :returns: Dict of module to its budget and list of the modules whose cold command table load exceeds it. """
+    default_budget, total_budget, module_budgets = budgets
+    limits = {}
+    failed = []
+    for mod, stats in summary.items():
+        limits[mod] = total_budget if mod == TOTAL else module_budgets.get(mod, default_budget)
+        if stats['cold'][COMMAND_TABLE] > limits[mod]:
+            failed.append(mod)
+    return limits, sorted(failed)
+
+
+def check_loader_time(runs=3, warm_runs=2, budgets_path=None):
+    budgets = load_budgets(budgets_path)
+    samples = []
+    # the first sample is ignored since it can be longer due to *.pyc file compilation
+    for i in range(0, runs + 1):
+        fd, output_path = tempfile.mkstemp(prefix='azdev_loaders_', suffix='.json')
+        os.close(fd)
+        try:
+            result = py_cmd('azdev.operations.performance.loaders {} {}'.format(output_path, warm_runs))
+            if result.exit_code != 0:
+                raise CLIError('Failed to load the command table:\n{}'.format(result.result))
+            with open(output_path) as f:
+                if i:
+                    samples.append(json.load(f))
+        finally:
+            os.remove(output_path)
+
+    summary = summarize_samples(samples)
+    limits, failed = check_budgets(summary, budgets)
+
+    subheading('Loader Times (ms)')
+    display('{:<40} {:>12} {:>12} {:>12} {:>12} {:>10}  {}'.format(
+        'Module', 'Cold table', 'Warm table', 'Cold args', 'Warm args', 'Budget', 'Status'))
+    for mod in sorted(summary, key=lambda m: summary[m]['cold'][COMMAND_TABLE], reverse=True):
+        cold, warm = summary[mod]['cold'], summary[mod].get('warm', {})
+        display('{:<40} {:>12.1f} {:>12.1f} {:>12.1f} {:>12.1f} {:>10}  {}'.format(
+            mod, cold[COMMAND_TABLE], warm.get(COMMAND_TABLE, 0.0), cold[ARGUMENTS], warm.get(ARGUMENTS, 0.0),
+            limits[mod], 'FAILED' if mod in failed else 'PASSED'))
+
+    if failed:
+        raise CLIError('FAILED: The cold command table load of {} exceeds the budget. Check that they do not have '
+                       'top-level imports like azure.mgmt in any modified files, or adjust the budgets in {}.'.format(
+                           ', '.join(failed), budgets_path or DEFAULT_BUDGETS_PATH))
+    display('\nPASSED: Average cold load time of all modules: {} ms'.format(int(summary[TOTAL]['cold'][COMMAND_TABLE])))
+    return summary
+
+
+if __name__ == '__main__':
+    _measure(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,142 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Peak resident memory and allocation profile of CLI commands."""
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import display, heading, subheading, get_env_path, IS_WINDOWS
+
+from .import_time import get_import_group
+
+logger = get_logger(__name__)
+
+HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memory_hook.py')
+LOAD_ALL_ARG = '--azdev-load-all'
+LOAD_ALL_COMMAND = '(command table)'
+
+
+def _python_bin():
+    env_path = get_env_path()
+    if not env_path:
+        return sys.executable
+    return os.path.join(env_path, 'Scripts' if sys.platform == 'win32' else 'bin', 'python')
+
+
+def _to_args(raw_command):
+    return [LOAD_ALL_ARG] if raw_command == LOAD_ALL_COMMAND else shlex.split(raw_command)
+
+
+def _peak_rss(raw_command):
+    """ Run the command and return the peak resident set size (MB) of its process. """
+    # pylint: disable=consider-using-with
+    proc = subprocess.Popen([_python_bin(), HOOK_PATH] + _to_args(raw_command),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+    if proc.returncode:
+        logger.warning('`%s` exited with code %s', raw_command, proc.returncode)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _module_name(filename, sys_path):
+    """ The dotted module name of a file, from the longest entry of sys.path containing it, or None. """
+    roots = [p for p in sys_path if p and filename.startswith(os.path.join(p, ''))]
+    if not roots:
+        return None
+    relative = os.path.splitext(os.path.relpath(filename, max(roots, key=len)))[0]
+    parts = relative.split(os.sep)
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def group_allocations(files, sys_path):
+    """ Sum the size (KB) and count of the allocations of each import group.
+
+    :param files: List of (filename, size in bytes, count) of the traced allocations.
+    """
+    groups = {}
+    for filename, size, count in files:
+        # files outside of sys.path, like frozen modules, are kept on their own
+        module_name = _module_name(filename, sys_path)
+        group = get_import_group(module_name) if module_name else filename
+        stats = groups.setdefault(group, {'Module': group, 'Size (KB)': 0.0, 'Count': 0})
+        stats['Size (KB)'] += size / 1024
+        stats['Count'] += count
+    result = sorted(groups.values(), key=lambda stats: stats['Size (KB)'], reverse=True)
+    for stats in result:
+        stats['Size (KB)'] = round(stats['Size (KB)'], 1)
+    return result
+
+
+def _trace_allocations(raw_command):
+    fd, output_path = tempfile.mkstemp(prefix='azdev_memory_', suffix='.json')
+    os.close(fd)
+    try:
+        subprocess.run([_python_bin(), HOOK_PATH] + _to_args(raw_command), check=False,
+                       env=dict(os.environ, AZDEV_MEMORY_OUTPUT=output_path),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(output_path) as f:
+            try:
+                traced = json.load(f)
+            except ValueError:
+                raise CLIError('Failed to trace the allocations of `{}`'.format(raw_command))
+    finally:
+        os.remove(output_path)
+    return group_allocations(traced['files'], traced['sys_path'])
+
+
+def check_memory(commands=None, runs=3, trace=False, top=10):
+    from . import _benchmark_load_all_commands, _benchmark_cmd_staticstic
+    from .history import record_samples
+
+    if IS_WINDOWS:
+        raise CLIError('`azdev perf memory` relies on the resource usage of child processes, which is not '
+                       'available on Windows.')
+    if runs <= 0:
+        raise CLIError('Number of runs must be greater than 0.')
+
+    if not commands:
+        commands = [LOAD_ALL_COMMAND] + _benchmark_load_all_commands()
+
+    heading('Memory Usage')
+    result = []
+    samples = {}
+    for raw_command in commands:
+        logger.info('Measuring %s...', raw_command)
+        samples[raw_command] = [round(_peak_rss(raw_command), 2) for _ in range(runs)]
+        staticstic = _benchmark_cmd_staticstic(list(samples[raw_command]))
+        item = {
+            'Command': raw_command,
+            'Runs': runs,
+            'Min': staticstic['Min'],
+            'Media': staticstic['Media'],
+            'Max': staticstic['Max'],
+        }
+
+        if trace:
+            # tracing slows down and inflates the process, so it takes a run of its own
+            allocations = _trace_allocations(raw_command)[:top or None]
+            item['Allocations'] = allocations
+            subheading('Allocations of `{}`'.format(raw_command))
+            display('{:<60} {:>12} {:>10}'.format('Module', 'Size (KB)', 'Count'))
+            for stats in allocations:
+                display('{:<60} {:>12.1f} {:>10}'.format(stats['Module'], stats['Size (KB)'], stats['Count']))
+
+        result.append(item)
+
+    record_samples('memory', samples)
+    return result
@@ -0,0 +1,52 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Bootstrap of `azdev perf memory`, run as a script in place of `python -m azure.cli`.
+
+With AZDEV_MEMORY_OUTPUT set, the allocations still alive at the end of the command are traced and the size and
+count of the top files are written in that file. It must not import azdev, which is not necessarily installed in the
+environment of the CLI under test.
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+LOAD_ALL_ARG = '--azdev-load-all'
+
+
+def _invoke(args):
+    from azure.cli.core import get_default_cli
+    az_cli = get_default_cli()
+    if args == [LOAD_ALL_ARG]:
+        from azure.cli.core.file_util import create_invoker_and_load_cmds_and_args
+        create_invoker_and_load_cmds_and_args(az_cli)
+        return 0
+    return az_cli.invoke(args)
+
+
+def main():
+    output_path = os.environ.get('AZDEV_MEMORY_OUTPUT')
+    if output_path:
+        tracemalloc.start()
+    try:
+        exit_code = _invoke(sys.argv[1:])
+    except SystemExit as ex:
+        exit_code = ex.code
+    finally:
+        if output_path:
+            stats = tracemalloc.take_snapshot().statistics('filename')
+            with open(output_path, 'w') as f:
+                json.dump({
+                    'sys_path': sys.path,
+                    'files': [(stat.traceback[0].filename, stat.size, stat.count) for stat in stats],
+                }, f)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Bootstrap of `azdev perf benchmark --phases`, run as a script in place of `python -m azure.cli`.
+
+It records the time of the knack and azure-cli invocation events in the file given by AZDEV_PHASE_OUTPUT. It must not
+import azdev, which is not necessarily installed in the environment of the CLI under test.
+"""
+
+import json
+import os
+import sys
+import time
+
+_START = time.time()
+MARKS = []
+INDEX_TIME = [0.0]
+
+
+def _mark(name):
+    MARKS.append((name, time.time()))
+
+
+def _instrument():
+    import knack.cli
+
+    raise_event = knack.cli.CLI.raise_event
+
+    def _raise_event(self, event_name, **kwargs):
+        _mark(event_name)
+        return raise_event(self, event_name, **kwargs)
+
+    knack.cli.CLI.raise_event = _raise_event
+
+    # building and reading the command index happens within the command table loading
+    import azure.cli.core
+    index_cls = getattr(azure.cli.core, 'CommandIndex', None)
+    for name in ('get', 'update', 'invalidate'):
+        method = getattr(index_cls, name, None)
+        if method is not None:
+            setattr(index_cls, name, _timed(method))
+
+
+def _timed(method):
+    def _wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            INDEX_TIME[0] += time.time() - start
+    return _wrapper
+
+
+def main():
+    exit_code = 1
+    try:
+        from azure.cli.core import get_default_cli
+        _mark('core_imported')
+        _instrument()
+        exit_code = get_default_cli().invoke(sys.argv[1:])
+    except SystemExit as ex:
+        exit_code = ex.code
+    finally:
+        _mark('invoke_end')
+        with open(os.environ['AZDEV_PHASE_OUTPUT'], 'w') as f:
+            json.dump({'start': _START, 'marks': MARKS, 'index_time': INDEX_TIME[0]}, f)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Break the latency of a CLI command down into the phases of its invocation."""
+
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+from knack.util import CLIError
+
+from azdev.utilities import py_cmd
+
+TOTAL_PHASE = 'Total'
+INDEX_PHASE = 'Command index'
+LOAD_COMMAND_TABLE_PHASE = 'Load command table'
+
+# Each phase lasts from its mark to the next recorded one. 'spawn' and 'exit' are taken by azdev around the process,
+# 'start', 'core_imported' and 'invoke_end' by the hook and the others are the knack/azure-cli invocation events.
+PHASE_MARKS = [
+    ('spawn', 'Interpreter startup'),
+    ('start', 'Import azure.cli.core'),
+    ('core_imported', 'CLI initialization'),
+    ('CommandInvoker.OnPreCommandTableCreate', LOAD_COMMAND_TABLE_PHASE),
+    ('CommandInvoker.OnPreLoadArguments', 'Load arguments'),
+    ('CommandInvoker.OnPostLoadArguments', 'Build parser'),
+    ('CommandInvoker.OnPreParseArgs', 'Parse arguments'),
+    ('CommandInvoker.OnPostParseArgs', 'Execute'),
+    ('CommandInvoker.OnTransformResult', 'Output'),
+    ('invoke_end', 'Exit'),
+    ('exit', None),
+]
+
+PHASES = [phase for _, phase in PHASE_MARKS if phase]
+PHASES.insert(PHASES.index(LOAD_COMMAND_TABLE_PHASE), INDEX_PHASE)
+
+HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phase_hook.py')
+
+
+def compute_phases(marks, index_time=0.0):
+    """ Durations (s) of the phases from the time of the first occurrence of each mark.
+
+    A phase whose mark was not recorded, e.g. 'Execute' for `--help` which exits while parsing, is merged into the
+    previous one.
+    """
+    times = {}
+    for name, timestamp in marks:
+        times.setdefault(name, timestamp)
+
+    phases = OrderedDict((phase, 0.0) for phase in PHASES)
+    current = None
+    for mark, phase in PHASE_MARKS:
+        if mark not in times:
+            continue
+        if current is not None:
+            phases[current[1]] += times[mark] - current[0]
+        current = (times[mark], phase)
+
+    # the command index is read and rebuilt while loading the command table
+    index_time = min(index_time, phases[LOAD_COMMAND_TABLE_PHASE])
+    phases[LOAD_COMMAND_TABLE_PHASE] -= index_time
+    phases[INDEX_PHASE] = index_time
+
+    phases[TOTAL_PHASE] = sum(phases.values())
+    return OrderedDict((phase, round(duration, 4)) for phase, duration in phases.items())
+
+
+def _benchmark_phase_timer(raw_command):
+    fd, output_path = tempfile.mkstemp(prefix='azdev_phases_', suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, AZDEV_PHASE_OUTPUT=output_path)
+    try:
+        # the marks of the child process are compared with those of azdev, so both use the wall clock
+        spawn = time.time()
+        result = py_cmd('{} {}'.format(HOOK_PATH, raw_command), is_module=False, env=env)
+        end = time.time()
+        with open(output_path) as f:
+            try:
+                recorded = json.load(f)
+            except ValueError:
+                raise CLIError('Failed to record the phases of `{}`:\n{}'.format(raw_command, result.result))
+    finally:
+        os.remove(output_path)
+
+    marks = [('spawn', spawn), ('start', recorded['start'])] + \
+        [tuple(mark) for mark in recorded['marks']] + [('exit', end)]
+    return compute_phases(marks, recorded['index_time'])
+
+
+def summarize_phases(phase_series):
+    """ The median duration of each phase across the runs. """
+    from . import _benchmark_percentile
+    summary = OrderedDict()
+    for phase in PHASES:
+        summary[phase] = round(_benchmark_percentile(sorted(p[phase] for p in phase_series), 50), 4)
+    return summary
@@ -0,0 +1,70 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Bootstrap of `azdev perf benchmark --profile`, run as a script in place of `python -m azure.cli`.
+
+The command runs under cProfile while a thread samples the stack of the main thread. The profile is written to
+AZDEV_PROFILE_OUTPUT.pstats and the sampled stacks to AZDEV_PROFILE_OUTPUT.collapsed, in the collapsed format of
+flamegraph.pl and speedscope. It must not import azdev, which is not necessarily installed in the environment of the
+CLI under test.
+"""
+
+import cProfile
+import os
+import runpy
+import sys
+import threading
+
+SAMPLING_INTERVAL = 0.001
+
+
+class StackSampler(threading.Thread):
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLING_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+
+def main():
+    output_prefix = os.environ['AZDEV_PROFILE_OUTPUT']
+    sys.argv = ['az'] + sys.argv[1:]
+    sampler = StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+    exit_code = 0
+    sampler.start()
+    profiler.enable()
+    try:
+        runpy.run_module('azure.cli', run_name='__main__', alter_sys=True)
+    except SystemExit as ex:
+        exit_code = ex.code
+    finally:
+        profiler.disable()
+        sampler.stopped.set()
+        sampler.join()
+        profiler.dump_stats(output_prefix + '.pstats')
+        with open(output_prefix + '.collapsed', 'w') as f:
+            for stack, count in sorted(sampler.stacks.items()):
+                f.write('{} {}\n'.format(stack, count))
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Capture a cProfile profile and sampled collapsed stacks of CLI commands."""
+
+import os
+import pstats
+import re
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azdev.utilities import display, subheading, py_cmd
+
+logger = get_logger(__name__)
+
+HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profile_hook.py')
+PROFILE_TOP = 15
+
+
+def _file_prefix(profile_dir, raw_command):
+    name = re.sub(r'[^\w.-]+', '_', raw_command).strip('_') or 'az'
+    return os.path.join(profile_dir, name)
+
+
+def profile_command(raw_command, profile_dir):
+    """ Run the command once under the profilers.
+
+    :returns: Dict of the paths of the .pstats and .collapsed files.
+    """
+    prefix = _file_prefix(profile_dir, raw_command)
+    env = dict(os.environ, AZDEV_PROFILE_OUTPUT=prefix)
+    result = py_cmd('{} {}'.format(HOOK_PATH, raw_command), is_module=False, env=env)
+    paths = {'Stats': prefix + '.pstats', 'Collapsed': prefix + '.collapsed'}
+    if not os.path.isfile(paths['Stats']):
+        raise CLIError('Failed to profile `{}`:\n{}'.format(raw_command, result.result))
+    logger.info('Profile of %s written to %s', raw_command, paths['Stats'])
+    return paths
+
+
+def get_top_cumulative(stats_path, top=PROFILE_TOP):
+    """ The functions with the highest cumulative time of a .pstats file. """
+    stats = pstats.Stats(stats_path)
+    functions = []
+    for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():  # pylint: disable=no-member
+        functions.append({
+            'Function': '{} ({}:{})'.format(name, os.path.basename(filename), line),
+            'Calls': calls,
+            'Cumulative': round(cumulative, 4),
+        })
+    functions.sort(key=lambda f: f['Cumulative'], reverse=True)
+    return functions[:top or None]
+
+
+def display_profiles(result):
+    for item in result:
+        if 'Profile' not in item:
+            continue
+        subheading('Top cumulative functions of `{}`'.format(item['Command']))
+        display('{:<80} {:>10} {:>14}'.format('Function', 'Calls', 'Cumulative (s)'))
+        for function in get_top_cumulative(item['Profile']['Stats']):
+            display('{:<80} {:>10} {:>14.4f}'.format(function['Function'], function['Calls'], function['Cumulative']))
+        display('\nProfile: {Stats}\nCollapsed stacks: {Collapsed}'.format(**item['Profile']))
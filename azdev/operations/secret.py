@@ -4,15 +4,40 @@
 # license information.
 # -----------------------------------------------------------------------------
 
+import io
 import os
 import json
+import multiprocessing
+import re
+import shutil
+import tempfile
 from json.decoder import JSONDecodeError
 from knack.log import get_logger
 from microsoft_security_utilities_secret_masker import (load_regex_patterns_from_json_file,
                                                         load_regex_pattern_from_json,
                                                         SecretMasker)
+from azdev.utilities import diff_branch_blobs, get_history_blobs, iter_blob_contents, walk_files
+from azdev.utilities.git_util import BINARY_CHECK_SIZE
+from azdev.utilities.tracing import span, traced
+from azdev.operations.secret_prefilter import LiteralPrefilter, get_max_match_length
+from azdev.operations.secret_cache import SecretScanCache
 logger = get_logger(__name__)
 
+# results saved with these extensions are streamed, one JSON line per file
+SCAN_RESULT_STREAM_EXTENSIONS = ('.ndjson', '.jsonl')
+MAX_SCAN_CHUNK_SIZE = 16
+# files above this size in MB are scanned in chunks of SCAN_CHUNK_SIZE characters
+LARGE_FILE_SIZE = 32
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+# the characters kept before a chunk for the lookbehinds and anchors of the patterns
+SCAN_CHUNK_CONTEXT = 1024
+# the overlap of the chunks when some pattern has no maximum match length
+MAX_MATCH_LENGTH = 64 * 1024
+MASK_CHUNK_SIZE = 1024 * 1024
+# the size of the blobs read from the git history before scanning them
+HISTORY_BATCH_SIZE = 32 * 1024 * 1024
+_worker_scanner = {}
+
 
 def _validate_data_path(file_path=None, directory_path=None, include_pattern=None, exclude_pattern=None, data=None):
     if file_path and directory_path:
@@ -55,24 +80,10 @@ def _check_file_include_and_exclude_pattern(filename, include_pattern=None, excl
     return file_satisfied
 
 
+@traced(category='secret')
 def _get_files_from_directory(directory_path, recursive=None, include_pattern=None, exclude_pattern=None):
-    target_files = []
-    if recursive:
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                if _check_file_include_and_exclude_pattern(file,
-                                                           include_pattern=include_pattern,
-                                                           exclude_pattern=exclude_pattern):
-                    target_files.append(os.path.join(root, file))
-    else:
-        for file in os.listdir(directory_path):
-            if _check_file_include_and_exclude_pattern(file,
-                                                       include_pattern=include_pattern,
-                                                       exclude_pattern=exclude_pattern):
-                file = os.path.join(directory_path, file)
-                if os.path.isfile(file):
-                    target_files.append(file)
-    return target_files
+    return walk_files(directory_path, patterns=include_pattern, exclude_patterns=exclude_pattern,
+                      recursive=bool(recursive))
 
 
 def _load_built_in_regex_patterns(confidence_level=None):
@@ -125,12 +136,29 @@ def _load_regex_patterns(confidence_level=None, custom_pattern=None):
     return regex_patterns
 
 
-def _scan_secrets_for_string(data, confidence_level=None, custom_pattern=None):
+def _create_secret_masker(confidence_level=None, custom_pattern=None):
+    """ Load and compile the patterns once per scan session, the masker is then shared by all the scanned files. """
+    regex_patterns = _load_regex_patterns(confidence_level, custom_pattern)
+    for pattern in regex_patterns:
+        try:
+            # cached by `re` for the next detections
+            re.compile(pattern.pattern, pattern.regex_flags)
+        except re.error as err:
+            raise ValueError(f'Invalid pattern {pattern.id or pattern.name}: {err}')
+    return SecretMasker(regex_patterns)
+
+
+def _scan_secrets_for_string(data, confidence_level=None, custom_pattern=None, secret_masker=None, prefilter=None):
     if not data:
         return None
 
-    regex_patterns = _load_regex_patterns(confidence_level, custom_pattern)
-    secret_masker = SecretMasker(regex_patterns)
+    secret_masker = secret_masker or _create_secret_masker(confidence_level, custom_pattern)
+    if prefilter:
+        regex_patterns = prefilter.select_patterns(data)
+        if not regex_patterns:
+            return []
+        if len(regex_patterns) < len(prefilter.patterns):
+            secret_masker = prefilter.get_masker(regex_patterns, SecretMasker)
     detected_secrets = secret_masker.detect_secrets(data)
     secrets = []
     for secret in detected_secrets:
@@ -143,15 +171,227 @@ def _scan_secrets_for_string(data, confidence_level=None, custom_pattern=None):
     return secrets
 
 
-def scan_secrets(file_path=None, directory_path=None, recursive=False,
-                 include_pattern=None, exclude_pattern=None, data=None,
-                 save_scan_result=None, scan_result_path=None,
-                 confidence_level=None, custom_pattern=None,
-                 continue_on_failure=None):
+def _get_target_name(target):
+    return target[0] if isinstance(target, tuple) else target
+
+
+def _get_line_offsets(data, line_ranges):
+    """ The (begin, end) offsets in the data of the (first line, line count) ranges. """
+    starts = [0] + [match.end() for match in re.finditer('\n', data)]
+    if starts[-1] != len(data):
+        starts.append(len(data))
+    last = len(starts) - 1
+    return [(starts[min(first - 1, last)], starts[min(first - 1 + count, last)]) for first, count in line_ranges]
+
+
+class _Scanner:
+    """ Scan files or git blobs with the compiled patterns, skipping the contents in the result cache. """
+
+    def __init__(self, secret_masker, prefilter=None, cache=None, large_file_size=None):
+        self.secret_masker = secret_masker
+        self.prefilter = prefilter
+        self.cache = cache
+        self.large_file_size = large_file_size or LARGE_FILE_SIZE
+        self._max_match_length = None
+
+    def scan_string(self, data):
+        key = None
+        if self.cache:
+            key = self.cache.key(data)
+            secrets = self.cache.get(key, data)
+            if secrets is not None:
+                return secrets
+        secrets = _scan_secrets_for_string(data, secret_masker=self.secret_masker, prefilter=self.prefilter)
+        if self.cache:
+            self.cache.set(key, secrets)
+        return secrets
+
+    def scan_chunks(self, f):
+        """ Scan a file in chunks overlapping by the longest possible match, so that any match starting before the
+        overlap ends within the chunk, and the matches starting in the overlap are found with the next chunk. """
+        if self._max_match_length is None:
+            self._max_match_length = get_max_match_length(self.secret_masker.regex_patterns, MAX_MATCH_LENGTH)
+        secrets = []
+        data = f.read(SCAN_CHUNK_SIZE)
+        # the index of data[0] in the file, and the start of the data not scanned with the previous chunks
+        offset = accept_from = 0
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            accept_to = len(data) - self._max_match_length if chunk else len(data)
+            if accept_to > accept_from:
+                for secret in self.scan_string(data):
+                    start, end = secret['secret_index']
+                    if accept_from <= start < accept_to:
+                        secret['secret_index'] = [start + offset, end + offset]
+                        secrets.append(secret)
+                keep = max(0, accept_to - SCAN_CHUNK_CONTEXT)
+                data, offset, accept_from = data[keep:], offset + keep, accept_to - keep
+            if not chunk:
+                return secrets
+            data += chunk
+
+    def scan(self, target):
+        """ :param target: A file path, or the (file path, content bytes or text, added line ranges) of a git blob. """
+        target_file = _get_target_name(target)
+        logger.debug('start scanning secrets for %s', target_file)
+        line_ranges = None
+        if isinstance(target, tuple):
+            data, line_ranges = target[1], target[2]
+            data = data if isinstance(data, str) else data.decode('utf8')
+        elif os.path.getsize(target_file) > self.large_file_size * 1024 * 1024:
+            with span('scan large file', 'secret', path=target_file), open(target_file, encoding='utf8') as f:
+                secrets = self.scan_chunks(f)
+            logger.debug('%d secrets found for %s', len(secrets), target_file)
+            return secrets
+        else:
+            with open(target_file, encoding='utf8') as f:
+                data = f.read()
+        if not data:
+            return []
+        with span('scan file', 'secret', path=target_file):
+            if line_ranges is None:
+                secrets = self.scan_string(data)
+            else:
+                # only the added lines, the secret indexes are still those in the whole content
+                secrets = []
+                for begin, end in _get_line_offsets(data, line_ranges):
+                    for secret in self.scan_string(data[begin:end]):
+                        secret['secret_index'] = [secret['secret_index'][0] + begin, secret['secret_index'][1] + begin]
+                        secrets.append(secret)
+        logger.debug('%d secrets found for %s', len(secrets), target_file)
+        return secrets
+
+
+def _handle_scan_failure(target_file, ex, continue_on_failure=None):
+    if not continue_on_failure:
+        raise ex
+    logger.warning("Error handling file %s, exception %s", target_file, str(ex))
+
+
+def _init_scan_worker(confidence_level, custom_pattern, no_cache, large_file_size):
+    """ Load and compile the patterns, and the result cache, once per worker process. """
+    _worker_scanner['scanner'] = _create_scanner(confidence_level, custom_pattern, no_cache, large_file_size)
+
+
+def _scan_in_worker(target):
+    """ :returns: (file, secrets, (scanned, passed) counts of the prefilter, exception, touched cache entries) """
+    scanner = _worker_scanner['scanner']
+    prefilter = scanner.prefilter
+    scanned, passed = prefilter.scanned, prefilter.passed
+    secrets, error = None, None
+    try:
+        secrets = scanner.scan(target)
+    except Exception as ex:  # pylint: disable=broad-exception-caught
+        error = ex
+    touched = scanner.cache.pop_touched() if scanner.cache else []
+    return (_get_target_name(target), secrets, (prefilter.scanned - scanned, prefilter.passed - passed), error,
+            touched)
+
+
+def _create_scan_pool(scanner, jobs, confidence_level=None, custom_pattern=None):
+    return multiprocessing.Pool(jobs, initializer=_init_scan_worker,
+                                initargs=(confidence_level, custom_pattern, scanner.cache is None,
+                                          scanner.large_file_size))
+
+
+def _iter_scan_results(targets, scanner, continue_on_failure=None,
+                       jobs=None, confidence_level=None, custom_pattern=None, pool=None):
+    """ Yield (file, secrets) of the files with secrets, in completion order when scanning with several processes.
+
+    :param pool: A pool of scan workers to reuse, which is then not terminated.
+    """
+    if pool is None and (not jobs or jobs == 1 or len(targets) < 2):
+        for target in targets:
+            try:
+                secrets = scanner.scan(target)
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                _handle_scan_failure(_get_target_name(target), ex, continue_on_failure)
+                continue
+            if secrets:
+                yield _get_target_name(target), secrets
+        return
+
+    # idle workers take the next small chunk of files, so a few large files do not hold up the others
+    chunksize = max(1, min(MAX_SCAN_CHUNK_SIZE, len(targets) // (jobs * 8)))
+    owned_pool = pool is None
+    pool = pool or _create_scan_pool(scanner, jobs, confidence_level, custom_pattern)
+    try:
+        with span('scan files', 'secret', files=len(targets), jobs=jobs):
+            scanned = pool.imap_unordered(_scan_in_worker, targets, chunksize)
+            for target_file, secrets, counts, error, touched in scanned:
+                if scanner.prefilter:
+                    scanner.prefilter.add_counts(*counts)
+                if scanner.cache:
+                    scanner.cache.update(touched)
+                if error:
+                    _handle_scan_failure(target_file, error, continue_on_failure)
+                elif secrets:
+                    yield target_file, secrets
+    finally:
+        if owned_pool:
+            pool.terminate()
+
+
+def _is_scan_result_stream(scan_result_path):
+    return bool(scan_result_path) and scan_result_path.lower().endswith(SCAN_RESULT_STREAM_EXTENSIONS)
+
+
+def _write_scan_result_stream(scan_results, scan_result_path):
+    """ Write each (file, secrets) as a JSON line once it is available. The file is removed if there is none.
+
+    :returns: Whether any secrets were detected.
+    """
+    secrets_detected = False
+    with open(scan_result_path, 'w', encoding='utf8') as f:
+        for target_file, secrets in scan_results:
+            f.write(json.dumps({'file': target_file, 'secrets': secrets}) + '\n')
+            f.flush()
+            secrets_detected = True
+    if not secrets_detected:
+        os.remove(scan_result_path)
+    logger.debug('streamed scanning results to %s', scan_result_path)
+    return secrets_detected
+
+
+def _iter_scan_result_stream(scan_result_path):
+    with open(scan_result_path, encoding='utf8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['file'], record['secrets']
+
+
+class _StreamedScanResults:
+    """ Scan results read from a result stream one file at a time, instead of loading them all. """
+
+    def __init__(self, scan_result_path, target_files=None):
+        self.scan_result_path = scan_result_path
+        self.target_files = target_files
+
+    def items(self):
+        for scan_file_path, secrets in _iter_scan_result_stream(self.scan_result_path):
+            if self.target_files is None or scan_file_path in self.target_files:
+                yield scan_file_path, secrets
+
+    def __bool__(self):
+        return next(self.items(), None) is not None
+
+
+def _get_default_scan_result_path():
+    from azdev.utilities.config import get_azdev_config_dir
+    from datetime import datetime
+    file_folder = os.path.join(get_azdev_config_dir(), 'scan_results')
+    os.makedirs(file_folder, 0o755, exist_ok=True)
+    # streamed, so that the results of a large scan are not all held in memory
+    result_file_name = 'scan_result_' + datetime.now().strftime('%Y%m%d%H%M%S') + SCAN_RESULT_STREAM_EXTENSIONS[0]
+    return os.path.join(file_folder, result_file_name)
+
+
+def _get_target_files(file_path=None, directory_path=None, recursive=False,
+                      include_pattern=None, exclude_pattern=None, data=None):
     _validate_data_path(file_path=file_path, directory_path=directory_path,
                         include_pattern=include_pattern, exclude_pattern=exclude_pattern, data=data)
     target_files = []
-    scan_results = {}
     if directory_path:
         directory_path = os.path.abspath(directory_path)
         target_files = _get_files_from_directory(directory_path, recursive=recursive,
@@ -159,81 +399,295 @@ def scan_secrets(file_path=None, directory_path=None, recursive=False,
     if file_path:
         file_path = os.path.abspath(file_path)
         target_files.append(file_path)
+    return target_files
 
-    if data:
-        secrets = _scan_secrets_for_string(data, confidence_level, custom_pattern)
-        if secrets:
-            scan_results['raw_data'] = secrets
-    elif target_files:
-        for target_file in target_files:
-            try:
-                logger.debug('start scanning secrets for %s', target_file)
-                with open(target_file, encoding='utf8') as f:
-                    data = f.read()
-                if not data:
-                    continue
-                secrets = _scan_secrets_for_string(data, confidence_level, custom_pattern)
-                logger.debug('%d secrets found for %s', len(secrets), target_file)
-                if secrets:
-                    scan_results[target_file] = secrets
-            except Exception as ex:  # pylint: disable=broad-exception-caught
-                if continue_on_failure:
-                    logger.warning("Error handling file %s, exception %s", target_file, str(ex))
-                else:
-                    raise ex
 
+def _get_git_targets(git_source=None, git_target=None, git_repo=None, staged=None, added_only=None):
+    if staged and (git_source or git_target):
+        raise ValueError('--staged can not be used together with --src and --tgt')
+    if not staged and not git_target:
+        raise ValueError('usage error: [--src NAME] --tgt NAME [--repo PATH] | --staged [--repo PATH]')
+    return diff_branch_blobs(git_repo or os.getcwd(), git_target, git_source, staged=staged, added_lines=added_only)
+
+
+def _iter_history_batches(repo, blobs):
+    batch, batch_size = {}, 0
+    for sha, content in iter_blob_contents(repo, list(blobs)):
+        if b'\0' in content[:BINARY_CHECK_SIZE]:
+            continue
+        # the history may hold text in any encoding, which should not abort the scan
+        batch[sha] = content.decode('utf8', errors='replace')
+        batch_size += len(content)
+        if batch_size >= HISTORY_BATCH_SIZE:
+            yield batch
+            batch, batch_size = {}, 0
+    if batch:
+        yield batch
+
+
+def _iter_history_results(repo, since, scanner, include_pattern=None, exclude_pattern=None,
+                          continue_on_failure=None, jobs=None, confidence_level=None, custom_pattern=None):
+    """ Scan each distinct blob of the history once, and yield its secrets for each `<commit>:<path>` which added it,
+    with their commit, path and line. """
+    blobs = {}
+    for sha, paths in get_history_blobs(repo, since).items():
+        paths = [(commit, path) for commit, path in paths
+                 if _check_file_include_and_exclude_pattern(os.path.basename(path), include_pattern, exclude_pattern)]
+        if paths:
+            blobs[sha] = paths
+    logger.info('%d distinct blobs to scan in the history of %s', len(blobs), repo)
+    pool = _create_scan_pool(scanner, jobs, confidence_level, custom_pattern) if jobs and jobs > 1 else None
+    try:
+        for batch in _iter_history_batches(repo, blobs):
+            # named after the first `<commit>:<path>` of the blob, e.g. in the scan failures
+            names = {'{}:{}'.format(*blobs[sha][0]): sha for sha in batch}
+            targets = [(name, batch[sha], None) for name, sha in names.items()]
+            for name, secrets in _iter_scan_results(targets, scanner, continue_on_failure, jobs=jobs, pool=pool):
+                sha = names[name]
+                data = batch[sha]
+                for commit, path in blobs[sha]:
+                    yield '{}:{}'.format(commit, path), [
+                        dict(secret, commit=commit, path=path, line=data.count('\n', 0, secret['secret_index'][0]) + 1)
+                        for secret in secrets]
+    finally:
+        if pool:
+            pool.terminate()
+
+
+def _scan_git_history(git_history, since=None, include_pattern=None, exclude_pattern=None,
+                      save_scan_result=None, scan_result_path=None, confidence_level=None, custom_pattern=None,
+                      continue_on_failure=None, prefilter_stats=None, jobs=None, no_cache=None):
+    if not os.path.isdir(git_history):
+        raise ValueError(f'invalid git repo path:{git_history}')
+    if include_pattern and exclude_pattern:
+        raise ValueError('--include-pattern and --exclude-pattern are mutually exclusive')
+    scanner = _create_scanner(confidence_level, custom_pattern, no_cache)
+    results = _iter_history_results(git_history, since, scanner, include_pattern, exclude_pattern,
+                                    continue_on_failure=continue_on_failure, jobs=jobs,
+                                    confidence_level=confidence_level, custom_pattern=custom_pattern)
+    return _get_scan_response(results, scanner, save_scan_result or scan_result_path, scan_result_path,
+                              prefilter_stats=prefilter_stats)
+
+
+def scan_secrets(file_path=None, directory_path=None, recursive=False,
+                 include_pattern=None, exclude_pattern=None, data=None,
+                 save_scan_result=None, scan_result_path=None,
+                 confidence_level=None, custom_pattern=None,
+                 continue_on_failure=None, prefilter_stats=None, jobs=None, no_cache=None, large_file_size=None,
+                 git_source=None, git_target=None, git_repo=None, staged=None, added_only=None,
+                 git_history=None, since=None):
+    if jobs is not None and jobs < 1:
+        raise ValueError('--jobs must be a positive number')
+    if large_file_size is not None and large_file_size < 1:
+        raise ValueError('--large-file-size must be a positive number')
+    if git_history:
+        if any([file_path, directory_path, data, git_source, git_target, git_repo, staged, added_only]):
+            raise ValueError('Can not specify --git-history together with other paths, raw string or git changes')
+        return _scan_git_history(git_history, since, include_pattern=include_pattern,
+                                 exclude_pattern=exclude_pattern, save_scan_result=save_scan_result,
+                                 scan_result_path=scan_result_path, confidence_level=confidence_level,
+                                 custom_pattern=custom_pattern, continue_on_failure=continue_on_failure,
+                                 prefilter_stats=prefilter_stats, jobs=jobs, no_cache=no_cache)
+    if since:
+        raise ValueError('--since need to be used together with --git-history')
+    if any([git_source, git_target, git_repo, staged]):
+        if any([file_path, directory_path, data]):
+            raise ValueError('Can not specify --src, --tgt, --repo or --staged together with file path, '
+                             'directory path or raw string')
+        targets = _get_git_targets(git_source, git_target, git_repo, staged, added_only)
+    elif added_only:
+        raise ValueError('--added-only need to be used together with --tgt or --staged')
+    else:
+        targets = _get_target_files(file_path=file_path, directory_path=directory_path, recursive=recursive,
+                                    include_pattern=include_pattern, exclude_pattern=exclude_pattern, data=data)
     if scan_result_path:
         save_scan_result = True
+
+    results = []
+    scanner = None
+    if data:
+        results = _scan_raw_data(data, confidence_level, custom_pattern)
+    elif targets:
+        scanner = _create_scanner(confidence_level, custom_pattern, no_cache, large_file_size)
+        results = _iter_scan_results(targets, scanner, continue_on_failure=continue_on_failure,
+                                     jobs=jobs, confidence_level=confidence_level, custom_pattern=custom_pattern)
+    # in the order of the targets unless streamed
+    return _get_scan_response(results, scanner, save_scan_result, scan_result_path,
+                              list(map(_get_target_name, targets)) if jobs and jobs > 1 else None, prefilter_stats)
+
+
+def _scan_raw_data(data, confidence_level=None, custom_pattern=None):
+    secrets = _scan_secrets_for_string(data, confidence_level, custom_pattern)
+    return [('raw_data', secrets)] if secrets else []
+
+
+def _create_scanner(confidence_level=None, custom_pattern=None, no_cache=None, large_file_size=None):
+    secret_masker = _create_secret_masker(confidence_level, custom_pattern)
+    return _Scanner(secret_masker, LiteralPrefilter(secret_masker.regex_patterns),
+                    None if no_cache else SecretScanCache(secret_masker.regex_patterns), large_file_size)
+
+
+def _get_scan_response(results, scanner=None, save_scan_result=None, scan_result_path=None, order=None,
+                       prefilter_stats=None):
+    scan_results = None
+    if save_scan_result and not scan_result_path:
+        scan_result_path = _get_default_scan_result_path()
+    if save_scan_result and _is_scan_result_stream(scan_result_path):
+        secrets_detected = _write_scan_result_stream(results, scan_result_path)
+    else:
+        scan_results = dict(results)
+        if order:
+            scan_results = {f: scan_results[f] for f in order if f in scan_results}
+        secrets_detected = bool(scan_results)
+
+    stats = {}
+    if scanner:
+        if scanner.cache:
+            scanner.cache.save()
+        logger.info('Literal prefilter: %s', scanner.prefilter.get_stats())
+        if prefilter_stats:
+            stats['prefilter_stats'] = scanner.prefilter.get_stats()
+
     if not save_scan_result:
         return {
-            'secrets_detected': bool(scan_results),
-            'scan_results': scan_results
+            'secrets_detected': secrets_detected,
+            'scan_results': scan_results,
+            **stats
         }
 
-    if not scan_results:
-        return {'secrets_detected': False, 'scan_result_path': None}
+    if not secrets_detected:
+        return {'secrets_detected': False, 'scan_result_path': None, **stats}
 
-    if not scan_result_path:
-        from azdev.utilities.config import get_azdev_config_dir
-        from datetime import datetime
-        file_folder = os.path.join(get_azdev_config_dir(), 'scan_results')
-        if not os.path.exists(file_folder):
-            os.mkdir(file_folder, 0o755)
-        result_file_name = 'scan_result_' + datetime.now().strftime('%Y%m%d%H%M%S') + '.json'
-        scan_result_path = os.path.join(file_folder, result_file_name)
+    if scan_results is not None:
+        with open(scan_result_path, 'w', encoding='utf8') as f:
+            json.dump(scan_results, f)
+            logger.debug('store scanning results in %s', scan_result_path)
+    return {'secrets_detected': True, 'scan_result_path': os.path.abspath(scan_result_path), **stats}
 
-    with open(scan_result_path, 'w', encoding='utf8') as f:
-        json.dump(scan_results, f)
-        logger.debug('store scanning results in %s', scan_result_path)
-    return {'secrets_detected': True, 'scan_result_path': os.path.abspath(scan_result_path)}
+
+def _load_scan_results(scan_result_path, target_files=None):
+    """ The saved scan results of the target files, streamed results are read lazily. """
+    if _is_scan_result_stream(scan_result_path):
+        return _StreamedScanResults(scan_result_path, target_files)
+    with open(scan_result_path, encoding='utf8') as f:
+        saved_scan_results = json.load(f)
+    if target_files is None:
+        return saved_scan_results
+    return {scan_file_path: secrets for scan_file_path, secrets in saved_scan_results.items()
+            if scan_file_path in target_files}
 
 
 def _get_scan_results_from_saved_file(saved_scan_result_path,
                                       file_path=None, directory_path=None, recursive=False,
                                       include_pattern=None, exclude_pattern=None, data=None):
-    scan_results = {}
     if not os.path.isfile(saved_scan_result_path):
         raise ValueError(f'invalid saved scan result path:{saved_scan_result_path}')
-    with open(saved_scan_result_path, encoding='utf8') as f:
-        saved_scan_results = json.load(f)
     # filter saved scan results to keep those related with specified file(s)
     _validate_data_path(file_path=file_path, directory_path=directory_path,
                         include_pattern=include_pattern, exclude_pattern=exclude_pattern, data=data)
     if file_path:
-        file_path = os.path.abspath(file_path)
-        if file_path in saved_scan_results:
-            scan_results[file_path] = saved_scan_results[file_path]
+        target_files = {os.path.abspath(file_path)}
     elif directory_path:
         directory_path = os.path.abspath(directory_path)
-        target_files = _get_files_from_directory(directory_path, recursive=recursive,
-                                                 include_pattern=include_pattern, exclude_pattern=exclude_pattern)
-        for target_file in target_files:
-            if target_file in saved_scan_results:
-                scan_results[target_file] = saved_scan_results[target_file]
+        target_files = set(_get_files_from_directory(directory_path, recursive=recursive,
+                                                     include_pattern=include_pattern,
+                                                     exclude_pattern=exclude_pattern))
     else:
-        scan_results['raw_data'] = saved_scan_results['raw_data']
+        target_files = {'raw_data'}
+    return _load_scan_results(saved_scan_result_path, target_files)
 
-    return scan_results
+
+def _get_redaction(secret, redaction_type, length):
+    if redaction_type == 'FIXED_VALUE':
+        return '***'
+    if redaction_type == 'FIXED_LENGTH':
+        return '*' * length
+    if redaction_type == 'SECRET_NAME':
+        return secret['secret_name']
+    return secret['redaction_token']
+
+
+def _get_mask_spans(secrets):
+    """ The [start, end, secrets] spans of the secrets sorted by start, overlapping secrets share a span. """
+    spans = []
+    for secret in sorted(secrets, key=lambda secret: (secret['secret_index'][0], -secret['secret_index'][1])):
+        start, end = secret['secret_index']
+        if spans and start < spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+            spans[-1][2].append(secret)
+        else:
+            spans.append([start, end, [secret]])
+    return spans
+
+
+def _copy_stream(src, dst, size=-1):
+    while size:
+        chunk = src.read(MASK_CHUNK_SIZE if size < 0 else min(size, MASK_CHUNK_SIZE))
+        if not chunk:
+            return
+        dst.write(chunk)
+        if size > 0:
+            size -= len(chunk)
+
+
+def _mask_stream(src, dst, secrets, redaction_type=None):
+    """ Copy the source to the destination in one pass, redacting the spans of the secrets. A span overlapping
+    several secrets is redacted once, as its first secret.
+
+    :returns: False if some span does not hold its secret value, e.g. when the content changed after the scan.
+    """
+    position = 0
+    for start, end, span_secrets in _get_mask_spans(secrets):
+        _copy_stream(src, dst, start - position)
+        value = src.read(end - start)
+        for secret in span_secrets:
+            if value[secret['secret_index'][0] - start:secret['secret_index'][1] - start] != secret['secret_value']:
+                return False
+        dst.write(_get_redaction(span_secrets[0], redaction_type, end - start))
+        position = end
+    _copy_stream(src, dst)
+    return True
+
+
+def _mask_string(data, secrets, redaction_type=None):
+    masked = io.StringIO(newline='')
+    if _mask_stream(io.StringIO(data, newline=''), masked, secrets, redaction_type):
+        return masked.getvalue()
+    logger.warning('The scan result does not match the string, masking every occurrence of its secrets instead.')
+    for secret in secrets:
+        data = _mask_secret_for_string(data, secret, redaction_type)
+    return data
+
+
+def _replace_file(file_path, write):
+    """ Write a temp file next to the file and atomically replace the file with it, unless `write` returns False. """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix='.' + os.path.basename(file_path),
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf8') as f:
+            if write(f) is False:
+                return False
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _mask_file(file_path, secrets, redaction_type=None):
+    def write_masked(f):
+        with open(file_path, 'r', encoding='utf8') as src:
+            return _mask_stream(src, f, secrets, redaction_type)
+
+    if secrets and not _replace_file(file_path, write_masked):
+        logger.warning('The scan result of %s does not match its content, masking every occurrence of its secrets '
+                       'instead.', file_path)
+        with open(file_path, 'r', encoding='utf8') as f:
+            content = f.read()
+        for secret in secrets:
+            content = _mask_secret_for_string(content, secret, redaction_type)
+        _replace_file(file_path, lambda f: f.write(content))
 
 
 def _mask_secret_for_string(data, secret, redaction_type=None):
@@ -252,7 +706,8 @@ def mask_secrets(file_path=None, directory_path=None, recursive=False,
                  include_pattern=None, exclude_pattern=None, data=None,
                  save_scan_result=None, scan_result_path=None,
                  confidence_level=None, custom_pattern=None, continue_on_failure=None,
-                 saved_scan_result_path=None, redaction_type='FIXED_VALUE', yes=None):
+                 saved_scan_result_path=None, redaction_type='FIXED_VALUE', yes=None, jobs=None, no_cache=None,
+                 large_file_size=None):
     scan_results = {}
     if saved_scan_result_path:
         scan_results = _get_scan_results_from_saved_file(saved_scan_result_path,
@@ -267,11 +722,11 @@ def mask_secrets(file_path=None, directory_path=None, recursive=False,
                                      include_pattern=include_pattern, exclude_pattern=exclude_pattern, data=data,
                                      save_scan_result=save_scan_result, scan_result_path=scan_result_path,
                                      confidence_level=confidence_level, custom_pattern=custom_pattern,
-                                     continue_on_failure=continue_on_failure)
-        if save_scan_result and scan_response['scan_result_path']:
-            with open(scan_response['scan_result_path'], encoding='utf8') as f:
-                scan_results = json.load(f)
-        elif not save_scan_result:
+                                     continue_on_failure=continue_on_failure, jobs=jobs, no_cache=no_cache,
+                                     large_file_size=large_file_size)
+        if scan_response.get('scan_result_path'):
+            scan_results = _load_scan_results(scan_response['scan_result_path'])
+        elif 'scan_results' in scan_response:
             scan_results = scan_response['scan_results']
 
     mask_result = {
@@ -291,27 +746,24 @@ def mask_secrets(file_path=None, directory_path=None, recursive=False,
         if not prompt_y_n(f'Do you want to continue with redaction type {redaction_type}?'):
             return mask_result
 
-    if 'raw_data' in scan_results:
-        for secret in scan_results['raw_data']:
-            data = _mask_secret_for_string(data, secret, redaction_type)
+    if data:
+        for _, secrets in scan_results.items():
+            data = _mask_string(data, secrets, redaction_type)
         mask_result['mask'] = True
         mask_result['data'] = data
         return mask_result
 
+    _mask_files(scan_results, redaction_type, continue_on_failure)
+    mask_result['mask'] = True
+    return mask_result
+
+
+def _mask_files(scan_results, redaction_type=None, continue_on_failure=None):
     for scan_file_path, secrets in scan_results.items():
         try:
-            with open(scan_file_path, 'r', encoding='utf8') as f:
-                content = f.read()
-            if not content:
-                continue
-            for secret in secrets:
-                content = _mask_secret_for_string(content, secret, redaction_type)
-            with open(scan_file_path, 'w', encoding='utf8') as f:
-                f.write(content)
+            _mask_file(scan_file_path, secrets, redaction_type)
         except Exception as ex:  # pylint: disable=broad-exception-caught
             if continue_on_failure:
                 logger.warning("Error handling file %s, exception %s", scan_file_path, str(ex))
             else:
                 raise ex
-    mask_result['mask'] = True
-    return mask_result
@@ -0,0 +1,122 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Content-hash cache of the secret scan results.
+
+The detections only depend on the scanned content and the patterns, so unchanged content is not scanned again. The
+cache has one file per set of patterns, and stores the positions of the secrets, not their values.
+
+The whole file, up to MAX_ENTRIES entries, is loaded by every scan and by every `--jobs` worker process, and is only
+written back when new contents were scanned. Use `--no-cache` for one-off scans of small inputs.
+"""
+
+import hashlib
+import json
+import os
+
+from knack.log import get_logger
+
+from azdev.utilities import get_azdev_config_dir
+
+logger = get_logger(__name__)
+
+CACHE_DIR = 'secret_scan_cache'
+# the least recently used contents are dropped beyond this
+MAX_ENTRIES = 200000
+
+
+def _sha256(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(value if isinstance(value, bytes) else str(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _get_masker_version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        return version('microsoft-security-utilities-secret-masker')
+    except (ImportError, PackageNotFoundError):
+        return ''
+
+
+def get_patterns_key(regex_patterns):
+    """ A key which changes when any pattern, or the version of the secret masker, changes. """
+    patterns = sorted(repr((pattern.id, pattern.name, pattern.pattern, pattern.regex_flags))
+                      for pattern in regex_patterns)
+    return _sha256(_get_masker_version(), *patterns)
+
+
+class SecretScanCache:
+
+    def __init__(self, regex_patterns):
+        self.patterns_key = get_patterns_key(regex_patterns)
+        # the (key, entry) of the contents looked up or scanned since the last `pop_touched`
+        self.touched = []
+        # the number of contents scanned since the cache was loaded
+        self.added = 0
+        try:
+            with open(self.get_path(), 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get_path(self):
+        return os.path.join(get_azdev_config_dir(), CACHE_DIR, '{}.json'.format(self.patterns_key[:16]))
+
+    @staticmethod
+    def key(data):
+        return _sha256(data)
+
+    def get(self, key, data):
+        """ The cached secrets of the content, None if it has to be scanned. """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.touched.append((key, entry))
+        return [{
+            'secret_name': name,
+            'secret_value': data[start:end],
+            'secret_index': [start, end],
+            'redaction_token': redaction_token,
+        } for name, start, end, redaction_token in entry]
+
+    def set(self, key, secrets):
+        entry = [[secret['secret_name'], secret['secret_index'][0], secret['secret_index'][1],
+                  secret['redaction_token']] for secret in secrets]
+        self.added += 1
+        self.entries[key] = entry
+        self.touched.append((key, entry))
+
+    def pop_touched(self):
+        touched, self.touched = self.touched, []
+        return touched
+
+    def update(self, touched):
+        """ Add the entries looked up or scanned by another cache, e.g. in a worker process, as most recently used. """
+        for key, entry in touched:
+            if self.entries.pop(key, None) is None:
+                self.added += 1
+            self.entries[key] = entry
+
+    def save(self):
+        """ Write the cache back if new contents were scanned, with the contents looked up as most recently used. """
+        self.update(self.pop_touched())
+        if not self.added:
+            return
+        keys = list(self.entries)
+        for key in keys[:max(0, len(keys) - MAX_ENTRIES)]:
+            del self.entries[key]
+        path = self.get_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            logger.warning('Unable to save the secret scan cache: %s', ex)
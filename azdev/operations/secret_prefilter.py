@@ -0,0 +1,228 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Literal prefilter of the secret patterns.
+
+Most patterns require some literal, e.g. `AzCa` or `sig=`, in any match. The data is searched for all those literals at
+once, and only the patterns whose literals are found, plus the patterns without any, run on it. The detections are
+identical to running every pattern.
+"""
+
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants  # pylint: disable=no-name-in-module
+except ImportError:  # Python < 3.11
+    import sre_parse  # pylint: disable=deprecated-module
+    import sre_constants  # pylint: disable=deprecated-module
+
+# the opcodes are set dynamically
+# pylint: disable=no-member
+
+MIN_LITERAL_LENGTH = 3
+MAX_ALTERNATIVES = 16
+# the character classes small enough to expand, like [AQgw]
+MAX_CLASS_SIZE = 4
+# the maskers of distinct sets of selected patterns kept
+MAX_MASKERS = 256
+INLINE_IGNORECASE_REGEX = re.compile(r'\(\?[a-zA-Z]*i[a-zA-Z]*(?:-[a-zA-Z]*)?[:)]')
+
+
+def _score(literals):
+    return min(len(literal) for literal in literals) if literals else -1
+
+
+def _better(current, candidate):
+    """ The set of required literals with the longest shortest literal. """
+    if candidate is None:
+        return current
+    if current is None or _score(candidate) > _score(current):
+        return candidate
+    return current
+
+
+def _class_literals(items):
+    chars = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_constants.RANGE and av[1] - av[0] < MAX_CLASS_SIZE:
+            chars.update(chr(c) for c in range(av[0], av[1] + 1))
+        else:
+            return None
+    return chars if len(chars) <= MAX_CLASS_SIZE else None
+
+
+def _node_info(op, av):  # pylint: disable=too-many-return-statements
+    """ (exact, required) of a node: the set of strings it matches if small enough, and a set of literals one of
+    which is in any of its matches. Either can be None when unknown. """
+    if op is sre_constants.LITERAL:
+        return {chr(av)}, None
+    if op is sre_constants.IN:
+        return _class_literals(av), None
+    if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        # zero width
+        return {''}, None
+    if op is sre_constants.SUBPATTERN:
+        return _sequence_info(av[-1])
+    if op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+        return _sequence_info(av)
+    if op is sre_constants.BRANCH:
+        infos = [_sequence_info(branch) for branch in av[1]]
+        exact = set()
+        for branch_exact, _ in infos:
+            if branch_exact is None or exact is None:
+                exact = None
+            else:
+                exact.update(branch_exact)
+        if exact is not None and len(exact) > MAX_ALTERNATIVES:
+            exact = None
+        required = set()
+        for _, branch_required in infos:
+            if branch_required is None or required is None:
+                required = None
+            else:
+                required.update(branch_required)
+        return exact, required
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+              getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+        minimum, maximum, item = av
+        if minimum == 0:
+            return None, None
+        exact, required = _sequence_info(item)
+        if minimum == maximum == 1:
+            return exact, required
+        return None, required
+    return None, None
+
+
+def _sequence_info(items):
+    exact = {''}
+    whole_exact = {''}
+    required = None
+    for op, av in items:
+        node_exact, node_required = _node_info(op, av)
+        required = _better(required, node_required)
+        if node_exact is None:
+            whole_exact = None
+            if exact is not None:
+                required = _better(required, exact)
+            exact = None
+            continue
+        if whole_exact is not None:
+            whole_exact = {a + b for a in whole_exact for b in node_exact}
+            if len(whole_exact) > MAX_ALTERNATIVES:
+                whole_exact = None
+        if exact is None:
+            exact = set(node_exact)
+            continue
+        product = {a + b for a in exact for b in node_exact}
+        if len(product) > MAX_ALTERNATIVES:
+            required = _better(required, exact)
+            exact = set(node_exact)
+        else:
+            exact = product
+    if exact is not None:
+        required = _better(required, exact)
+    return whole_exact, required
+
+
+def extract_literals(pattern, flags=0):
+    """ A set of literals one of which is in any match of the pattern, None if there is no long enough literal.
+
+    :returns: (literals, ignore case)
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, OverflowError, RecursionError):
+        return None, False
+    _, required = _sequence_info(list(parsed))
+    if not required or _score(required) < MIN_LITERAL_LENGTH:
+        return None, False
+    ignore_case = bool((parsed.state.flags | flags) & re.IGNORECASE) or bool(INLINE_IGNORECASE_REGEX.search(pattern))
+    # a literal containing another one is redundant
+    required = {literal for literal in required
+                if not any(other != literal and other in literal for other in required)}
+    return ({literal.lower() for literal in required} if ignore_case else required), ignore_case
+
+
+def get_max_match_length(regex_patterns, limit):
+    """ The length of the longest possible match of the patterns, at most `limit`. """
+    length = 0
+    for pattern in regex_patterns:
+        try:
+            width = sre_parse.parse(pattern.pattern, pattern.regex_flags).getwidth()[1]
+        except (re.error, OverflowError, RecursionError):
+            width = limit
+        length = max(length, min(width, limit))
+    return length
+
+
+class LiteralPrefilter:  # pylint: disable=too-many-instance-attributes
+    """ Select the patterns which may match some data, counting how often data passes the prefilter. """
+
+    def __init__(self, regex_patterns):
+        self.patterns = list(regex_patterns)
+        self.literals = [extract_literals(pattern.pattern, pattern.regex_flags) for pattern in self.patterns]
+        all_literals = sorted({literal for literals, _ in self.literals if literals for literal in literals},
+                              key=len, reverse=True)
+        # one case insensitive search, a superset of the literals found by the exact checks
+        self._any_literal = re.compile('|'.join(re.escape(literal) for literal in all_literals),
+                                       re.IGNORECASE) if all_literals else None
+        self.unfiltered_patterns = [pattern for pattern, (literals, _) in zip(self.patterns, self.literals)
+                                    if not literals]
+        self._lock = threading.Lock()
+        self._maskers = {}
+        self.scanned = 0
+        self.passed = 0
+
+    def select_patterns(self, data):
+        """ The patterns which may match the data, in their original order. """
+        selected = []
+        if self._any_literal is not None and self._any_literal.search(data):
+            lowered = None
+            for pattern, (literals, ignore_case) in zip(self.patterns, self.literals):
+                if literals and ignore_case:
+                    lowered = data.lower() if lowered is None else lowered
+                    found = any(literal in lowered for literal in literals)
+                else:
+                    found = not literals or any(literal in data for literal in literals)
+                if found:
+                    selected.append(pattern)
+        else:
+            selected = self.unfiltered_patterns
+        with self._lock:
+            self.scanned += 1
+            self.passed += 1 if len(selected) > len(self.unfiltered_patterns) else 0
+        return selected
+
+    def get_masker(self, patterns, create_masker):
+        """ The masker of the selected patterns, created with `create_masker` once per set of patterns. """
+        key = tuple(id(pattern) for pattern in patterns)
+        with self._lock:
+            masker = self._maskers.get(key)
+            if masker is None:
+                masker = create_masker(patterns)
+                if len(self._maskers) < MAX_MASKERS:
+                    self._maskers[key] = masker
+        return masker
+
+    def add_counts(self, scanned, passed):
+        """ Add the counts of a prefilter of the same patterns, e.g. in a worker process. """
+        with self._lock:
+            self.scanned += scanned
+            self.passed += passed
+
+    def get_stats(self):
+        return {
+            'scanned': self.scanned,
+            'passed': self.passed,
+            'hit_ratio': round(self.passed / self.scanned, 4) if self.scanned else 0.0,
+            'filtered_patterns': len(self.patterns) - len(self.unfiltered_patterns),
+            'unfiltered_patterns': sorted(pattern.id or pattern.name or pattern.pattern
+                                          for pattern in self.unfiltered_patterns),
+        }
@@ -15,7 +15,7 @@ from pathlib import Path
 
 from knack.log import get_logger
 from azdev.utilities import (
-    heading, display, get_path_table, require_azure_cli, filter_by_git_diff)
+    heading, display, get_path_table, require_azure_cli, filter_by_git_diff, span)
 
 from .util import filter_modules
 
@@ -64,7 +64,8 @@ def list_command_table(modules=None, git_source=None, git_target=None, git_repo=
     az_cli = get_default_cli()
 
     # load commands, args, and help
-    _create_invoker_and_load_cmds(az_cli)
+    with span('load command table', 'statistics'):
+        _create_invoker_and_load_cmds(az_cli)
 
     stop = time.time()
     logger.info('Commands and help loaded in %i sec', stop - start)
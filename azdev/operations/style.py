@@ -4,24 +4,44 @@
 # license information.
 # -----------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
+import json
 import multiprocessing
 import os
+import re
+from subprocess import CalledProcessError
 import sys
+import timeit
 
 from knack.log import get_logger
 from knack.util import CLIError, CommandResultItem
 
 from azdev.utilities import (
     display, heading, py_cmd, get_path_table, EXTENSION_PREFIX,
-    get_azdev_config, get_azdev_config_dir, require_azure_cli, filter_by_git_diff)
+    get_azdev_config, get_azdev_config_dir, require_azure_cli, filter_by_git_diff, diff_branches, span)
+
+from .style_cache import (
+    StyleCache, build_import_graph, find_python_files, get_dependents, get_exit_code, get_tool_version)
 
 
 logger = get_logger(__name__)
 
+PYLINT = 'pylint'
+FLAKE8 = 'flake8'
+STYLE_DURATIONS_FILE = 'style_durations.json'
+# beyond this total length, the stale files of a directory are not passed one by one on the command line
+MAX_STALE_PATHS_LENGTH = 2000
+# absolute paths, to map the messages to the cached files, only used when caching
+PYLINT_MSG_TEMPLATE = '{abspath}:{line}:{column}: {msg_id}: {msg} ({symbol})'
+# the checks which only see the files checked in the same pylint process, by symbol and message id
+PYLINT_CROSS_FILE_CHECKS = {'duplicate-code': 'R0801', 'cyclic-import': 'R0401'}
+PYLINT_MSG_TEMPLATE_OPTION_REGEX = re.compile(r'^\s*msg-template\s*=', re.MULTILINE)
+
 
 # pylint: disable=too-many-statements
-def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_target=None, git_repo=None):
+def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_target=None, git_repo=None, jobs=None,
+                no_cache=False):
 
     heading('Style Check')
 
@@ -55,11 +75,22 @@ def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_tar
         selected_modules['core'] = {}
 
     # filter down to only modules that have changed based on git diff
-    selected_modules = filter_by_git_diff(selected_modules, git_source, git_target, git_repo)
+    files_changed = None
+    if git_target and git_repo:
+        files_changed = diff_branches(git_repo, git_target, git_source)
+    selected_modules = filter_by_git_diff(selected_modules, git_source, git_target, git_repo,
+                                          files_changed=files_changed)
+    # only check the changed files of these modules
+    changed_files = None
+    if files_changed is not None:
+        changed_files = {os.path.abspath(os.path.join(git_repo, f)) for f in files_changed}
 
     if not any(selected_modules.values()):
         raise CLIError('No modules selected.')
 
+    if jobs is not None and jobs <= 0:
+        raise CLIError('usage error: --jobs must be greater than 0.')
+
     mod_names = list(selected_modules['mod'].keys()) + list(selected_modules['core'].keys())
     ext_names = list(selected_modules['ext'].keys())
 
@@ -74,9 +105,18 @@ def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_tar
         pylint = True
 
     exit_code_sum = 0
+    jobs = jobs or multiprocessing.cpu_count()
 
+    # run the shards of both tools concurrently
+    tasks = []
     if pylint:
-        pylint_result = run_pylint(selected_modules)
+        tasks += _pylint_tasks(selected_modules, jobs, use_cache=not no_cache, changed_files=changed_files)
+    if pep8:
+        tasks += _pep8_tasks(selected_modules, jobs, use_cache=not no_cache, changed_files=changed_files)
+    results = _run_tasks(tasks, jobs)
+
+    if pylint:
+        pylint_result = results.get(PYLINT, _combine_command_result())
         exit_code_sum += pylint_result.exit_code
 
         if pylint_result.error:
@@ -87,7 +127,7 @@ def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_tar
             display('Pylint: PASSED\n')
 
     if pep8:
-        pep8_result = _run_pep8(selected_modules)
+        pep8_result = results.get(FLAKE8, _combine_command_result())
         exit_code_sum += pep8_result.exit_code
 
         if pep8_result.error:
@@ -99,7 +139,7 @@ def check_style(modules=None, pylint=False, pep8=False, git_source=None, git_tar
     sys.exit(exit_code_sum)
 
 
-def _combine_command_result(cli_result, ext_result):
+def _combine_command_result(*results):
 
     final_result = CommandResultItem(None)
 
@@ -112,21 +152,327 @@ def _combine_command_result(cli_result, ext_result):
                         final_result.error.message += item.error.message
                     except AttributeError:
                         final_result.error.message += str(item.error)
+                    # keep the output of every failed shard, not only the first one
+                    if isinstance(getattr(item.error, 'output', None), bytes):
+                        final_result.error.output = (final_result.error.output or b'') + b'\n' + item.error.output
                 else:
                     final_result.error = item.error
                     setattr(final_result.error, 'message', '')
             if item.result:
+                result = item.result.decode('utf-8') if isinstance(item.result, bytes) else item.result
                 if final_result.result:
-                    final_result.result += item.result
+                    final_result.result += '\n' + result
                 else:
-                    final_result.result = item.result
+                    final_result.result = result
 
-    apply_result(cli_result)
-    apply_result(ext_result)
+    for result in results:
+        apply_result(result)
     return final_result
 
 
-def run_pylint(modules, checkers=None, env=None, disable_all=False, enable=None):
+def _count_python_files(path):
+    if os.path.isfile(path):
+        return 1
+    count = 0
+    for _, _, files in os.walk(path):
+        count += len([f for f in files if f.endswith('.py')])
+    return max(count, 1)
+
+
+def _durations_path():
+    return os.path.join(get_azdev_config_dir(), STYLE_DURATIONS_FILE)
+
+
+def _load_durations():
+    try:
+        with open(_durations_path(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _record_durations(tool, durations):
+    """ Merge the CPU time (s) spent on each path into the durations recorded for `tool`. """
+    content = _load_durations()
+    recorded = content.setdefault(tool, {})
+    recorded.update({path: round(value, 3) for path, value in durations.items()})
+    # drop the single files recorded by earlier versions
+    content[tool] = {path: value for path, value in recorded.items() if not path.endswith('.py')}
+    try:
+        os.makedirs(get_azdev_config_dir(), exist_ok=True)
+        with open(_durations_path(), 'w') as f:
+            json.dump(content, f)
+    except OSError as ex:
+        logger.warning('Unable to record the style check durations: %s', ex)
+
+
+def get_path_weights(paths, durations):
+    """ Estimate the cost of checking each path from its recorded duration, or its number of Python files.
+
+    Paths without recorded duration are estimated from the average time per file of the recorded ones.
+    """
+    counts = {path: _count_python_files(path) for path in paths}
+    known = [path for path in paths if path in durations]
+    if not known:
+        return {path: float(count) for path, count in counts.items()}
+    per_file = sum(durations[path] for path in known) / sum(counts[path] for path in known)
+    return {path: float(durations[path]) if path in durations else counts[path] * per_file for path in paths}
+
+
+def shard_paths(paths, shard_count, weights):
+    """ Split the paths into at most `shard_count` shards of balanced total weight, the heaviest shard first. """
+    shard_count = max(1, min(shard_count, len(paths)))
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    # longest processing time first: give the next heaviest path to the lightest shard
+    for path in sorted(paths, key=lambda p: weights[p], reverse=True):
+        index = loads.index(min(loads))
+        shards[index].append(path)
+        loads[index] += weights[path]
+    return sorted([(shard, load) for shard, load in zip(shards, loads) if shard], key=lambda x: x[1], reverse=True)
+
+
+def allocate_processes(loads, jobs):
+    """ Split `jobs` processes across tasks run concurrently, at least one each and the rest in proportion to their
+    loads, so that they add up to at most `jobs` processes. With more tasks than `jobs`, at most `jobs` of them run at
+    once with one process each. """
+    if len(loads) >= jobs:
+        return [1] * len(loads)
+    spare = jobs - len(loads)
+    total = sum(loads)
+    shares = [spare * load / total if total else spare / len(loads) for load in loads]
+    processes = [1 + int(share) for share in shares]
+    # largest remainders first
+    remaining = jobs - sum(processes)
+    for index in sorted(range(len(loads)), key=lambda i: shares[i] - int(shares[i]), reverse=True)[:remaining]:
+        processes[index] += 1
+    return processes
+
+
+class _StyleTask:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, tool, desc, paths, load, build_command, env=None, config_file=None, cache=None):
+        """
+        :param load: Estimated cost of checking the paths, to allocate processes to the task.
+        :param build_command: Function of (paths, config file, processes) returning the command to run with Python.
+        """
+        self.tool = tool
+        self.desc = desc
+        self.paths = paths
+        self.load = load
+        self.build_command = build_command
+        self.processes = 1
+        self.env = env
+        self.config_file = config_file
+        self.cache = cache
+        self.durations = {}
+
+    def run(self):
+        start = timeit.default_timer()
+        command = self.build_command(self.paths, self.config_file, self.processes)
+        with span(self.tool, 'style', target=self.desc, paths=len(self.paths), processes=self.processes):
+            result = py_cmd(command, message="Running {} on {}...".format(self.tool, self.desc), env=self.env)
+        self.record_time(timeit.default_timer() - start)
+        if self.cache:
+            self.cache.update(find_python_files(self.paths), self.config_file, result)
+        return result
+
+    def record_time(self, elapsed):
+        counts = {path: _count_python_files(path) for path in self.paths}
+        total = sum(counts.values())
+        # only the durations of whole modules, the single files are estimated from them
+        self.durations = {path: elapsed * self.processes * count / total for path, count in counts.items()
+                          if os.path.isdir(path)}
+
+
+class _CrossFileTask(_StyleTask):  # pylint: disable=too-few-public-methods
+    """ The pylint checks which only see the files checked in the same process, e.g. duplicate-code, run once over
+    all the paths of a group rather than in each shard. """
+
+    def run(self):
+        files = find_python_files(self.paths) if self.cache else None
+        messages = self.cache.get_group(self.desc, files, self.config_file) if self.cache else None
+        if messages is not None:
+            return _CachedTask(self.tool, self.desc, messages, len(files)).run()
+        command = self.build_command(self.paths, self.config_file, self.processes)
+        with span(self.tool, 'style', target=self.desc, paths=len(self.paths), processes=self.processes):
+            result = py_cmd(command, message="Running {} on {}...".format(self.tool, self.desc), env=self.env)
+        if self.cache:
+            self.cache.update_group(self.desc, files, self.config_file, result)
+        return result
+
+
+class _CachedTask:  # pylint: disable=too-few-public-methods
+    """ The cached messages of the files which need no check. """
+
+    def __init__(self, tool, desc, messages, files_count):
+        self.tool = tool
+        self.desc = desc
+        self.messages = messages
+        self.files_count = files_count
+        self.cache = None
+        self.durations = {}
+
+    def run(self):
+        display("Using the cached {} results of {} files of {}.".format(self.tool, self.files_count, self.desc))
+        if not self.messages:
+            return CommandResultItem('', exit_code=0)
+        output = '\n'.join(self.messages).encode('utf-8')
+        exit_code = get_exit_code(self.tool, self.messages)
+        return CommandResultItem(output, exit_code=exit_code,
+                                 error=CalledProcessError(exit_code, '{} (cached)'.format(self.tool), output=output))
+
+
+def _select_paths(paths, config_file, cache=None, selected_files=None):
+    """ The paths which need a check and the cached messages of the other files.
+
+    A directory is replaced by the files which need a check, unless most of them do or their paths are too long for a
+    command line, in which case the whole directory is checked again.
+
+    :param selected_files: Set of the only files to check, e.g. the changed ones.
+    :returns: (paths, cached messages, number of cached files)
+    """
+    to_check, messages, cached_count = [], [], 0
+    for path in paths:
+        files = find_python_files([path])
+        stale, path_messages, path_cached_count = [], [], 0
+        for file_path in files:
+            if selected_files is not None and file_path not in selected_files:
+                continue
+            file_messages = cache.get(file_path, config_file) if cache else None
+            if file_messages is None:
+                stale.append(file_path)
+            else:
+                path_messages.extend(file_messages)
+                path_cached_count += 1
+        # only the selected files are checked, unless their paths do not fit in a command line
+        mostly_stale = selected_files is None and len(stale) * 2 > len(files)
+        if stale and (mostly_stale or sum(len(f) + 1 for f in stale) > MAX_STALE_PATHS_LENGTH):
+            to_check.append(path)
+            continue
+        to_check.extend(stale)
+        messages.extend(path_messages)
+        cached_count += path_cached_count
+    return to_check, messages, cached_count
+
+
+def _create_tasks(tool, groups, jobs, build_command, env=None, cache=None, selected_files=None,  # pylint: disable=too-many-locals
+                  split_cross_file=None):
+    """ Shard the paths of each group, e.g. modules and extensions, for `jobs` processes in total. The processes of
+    each task are allocated by `_run_tasks`, across the tasks of all the tools.
+
+    :param groups: List of (description, paths, config file).
+    :param build_command: Function of (paths, config file, processes) returning the command to run with Python.
+    :param cache: The StyleCache of the tool, to only check the files whose cached results are stale.
+    :param selected_files: Set of the only files to check.
+    :param split_cross_file: Function of the config file returning the command builders of the checks which need all
+        the paths of a group in the same process and of the other checks, or None if there is no such check. Used when
+        a group is sharded or only partly checked.
+    """
+    tasks = []
+    all_paths = {desc: paths for desc, paths, _ in groups}
+    if cache or selected_files is not None:
+        selected_groups = []
+        for desc, paths, config_file in groups:
+            paths, messages, cached_count = _select_paths(paths, config_file, cache, selected_files)
+            selected_groups.append((desc, paths, config_file))
+            if cached_count:
+                tasks.append(_CachedTask(tool, desc, messages, cached_count))
+        groups = selected_groups
+
+    durations = _load_durations().get(tool, {})
+    weights = get_path_weights([path for _, paths, _ in groups for path in paths], durations)
+    total_weight = sum(weights.values())
+    for desc, paths, config_file in groups:
+        group_weight = sum(weights[path] for path in paths)
+        shards = shard_paths(paths, max(1, round(jobs * group_weight / total_weight)), weights) if paths else []
+        shard_build_command = build_command
+        split = split_cross_file(config_file) if split_cross_file and all_paths[desc] else None
+        if split and (len(shards) > 1 or paths != all_paths[desc]):
+            cross_file_build_command, shard_build_command = split
+            # the longest task, started first
+            tasks.insert(0, _CrossFileTask(tool, '{} (cross-file checks)'.format(desc), all_paths[desc],
+                                           group_weight / max(1, len(shards)), cross_file_build_command,
+                                           env=env, config_file=config_file, cache=cache))
+        if not paths:
+            continue
+        logger.debug("Using config file: %s", config_file)
+        logger.debug("Running %s on %s:\n%s", tool, desc, "\n".join(paths))
+        for index, (shard, load) in enumerate(shards):
+            shard_desc = desc if len(shards) == 1 else '{} (shard {}/{})'.format(desc, index + 1, len(shards))
+            tasks.append(_StyleTask(tool, shard_desc, shard, load, shard_build_command,
+                                    env=env, config_file=config_file, cache=cache))
+    return tasks
+
+
+def _run_tasks(tasks, jobs):
+    """ Run the tasks concurrently, with `jobs` processes in total, and combine the results of each tool. """
+    if not tasks:
+        return {}
+    # the heavier the shard, the more processes the tool gets to check it, across the tasks of all tools
+    style_tasks = [task for task in tasks if isinstance(task, _StyleTask)]
+    for task, processes in zip(style_tasks, allocate_processes([task.load for task in style_tasks], jobs)):
+        task.processes = processes
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(tasks)))) as executor:
+        results = list(executor.map(lambda task: task.run(), tasks))
+
+    combined = {}
+    for tool in {task.tool for task in tasks}:
+        tool_tasks = [task for task in tasks if task.tool == tool]
+        durations = {}
+        for task in tool_tasks:
+            durations.update(task.durations)
+        if durations:
+            _record_durations(tool, durations)
+        for cache in {task.cache for task in tool_tasks if task.cache}:
+            cache.save()
+        combined[tool] = _combine_command_result(*[r for r, t in zip(results, tasks) if t.tool == tool])
+    return combined
+
+
+def _create_cache(tool, build_command, files=None, search_files=None):
+    """ The result cache of the tool, whose keys cover the files imported by each file in `files`, if given, among
+    these files and the search files. """
+    options = '{}\n{}'.format(get_tool_version(tool), build_command([], '', 1))
+    graph = build_import_graph(files, search_files) if files is not None else None
+    return StyleCache(tool, options, graph=graph)
+
+
+def _sets_msg_template(rcfile):
+    try:
+        with open(rcfile, 'r', encoding='utf-8', errors='replace') as f:
+            return bool(PYLINT_MSG_TEMPLATE_OPTION_REGEX.search(f.read()))
+    except OSError:
+        return False
+
+
+def _get_cross_file_checks(rcfile, disable_all=False, enable=None):
+    """ The enabled pylint checks which only see the files checked in the same process. """
+    if disable_all:
+        return [check for check in PYLINT_CROSS_FILE_CHECKS if check in (enable or [])]
+    from configparser import ConfigParser, Error
+    config = ConfigParser(interpolation=None, strict=False)
+    try:
+        config.read(rcfile)
+    except Error:
+        return list(PYLINT_CROSS_FILE_CHECKS)
+    disabled = set()
+    for section in config.sections():
+        if section.lower() in ('messages control', 'master', 'main'):
+            disabled.update(c.strip() for c in re.split(r'[,\s]+', config.get(section, 'disable', fallback='')))
+    if 'all' in disabled:
+        return []
+    return [check for check, msg_id in PYLINT_CROSS_FILE_CHECKS.items() if not {check, msg_id} & disabled]
+
+
+def _get_all_module_files():
+    """ The Python files of all the modules and extensions, checked or not. """
+    all_modules = get_path_table()
+    return find_python_files([path for key in ('core', 'mod', 'ext') for path in all_modules[key].values()])
+
+
+def _pylint_tasks(modules, jobs, checkers=None, env=None, disable_all=False, enable=None,  # pylint: disable=too-many-locals
+                  use_cache=False, changed_files=None):
     def get_core_module_paths(modules):
         core_paths = []
         for p in modules["core"].values():
@@ -143,52 +489,82 @@ def run_pylint(modules, checkers=None, env=None, disable_all=False, enable=None)
         glob_pattern = os.path.normcase(os.path.join("{}*".format(EXTENSION_PREFIX)))
         ext_paths.append(glob(os.path.join(path, glob_pattern))[0])
 
-    def run(paths, rcfile, desc, checkers=None, env=None, disable_all=False, enable=None):
-        if not paths:
-            return None
-        logger.debug("Using rcfile file: %s", rcfile)
-        logger.debug("Running on %s: %s", desc, "\n".join(paths))
-        command = "pylint {} --rcfile={} --jobs {}".format(
-            " ".join(paths), rcfile, multiprocessing.cpu_count()
-        )
+    cli_pylintrc, ext_pylintrc = _config_file_path("pylint")
+    groups = [("modules", cli_paths, cli_pylintrc), ("extensions", ext_paths, ext_pylintrc)]
+
+    custom_templates = [rcfile for rcfile in (cli_pylintrc, ext_pylintrc) if _sets_msg_template(rcfile)]
+    if use_cache and custom_templates:
+        # the cache needs to map the messages to the checked files
+        logger.warning('Not caching the pylint results, as %s sets its own msg-template.', custom_templates[0])
+        use_cache = False
+
+    def build_command(paths, rcfile, processes, disable=None):
+        command = "pylint {} --rcfile={} --jobs {}".format(" ".join(paths), rcfile, processes)
+        if use_cache:
+            command += " --msg-template=\"{}\"".format(PYLINT_MSG_TEMPLATE)
         if checkers is not None:
             command += ' --load-plugins {}'.format(",".join(checkers))
         if disable_all:
             command += ' --disable=all'
         if enable is not None:
             command += ' --enable {}'.format(",".join(enable))
+        if disable:
+            command += ' --disable={}'.format(",".join(disable))
+        return command
 
-        return py_cmd(command, message="Running pylint on {}...".format(desc), env=env)
+    def split_cross_file(rcfile):
+        checks = _get_cross_file_checks(rcfile, disable_all, enable)
+        if not checks:
+            return None
 
-    cli_pylintrc, ext_pylintrc = _config_file_path("pylint")
+        def build_cross_file_command(paths, rcfile, processes):
+            command = "pylint {} --rcfile={} --jobs {} --disable=all --enable={}".format(
+                " ".join(paths), rcfile, processes, ",".join(checks))
+            if use_cache:
+                command += " --msg-template=\"{}\"".format(PYLINT_MSG_TEMPLATE)
+            return command
 
-    cli_result = run(cli_paths, cli_pylintrc, "modules",
-                     checkers=checkers, env=env, disable_all=disable_all, enable=enable)
-    ext_result = run(ext_paths, ext_pylintrc, "extensions",
-                     checkers=checkers, env=env, disable_all=disable_all, enable=enable)
-    return _combine_command_result(cli_result, ext_result)
+        def build_shard_command(paths, rcfile, processes):
+            return build_command(paths, rcfile, processes, disable=checks)
 
+        return build_cross_file_command, build_shard_command
 
-def _run_pep8(modules):
+    cache = selected_files = None
+    if use_cache or changed_files is not None:
+        files = find_python_files(cli_paths + ext_paths)
+        # a change to a module which is not checked, e.g. azure-cli-core, invalidates the results of its dependents
+        cache = _create_cache(PYLINT, build_command, files, _get_all_module_files()) if use_cache else None
+        if changed_files is not None:
+            # pylint infers across modules, so the files importing a changed file are checked too
+            selected_files = get_dependents(cache.graph if cache else build_import_graph(files),
+                                            set(files) & set(changed_files))
+    return _create_tasks(PYLINT, groups, jobs, build_command, env=env, cache=cache, selected_files=selected_files,
+                         split_cross_file=split_cross_file)
 
+
+def _pep8_tasks(modules, jobs, use_cache=False, changed_files=None):
     cli_paths = list(modules["core"].values()) + list(modules["mod"].values())
     ext_paths = list(modules["ext"].values())
 
-    def run(paths, rcfile, desc):
-        if not paths:
-            return None
-        logger.debug("Using config file: %s", rcfile)
-        logger.debug("Running on %s:\n%s", desc, "\n".join(paths))
-        command = "flake8 --statistics --append-config={} {}".format(
-            rcfile, " ".join(paths)
-        )
-        return py_cmd(command, message="Running flake8 on {}...".format(desc))
+    def build_command(paths, config_file, processes):
+        return "flake8 --statistics --jobs {} --append-config={} {}".format(processes, config_file, " ".join(paths))
 
     cli_config, ext_config = _config_file_path("flake8")
+    groups = [("modules", cli_paths, cli_config), ("extensions", ext_paths, ext_config)]
+    cache = _create_cache(FLAKE8, build_command) if use_cache else None
+    selected_files = set(changed_files) if changed_files is not None else None
+    return _create_tasks(FLAKE8, groups, jobs, build_command, cache=cache, selected_files=selected_files)
+
+
+def run_pylint(modules, checkers=None, env=None, disable_all=False, enable=None, jobs=None):
+    jobs = jobs or multiprocessing.cpu_count()
+    tasks = _pylint_tasks(modules, jobs, checkers=checkers, env=env, disable_all=disable_all, enable=enable)
+    return _run_tasks(tasks, jobs).get(PYLINT, _combine_command_result())
+
 
-    cli_result = run(cli_paths, cli_config, "modules")
-    ext_result = run(ext_paths, ext_config, "extensions")
-    return _combine_command_result(cli_result, ext_result)
+def _run_pep8(modules, jobs=None):
+    jobs = jobs or multiprocessing.cpu_count()
+    return _run_tasks(_pep8_tasks(modules, jobs), jobs).get(FLAKE8, _combine_command_result())
 
 
 def _config_file_path(style_type="pylint"):
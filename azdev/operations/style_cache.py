@@ -0,0 +1,349 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Per-file cache of the pylint and flake8 messages of `azdev style`.
+
+A file is checked again only when its content, the config file, the options or the version of the tool changed. As
+pylint infers across modules, the pylint key of a file also covers the checked files it imports, directly or not:
+editing a module invalidates the cached results of its dependents.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+from knack.log import get_logger
+
+from azdev.utilities import get_azdev_config_dir, py_cmd, walk_files
+
+logger = get_logger(__name__)
+
+CACHE_DIR = 'style_cache'
+MESSAGE_REGEX = re.compile(r'^(?P<path>.+?\.py):\d+:\d+: ')
+PYLINT_CATEGORY_REGEX = re.compile(r': (?P<category>[FEWRCI])\d{4}: ')
+# pylint exit code bits of each message category
+PYLINT_CATEGORY_BITS = {'F': 1, 'E': 2, 'W': 4, 'R': 8, 'C': 16}
+IMPORT_REGEX = re.compile(
+    r'^[ \t]*(?:from[ \t]+(?P<from>\.*[\w.]*)[ \t]+import[ \t]+(?:\((?P<names>[^)]*)\)|(?P<line>[^\n#]*))'
+    r'|import[ \t]+(?P<modules>[^\n#]*))', re.MULTILINE)
+
+
+def _sha256(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(value if isinstance(value, bytes) else str(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def find_python_files(paths):
+    """ The absolute paths of the Python files of the given files and directories. """
+    files = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        files.extend(walk_files(path, patterns='*.py', ignore_dirs=['.*', '__pycache__']))
+    return sorted(set(files))
+
+
+def _module_name(path):
+    """ The dotted name of the module, up to the first parent directory which is not a package. """
+    directory, name = os.path.split(path)
+    parts = [] if name == '__init__.py' else [os.path.splitext(name)[0]]
+    while os.path.isfile(os.path.join(directory, '__init__.py')):
+        directory, package = os.path.split(directory)
+        parts.insert(0, package)
+    return '.'.join(parts)
+
+
+def _imported_names(content, module_name, is_package):
+    names = set()
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    for match in IMPORT_REGEX.finditer(content):
+        if match.group('modules'):
+            names.update(m.split(' as ')[0].strip() for m in match.group('modules').split(','))
+            continue
+        base = match.group('from')
+        if base.startswith('.'):
+            level = len(base) - len(base.lstrip('.'))
+            parent = package.split('.')
+            parent = parent[:len(parent) - level + 1] if level > 1 else parent
+            base = '.'.join([p for p in parent if p] + ([base.lstrip('.')] if base.lstrip('.') else []))
+        names.add(base)
+        # `from package import module` imports a submodule
+        for name in re.sub(r'#.*', '', match.group('names') or match.group('line') or '').split(','):
+            name = name.split(' as ')[0].strip()
+            if name and name != '*':
+                names.add('{}.{}'.format(base, name))
+    return names
+
+
+def build_import_graph(files, search_files=None):
+    """ The files each file imports, among the given files and the search files, e.g. of the modules which are not
+    checked. The search files imported by the given files, directly or not, are nodes of the graph too. """
+    modules = {}
+    for path in list(search_files or []) + list(files):
+        modules[_module_name(path)] = path
+
+    def resolve(name):
+        # the module names may lack the leading namespace packages, e.g. `azure` in `azure.cli`
+        parts = name.split('.')
+        for index in range(len(parts)):
+            path = modules.get('.'.join(parts[index:]))
+            if path:
+                return path
+        return None
+
+    graph = {}
+    pending = list(files)
+    while pending:
+        path = pending.pop()
+        if path in graph:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError:
+            content = ''
+        module_name = _module_name(path)
+        imported = {resolve(name) for name in _imported_names(content, module_name, path.endswith('__init__.py'))}
+        graph[path] = {dep for dep in imported if dep and dep != path}
+        pending.extend(dep for dep in graph[path] if dep not in graph)
+    return graph
+
+
+def _strongly_connected_components(graph):
+    """ Tarjan's algorithm. A component is returned after the components it depends on. """
+    index, lowlink = {}, {}
+    stack, on_stack = [], set()
+    components = []
+
+    def pop_component(node):
+        component = []
+        while True:
+            member = stack.pop()
+            on_stack.discard(member)
+            component.append(member)
+            if member == node:
+                return component
+
+    for root in sorted(graph):
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(sorted(graph[root])))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(sorted(graph[successor]))))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    components.append(pop_component(node))
+    return components
+
+
+def get_dependency_keys(graph, file_hashes):
+    """ A key of each file which changes when the file or any file it imports, directly or not, changes. """
+    component_keys = {}
+    for component in _strongly_connected_components(graph):
+        members = set(component)
+        dependencies = sorted({dep for member in component for dep in graph[member]} - members)
+        key = _sha256(*([file_hashes[member] for member in sorted(component)] +
+                        [component_keys[dep] for dep in dependencies]))
+        for member in component:
+            component_keys[member] = key
+    return {path: _sha256(file_hashes[path], key) for path, key in component_keys.items()}
+
+
+def get_dependents(graph, files):
+    """ The files which import any of the given files, directly or not, the given files included. """
+    reverse = {}
+    for path, dependencies in graph.items():
+        for dep in dependencies:
+            reverse.setdefault(dep, set()).add(path)
+    result = set(files)
+    pending = list(files)
+    while pending:
+        for dependent in reverse.get(pending.pop(), ()):
+            if dependent not in result:
+                result.add(dependent)
+                pending.append(dependent)
+    return result
+
+
+def parse_messages(output):
+    """ The message lines of the pylint or flake8 output, grouped by absolute file path. """
+    messages = {}
+    for line in output.splitlines():
+        match = MESSAGE_REGEX.match(line)
+        if match:
+            messages.setdefault(os.path.abspath(match.group('path')), []).append(line)
+    return messages
+
+
+def get_exit_code(tool, lines):
+    """ The exit code the tool returns for these messages. """
+    if not lines:
+        return 0
+    if tool != 'pylint':
+        return 1
+    exit_code = 0
+    for line in lines:
+        match = PYLINT_CATEGORY_REGEX.search(line)
+        if match:
+            exit_code |= PYLINT_CATEGORY_BITS.get(match.group('category'), 0)
+    return exit_code or 1
+
+
+def get_tool_version(tool):
+    result = py_cmd('{} --version'.format(tool))
+    output = result.result.decode('utf-8') if isinstance(result.result, bytes) else result.result
+    return output or ''
+
+
+class StyleCache:
+
+    def __init__(self, tool, options, graph=None):
+        """
+        :param tool: pylint or flake8.
+        :param options: Command line options of the tool, the version of the tool included.
+        :param graph: The import graph of the checked files, to invalidate the dependents of changed files.
+        """
+        self.tool = tool
+        self.options = options
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._config_hashes = {}
+        self._file_keys = None
+        try:
+            with open(self.get_path(), 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get_path(self):
+        return os.path.join(get_azdev_config_dir(), CACHE_DIR, '{}.json'.format(self.tool))
+
+    def _config_hash(self, config_file):
+        if config_file not in self._config_hashes:
+            try:
+                with open(config_file, 'rb') as f:
+                    self._config_hashes[config_file] = _sha256(f.read())
+            except OSError:
+                self._config_hashes[config_file] = None
+        return self._config_hashes[config_file]
+
+    def _file_key(self, path):
+        if self._file_keys is None:
+            files = set(self.graph) if self.graph is not None else set()
+            hashes = {}
+            for file_path in files:
+                try:
+                    with open(file_path, 'rb') as f:
+                        hashes[file_path] = _sha256(f.read())
+                except OSError:
+                    hashes[file_path] = None
+            self._file_keys = get_dependency_keys(self.graph, hashes) if self.graph is not None else {}
+        if path not in self._file_keys:
+            with open(path, 'rb') as f:
+                self._file_keys[path] = _sha256(f.read())
+        return self._file_keys[path]
+
+    def key(self, path, config_file):
+        return _sha256(self._file_key(path), self._config_hash(config_file), self.options)
+
+    def get(self, path, config_file):
+        """ The cached messages of the file, None if it has to be checked. """
+        entry = self.entries.get(path)
+        try:
+            if entry and entry['key'] == self.key(path, config_file):
+                return entry['messages']
+        except OSError:
+            pass
+        return None
+
+    def _is_complete(self, exit_code, messages):
+        if self.tool == 'pylint':
+            # fatal messages or usage error
+            return not exit_code & 33
+        # flake8 exits with 1 on violations but also on errors
+        return exit_code == 0 or bool(messages)
+
+    def _parse_result(self, files, result):
+        """ The messages of the result grouped by file, None if the tool failed to check the files. """
+        output = result.error.output if result.error else result.result
+        output = output.decode('utf-8', errors='replace') if isinstance(output, bytes) else (output or '')
+        messages = parse_messages(output)
+        if not self._is_complete(result.exit_code, messages):
+            logger.debug('Not caching the %s results of %d files.', self.tool, len(files))
+            return None
+        return messages
+
+    def group_key(self, files, config_file):
+        return _sha256(*([self._file_key(path) for path in sorted(files)] + [self._config_hash(config_file),
+                                                                             self.options]))
+
+    def get_group(self, name, files, config_file):
+        """ The cached messages of a check of all the files together, e.g. for duplicate code, None if it has to be
+        run. """
+        entry = self.entries.get(name)
+        try:
+            if entry and entry['key'] == self.group_key(files, config_file):
+                return entry['messages']
+        except OSError:
+            pass
+        return None
+
+    def update_group(self, name, files, config_file, result):
+        messages = self._parse_result(files, result)
+        if messages is None:
+            return
+        with self._lock:
+            try:
+                self.entries[name] = {'key': self.group_key(files, config_file),
+                                      'messages': [line for lines in messages.values() for line in lines]}
+            except OSError:
+                self.entries.pop(name, None)
+
+    def update(self, files, config_file, result):
+        """ Cache the messages of the checked files, unless the tool failed to check them. """
+        messages = self._parse_result(files, result)
+        if messages is None:
+            return
+        with self._lock:
+            for path in files:
+                try:
+                    self.entries[path] = {'key': self.key(path, config_file), 'messages': messages.get(path, [])}
+                except OSError:
+                    self.entries.pop(path, None)
+
+    def save(self):
+        path = self.get_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            logger.warning('Unable to save the %s result cache: %s', self.tool, ex)
@@ -13,6 +13,8 @@ from knack.util import CLIError
 from ..performance import (
     _benchmark_cmd_staticstic,
     _benchmark_load_all_commands,
+    _benchmark_percentile,
+    _benchmark_reject_outliers,
     benchmark,
 )
 
@@ -65,6 +67,35 @@ class TestBenchmarkStatistics(TestCase):
         with self.assertRaises(IndexError):
             _benchmark_cmd_staticstic([])
 
+    def test_percentiles(self):
+        data = [float(i) for i in range(1, 11)]
+
+        self.assertEqual(_benchmark_percentile(data, 0), 1)
+        self.assertEqual(_benchmark_percentile(data, 50), 5.5)
+        self.assertAlmostEqual(_benchmark_percentile(data, 90), 9.1)
+        self.assertEqual(_benchmark_percentile(data, 100), 10)
+
+        stats = _benchmark_cmd_staticstic(data)
+        self.assertEqual(stats["P50"], stats["Media"])
+        self.assertEqual(stats["P90"], 9.1)
+        self.assertEqual(stats["P99"], 9.91)
+
+    def test_confidence_interval(self):
+        stats = _benchmark_cmd_staticstic([1.0, 2.0, 3.0, 4.0, 5.0])
+        # t(0.975, 4) * sample std / sqrt(n)
+        self.assertEqual(stats["CI95"], round(2.776 * sqrt(2.5) / sqrt(5), 4))
+
+        self.assertEqual(_benchmark_cmd_staticstic([1.0])["CI95"], 0)
+
+    def test_reject_outliers(self):
+        kept, outliers = _benchmark_reject_outliers([1.0, 1.1, 0.9, 1.05, 0.95, 5.0])
+        self.assertEqual(outliers, 1)
+        self.assertNotIn(5.0, kept)
+
+        kept, outliers = _benchmark_reject_outliers([1.0, 5.0, 9.0])
+        self.assertEqual(outliers, 0)
+        self.assertEqual(kept, [1.0, 5.0, 9.0])
+
 
 class TestBenchmarkCommands(TestCase):
     def test_load_all_commands_ok(self):
@@ -124,6 +155,10 @@ class TestBenchmark(TestCase):
         with self.assertRaisesRegex(CLIError, "Number of runs must be greater than 0."):
             benchmark([], 0)
 
+    def test_benchmark_with_zero_concurrency(self):
+        with self.assertRaisesRegex(CLIError, "Concurrency must be greater than 0."):
+            benchmark(["version"], concurrency=0)
+
     # def test_benchmark_commands_size_with_empty_input(self):
     #     """
     #     Empty commands would fetch all commands from commmand table.
@@ -0,0 +1,33 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import random
+from unittest import mock, TestCase
+
+from ..performance.ab import BASE, HEAD, _interleave, _use_env
+
+
+class TestPerfAB(TestCase):
+
+    def test_interleave(self):
+        schedule = _interleave(['version', 'find'], 10, random.Random(0))
+        self.assertEqual(len(schedule), 40)
+        # each command runs once on each side in every round
+        for i in range(0, len(schedule), 2):
+            pair = schedule[i:i + 2]
+            self.assertEqual(pair[0][0], pair[1][0])
+            self.assertEqual({side for _, side in pair}, {BASE, HEAD})
+        # the order within the rounds is randomized
+        self.assertEqual(len({tuple(schedule[i:i + 2]) for i in range(0, len(schedule), 2)}), 4)
+
+    def test_use_env(self):
+        with mock.patch.dict(os.environ, {'VIRTUAL_ENV': '/env/current', 'CONDA_PREFIX': '/env/conda'}):
+            with _use_env('/env/base'):
+                self.assertEqual(os.environ['VIRTUAL_ENV'], '/env/base')
+                self.assertNotIn('CONDA_PREFIX', os.environ)
+            self.assertEqual(os.environ['VIRTUAL_ENV'], '/env/current')
+            self.assertEqual(os.environ['CONDA_PREFIX'], '/env/conda')
@@ -0,0 +1,63 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import configparser
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from unittest import mock, TestCase
+
+from ..performance.extension_load import isolated_extensions, rank_extensions
+
+
+class TestExtensionLoad(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_dir = os.path.join(self.temp_dir, 'azure')
+        self.ext_path = os.path.join(self.temp_dir, 'azure-cli-extensions', 'src', 'contoso')
+        os.makedirs(self.config_dir)
+        os.makedirs(self.ext_path)
+        with open(os.path.join(self.config_dir, 'config'), 'w') as f:
+            f.write('[extension]\ndev_sources = /other/extensions\n\n[core]\noutput = table\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_isolated_extensions(self):
+        with mock.patch.dict(os.environ, {'AZURE_CONFIG_DIR': self.config_dir}):
+            with isolated_extensions(self.ext_path) as config_dir:
+                self.assertEqual(os.environ['AZURE_CONFIG_DIR'], config_dir)
+                self.assertEqual(os.environ['AZURE_EXTENSION_DIR'], os.path.join(config_dir, 'cliextensions'))
+                config = configparser.ConfigParser()
+                config.read(os.path.join(config_dir, 'config'))
+                self.assertEqual(config.get('core', 'output'), 'table')
+                dev_sources = config.get('extension', 'dev_sources')
+                self.assertEqual(os.listdir(dev_sources), ['contoso'])
+                self.assertEqual(os.path.realpath(os.path.join(dev_sources, 'contoso')),
+                                 os.path.realpath(self.ext_path))
+
+            self.assertEqual(os.environ['AZURE_CONFIG_DIR'], self.config_dir)
+            self.assertNotIn('AZURE_EXTENSION_DIR', os.environ)
+            self.assertFalse(os.path.exists(config_dir))
+
+            with isolated_extensions() as config_dir:
+                config = configparser.ConfigParser()
+                config.read(os.path.join(config_dir, 'config'))
+                self.assertEqual(os.listdir(config.get('extension', 'dev_sources')), [])
+
+    def test_rank_extensions(self):
+        baseline = (OrderedDict([('-h', 1.0), ('version', 0.5)]), 80.0)
+        measurements = {
+            'cheap': (OrderedDict([('-h', 1.01), ('version', 0.5)]), 81.0),
+            'expensive': (OrderedDict([('-h', 1.5), ('version', 0.9)]), 120.0),
+        }
+        result = rank_extensions(baseline, measurements)
+        self.assertEqual([item['Extension'] for item in result], ['expensive', 'cheap'])
+        self.assertEqual(result[0]['Added `-h` (s)'], 0.5)
+        self.assertEqual(result[0]['Added `version` (s)'], 0.4)
+        self.assertEqual(result[0]['Added memory (MB)'], 40.0)
@@ -0,0 +1,59 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+from unittest import mock, TestCase
+
+from ..performance.history import compare_samples, load_samples, mann_whitney_u, record_samples
+
+
+class TestPerfHistory(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'perf_history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_and_load_samples(self):
+        with mock.patch('azdev.operations.performance.history.get_cli_commit', return_value='abc123'):
+            record_samples('benchmark', {'version': [1.0, 1.1], 'find': []}, db_path=self.db_path)
+            record_samples('benchmark', {'version': [1.2]}, db_path=self.db_path)
+            record_samples('load-time', {'ALL': [300.0]}, db_path=self.db_path)
+        with mock.patch('azdev.operations.performance.history.get_cli_commit', return_value='def456'):
+            record_samples('benchmark', {'version': [2.0]}, db_path=self.db_path)
+
+        self.assertEqual(load_samples('benchmark', 'abc', db_path=self.db_path), {'version': [1.0, 1.1, 1.2]})
+        self.assertEqual(load_samples('benchmark', 'def456', db_path=self.db_path), {'version': [2.0]})
+        self.assertEqual(load_samples('benchmark', 'abc', machine='other', db_path=self.db_path), {})
+        self.assertEqual(len(load_samples('load-time', '2000-01-01', db_path=self.db_path)), 0)
+
+    def test_mann_whitney_u(self):
+        u, p_value = mann_whitney_u([1.0, 2.0, 3.0, 4.0, 5.0], [6.0, 7.0, 8.0, 9.0, 10.0])
+        self.assertEqual(u, 25)
+        self.assertLess(p_value, 0.05)
+
+        _, p_value = mann_whitney_u([1.0, 1.0, 1.0], [1.0, 1.0, 1.0])
+        self.assertEqual(p_value, 1.0)
+
+    def test_compare_samples(self):
+        base = {
+            'version': [1.0, 1.02, 0.98, 1.01, 0.99, 1.0, 1.03, 0.97],
+            'find': [2.0, 2.1, 1.9, 2.05, 1.95, 2.0, 2.02, 1.98],
+            'removed': [1.0],
+        }
+        head = {
+            'version': [1.3, 1.32, 1.28, 1.31, 1.29, 1.3, 1.33, 1.27],
+            'find': [2.01, 2.08, 1.92, 2.04, 1.96, 2.0, 2.03, 1.97],
+        }
+        result = {item['Command']: item for item in compare_samples(base, head)}
+        self.assertEqual(set(result), {'version', 'find'})
+        self.assertEqual(result['version']['Status'], 'regression')
+        self.assertEqual(result['find']['Status'], 'unchanged')
+        self.assertEqual(compare_samples(head, base)[1]['Status'], 'improvement')
@@ -0,0 +1,55 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from ..performance.import_time import get_import_group, parse_import_time, summarize_import_time
+
+IMPORT_TIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   encodings.aliases
+import time:       200 |        300 | encodings
+Some help text from az -h
+import time:      1000 |       1000 |       azure.mgmt.compute.models
+import time:       500 |       1500 |     azure.mgmt.compute
+import time:       300 |       1800 |   azure.cli.command_modules.vm._validators
+import time:       200 |        200 |     azure.cli.core.profiles
+import time:       100 |        300 |   azure.cli.core.commands
+import time:       400 |       2500 | azure.cli.command_modules.vm
+"""
+
+
+class TestImportTime(TestCase):
+
+    def test_parse_import_time(self):
+        roots = parse_import_time(IMPORT_TIME_OUTPUT.splitlines())
+        self.assertEqual([root.name for root in roots], ['encodings', 'azure.cli.command_modules.vm'])
+        self.assertEqual([child.name for child in roots[1].children],
+                         ['azure.cli.command_modules.vm._validators', 'azure.cli.core.commands'])
+        sdk = roots[1].children[0].children[0]
+        self.assertEqual((sdk.name, sdk.self_us, sdk.cumulative_us), ('azure.mgmt.compute', 500, 1500))
+        self.assertEqual(sdk.children[0].parent, sdk)
+
+    def test_get_import_group(self):
+        self.assertEqual(get_import_group('azure.cli.command_modules.vm._validators'), 'azure.cli.command_modules.vm')
+        self.assertEqual(get_import_group('azure.mgmt.compute.v2023_01_01.models'), 'azure.mgmt.compute')
+        self.assertEqual(get_import_group('azure.cli.core.commands'), 'azure.cli.core')
+        self.assertEqual(get_import_group('azure.core.pipeline'), 'azure.core')
+        self.assertEqual(get_import_group('azext_containerapp.custom'), 'azext_containerapp')
+        self.assertEqual(get_import_group('requests.adapters'), 'requests')
+
+    def test_summarize_import_time(self):
+        groups, eager_mgmt_imports = summarize_import_time(parse_import_time(IMPORT_TIME_OUTPUT.splitlines()))
+        expected = {
+            'azure.cli.command_modules.vm': (0.7, 2.5),
+            'azure.mgmt.compute': (1.5, 1.5),
+            'azure.cli.core': (0.3, 0.3),
+            'encodings': (0.3, 0.3),
+        }
+        self.assertEqual(set(groups), set(expected))
+        for group, (self_ms, cumulative_ms) in expected.items():
+            self.assertAlmostEqual(groups[group]['self'], self_ms)
+            self.assertAlmostEqual(groups[group]['cumulative'], cumulative_ms)
+        self.assertEqual(eager_mgmt_imports, {'azure.mgmt.compute': {'azure.cli.command_modules.vm'}})
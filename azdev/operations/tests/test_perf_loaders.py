@@ -0,0 +1,59 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from knack.util import CLIError
+
+from ..performance.loaders import ARGUMENTS, COMMAND_TABLE, TOTAL, check_budgets, load_budgets, summarize_samples
+
+
+class TestPerfLoaders(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_summarize_samples(self):
+        samples = [
+            [{'vm': {COMMAND_TABLE: 40.0, ARGUMENTS: 20.0}, 'azext_ml': {COMMAND_TABLE: 10.0}},
+             {'vm': {COMMAND_TABLE: 4.0, ARGUMENTS: 2.0}, 'azext_ml': {COMMAND_TABLE: 1.0}}],
+            [{'vm': {COMMAND_TABLE: 60.0, ARGUMENTS: 30.0}, 'azext_ml': {COMMAND_TABLE: 20.0}},
+             {'vm': {COMMAND_TABLE: 6.0, ARGUMENTS: 4.0}, 'azext_ml': {COMMAND_TABLE: 3.0}}],
+        ]
+        summary = summarize_samples(samples)
+        self.assertEqual(summary['vm']['cold'], {COMMAND_TABLE: 50.0, ARGUMENTS: 25.0})
+        self.assertEqual(summary['vm']['warm'], {COMMAND_TABLE: 5.0, ARGUMENTS: 3.0})
+        self.assertEqual(summary['azext_ml']['cold'], {COMMAND_TABLE: 15.0, ARGUMENTS: 0.0})
+        self.assertEqual(summary[TOTAL]['cold'], {COMMAND_TABLE: 65.0, ARGUMENTS: 25.0})
+        self.assertEqual(summary[TOTAL]['warm'], {COMMAND_TABLE: 7.0, ARGUMENTS: 3.0})
+
+    def test_check_budgets(self):
+        budgets_path = os.path.join(self.temp_dir, 'budgets.yml')
+        with open(budgets_path, 'w') as f:
+            f.write('default: 20\ntotal: 100\nmodules:\n  vm: 60\n')
+        budgets = load_budgets(budgets_path)
+        self.assertEqual(budgets, (20, 100, {'vm': 60}))
+
+        summary = {
+            'vm': {'cold': {COMMAND_TABLE: 50.0}},
+            'network': {'cold': {COMMAND_TABLE: 30.0}},
+            'azext_ml': {'cold': {COMMAND_TABLE: 10.0}},
+            TOTAL: {'cold': {COMMAND_TABLE: 90.0}},
+        }
+        limits, failed = check_budgets(summary, budgets)
+        self.assertEqual(limits, {'vm': 60, 'network': 20, 'azext_ml': 20, TOTAL: 100})
+        self.assertEqual(failed, ['network'])
+
+    def test_default_budgets(self):
+        self.assertEqual(load_budgets(), (10, 300, {}))
+        with self.assertRaises(CLIError):
+            load_budgets(os.path.join(self.temp_dir, 'missing.yml'))
@@ -0,0 +1,42 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+from unittest import mock, TestCase, skipIf
+
+from ..performance.memory import _module_name, _peak_rss, group_allocations
+
+
+class TestPerfMemory(TestCase):
+
+    def test_module_name(self):
+        sys_path = [os.path.join(os.sep, 'env', 'lib'), os.path.join(os.sep, 'env', 'lib', 'site-packages')]
+        site_packages = sys_path[1]
+        self.assertEqual(_module_name(os.path.join(site_packages, 'azure', 'mgmt', 'compute', 'models.py'), sys_path),
+                         'azure.mgmt.compute.models')
+        self.assertEqual(_module_name(os.path.join(site_packages, 'knack', '__init__.py'), sys_path), 'knack')
+        self.assertIsNone(_module_name('<frozen importlib._bootstrap>', sys_path))
+
+    def test_group_allocations(self):
+        site_packages = os.path.join(os.sep, 'env', 'site-packages')
+        files = [
+            (os.path.join(site_packages, 'azure', 'mgmt', 'compute', 'models.py'), 2048, 10),
+            (os.path.join(site_packages, 'azure', 'mgmt', 'compute', 'operations.py'), 1024, 5),
+            (os.path.join(site_packages, 'knack', 'cli.py'), 4096, 1),
+            ('<frozen importlib._bootstrap>', 512, 2),
+        ]
+        self.assertEqual(group_allocations(files, [site_packages]), [
+            {'Module': 'knack', 'Size (KB)': 4.0, 'Count': 1},
+            {'Module': 'azure.mgmt.compute', 'Size (KB)': 3.0, 'Count': 15},
+            {'Module': '<frozen importlib._bootstrap>', 'Size (KB)': 0.5, 'Count': 2},
+        ])
+
+    @skipIf(sys.platform == 'win32', 'requires os.wait4')
+    def test_peak_rss(self):
+        # the hook exits when azure.cli.core cannot be imported, the interpreter alone takes a few MB
+        with mock.patch('azdev.operations.performance.memory.get_env_path', return_value=None):
+            self.assertGreater(_peak_rss('version'), 1)
@@ -0,0 +1,53 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from ..performance.phases import PHASES, TOTAL_PHASE, compute_phases, summarize_phases
+
+
+class TestPerfPhases(TestCase):
+
+    def test_compute_phases(self):
+        marks = [
+            ('spawn', 0.0),
+            ('start', 0.05),
+            ('core_imported', 0.15),
+            ('Cli.PreExecute', 0.16),
+            ('CommandInvoker.OnPreCommandTableCreate', 0.2),
+            ('CommandInvoker.OnPreLoadArguments', 0.5),
+            ('CommandInvoker.OnPostLoadArguments', 0.6),
+            ('CommandInvoker.OnPreParseArgs', 0.65),
+            ('CommandInvoker.OnPreParseArgs', 0.9),
+            # `--help` exits while parsing
+            ('invoke_end', 0.8),
+            ('exit', 0.85),
+        ]
+        phases = compute_phases(marks, index_time=0.1)
+        self.assertEqual(list(phases), PHASES + [TOTAL_PHASE])
+        expected = {
+            'Interpreter startup': 0.05,
+            'Import azure.cli.core': 0.1,
+            'CLI initialization': 0.05,
+            'Command index': 0.1,
+            'Load command table': 0.2,
+            'Load arguments': 0.1,
+            'Build parser': 0.05,
+            'Parse arguments': 0.15,
+            'Execute': 0,
+            'Output': 0,
+            'Exit': 0.05,
+            TOTAL_PHASE: 0.85,
+        }
+        for phase, duration in expected.items():
+            self.assertAlmostEqual(phases[phase], duration)
+
+    def test_summarize_phases(self):
+        marks = [('spawn', 0.0), ('start', 0.1), ('exit', 0.2)]
+        series = [compute_phases(marks), compute_phases([('spawn', 0.0), ('start', 0.3), ('exit', 0.3)])]
+        summary = summarize_phases(series)
+        self.assertAlmostEqual(summary['Interpreter startup'], 0.2)
+        self.assertAlmostEqual(summary['Import azure.cli.core'], 0.05)
@@ -0,0 +1,50 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import cProfile
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from ..performance.profiling import _file_prefix, get_top_cumulative
+
+
+def _outer():
+    return sum(_inner(i) for i in range(100))
+
+
+def _inner(i):
+    return i * 2
+
+
+class TestPerfProfiling(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_file_prefix(self):
+        self.assertEqual(_file_prefix(self.temp_dir, 'vm create -h'), os.path.join(self.temp_dir, 'vm_create_-h'))
+        self.assertEqual(_file_prefix(self.temp_dir, 'storage account list --query "[].name"'),
+                         os.path.join(self.temp_dir, 'storage_account_list_--query_.name'))
+
+    def test_get_top_cumulative(self):
+        stats_path = os.path.join(self.temp_dir, 'test.pstats')
+        profiler = cProfile.Profile()
+        profiler.runcall(_outer)
+        profiler.dump_stats(stats_path)
+
+        self.assertEqual(len(get_top_cumulative(stats_path, top=3)), 3)
+        functions = get_top_cumulative(stats_path, top=0)
+        outer = [f for f in functions if f['Function'].startswith('_outer (test_perf_profiling.py:')]
+        self.assertEqual(len(outer), 1)
+        # its generator expression may tie with it once rounded
+        self.assertEqual(functions[0]['Cumulative'], outer[0]['Cumulative'])
+        self.assertEqual([f['Calls'] for f in functions if f['Function'].startswith('_inner ')], [100])
+        self.assertEqual(functions, sorted(functions, key=lambda f: f['Cumulative'], reverse=True))
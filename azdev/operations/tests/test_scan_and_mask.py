@@ -6,17 +6,29 @@
 
 import os
 import json
+import shutil
 import tempfile
 import unittest
 from unittest import mock
 
 from microsoft_security_utilities_secret_masker import RegexPattern
-from azdev.operations.secret import scan_secrets, mask_secrets
+from azdev.operations.secret import (scan_secrets, mask_secrets, _load_regex_patterns, _scan_secrets_for_string,
+                                     _mask_file, _mask_string)
 from azdev.utilities.config import get_azdev_config_dir
 
 
 # pylint: disable=line-too-long, anomalous-backslash-in-string
 class TestScanAndMaskSecrets(unittest.TestCase):
+    def setUp(self):
+        # keep the scan result cache and the saved results out of the user's .azdev directory
+        self.config_dir = tempfile.mkdtemp()
+        self.env_patch = mock.patch.dict(os.environ, {'AZDEV_CONFIG_DIR': self.config_dir})
+        self.env_patch.start()
+
+    def tearDown(self):
+        self.env_patch.stop()
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
     def test_scan_raw_string(self):
         test_data = "This is a test string without any secrets."
         result = scan_secrets(data=test_data)
@@ -61,6 +73,10 @@ class TestScanAndMaskSecrets(unittest.TestCase):
                 self.assertIn('scan_result_path', result)
                 result_folder = os.path.join(get_azdev_config_dir(), 'scan_results')
                 self.assertIn(result_folder, result['scan_result_path'])
+                # streamed by default
+                self.assertTrue(result['scan_result_path'].endswith('.ndjson'))
+                result = mask_secrets(data=test_data2, saved_scan_result_path=result['scan_result_path'], yes=True)
+                self.assertNotIn('a9Y5mpQgKUiiPzHFNdDm53Na6UndTrNMCsRZd6b2oV4%3D', result['data'])
             finally:
                 if result.get('scan_result_path', ''):
                     os.remove(result['scan_result_path'])
@@ -146,6 +162,212 @@ class TestScanAndMaskSecrets(unittest.TestCase):
         self.assertIn(email_string_file, result['scan_results'])
         self.assertNotIn(info_json_file, result['scan_results'])
 
+    def test_scan_directory_loads_patterns_once(self):
+        file_folder = os.path.join(os.path.dirname(__file__), 'files')
+        with mock.patch("azdev.operations.secret._load_regex_patterns", wraps=_load_regex_patterns) as load:
+            scan_secrets(directory_path=file_folder, recursive=True)
+        self.assertEqual(load.call_count, 1)
+
+        custom_pattern = {"Include": [{"Pattern": "(unbalanced", "Name": "Invalid"}]}
+        with self.assertRaisesRegex(ValueError, 'Invalid pattern Invalid'):
+            scan_secrets(directory_path=file_folder, custom_pattern=json.dumps(custom_pattern))
+
+    def test_scan_directory_with_jobs_streams_results(self):
+        custom_pattern = json.dumps({"Include": [{"Pattern": r"(?<refine>[\w.%#+-]+)(%40|@)([a-z0-9.-]*.[a-z]{2,})",
+                                                  "Name": "EmailAddress"}]})
+        tmpdir = tempfile.mkdtemp()
+        file_folder = os.path.join(tmpdir, 'files')
+        shutil.copytree(os.path.join(os.path.dirname(__file__), 'files'), file_folder)
+        email_string_file = os.path.join(file_folder, 'email_string.txt')
+        scan_result_path = os.path.join(tmpdir, 'scan_result.ndjson')
+        try:
+            expected = scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern)
+            result = scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern, jobs=2)
+            self.assertEqual(result['scan_results'], expected['scan_results'])
+
+            result = scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern, jobs=2,
+                                  scan_result_path=scan_result_path)
+            self.assertTrue(result['secrets_detected'])
+            with open(scan_result_path) as f:
+                streamed = dict((record['file'], record['secrets']) for record in map(json.loads, f))
+            self.assertEqual(streamed, expected['scan_results'])
+
+            result = mask_secrets(file_path=email_string_file, saved_scan_result_path=scan_result_path, yes=True)
+            self.assertTrue(result['mask'])
+            self.assertFalse(scan_secrets(file_path=email_string_file, custom_pattern=custom_pattern)['secrets_detected'])
+
+            with self.assertRaises(ValueError):
+                scan_secrets(directory_path=file_folder, jobs=0)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_scan_cache(self):
+        file_folder = os.path.join(os.path.dirname(__file__), 'files')
+        custom_pattern = json.dumps({"Include": [{"Pattern": r"(?<refine>[\w.%#+-]+)(%40|@)([a-z0-9.-]*.[a-z]{2,})",
+                                                  "Name": "EmailAddress"}]})
+        config_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch('azdev.operations.secret_cache.get_azdev_config_dir', return_value=config_dir):
+                expected = scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern)
+                with mock.patch('azdev.operations.secret._scan_secrets_for_string',
+                                wraps=_scan_secrets_for_string) as scan, \
+                        mock.patch('azdev.operations.secret_cache.json.dump') as dump:
+                    result = scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern)
+                    self.assertEqual(scan.call_count, 0)
+                    # nothing new to save
+                    self.assertEqual(dump.call_count, 0)
+                    self.assertEqual(result['scan_results'], expected['scan_results'])
+                    scan_secrets(directory_path=file_folder, recursive=True, custom_pattern=custom_pattern,
+                                 no_cache=True)
+                    self.assertGreater(scan.call_count, 0)
+        finally:
+            shutil.rmtree(config_dir)
+
+    def test_scan_git_changes(self):
+        import git
+        custom_pattern = json.dumps({"Include": [{"Pattern": r"(?<refine>[\w.%#+-]+)(%40|@)([a-z0-9.-]*.[a-z]{2,})",
+                                                  "Name": "EmailAddress"}]})
+        repo_path = tempfile.mkdtemp()
+        changed_file = os.path.join(repo_path, 'changed.txt')
+        try:
+            repo = git.Repo.init(repo_path)
+            with repo.config_writer() as config:
+                config.set_value('user', 'name', 'azdev')
+                config.set_value('user', 'email', 'azdev@example.com')
+            for name in ['changed.txt', 'unchanged.txt']:
+                with open(os.path.join(repo_path, name), 'w') as f:
+                    f.write('old foo@gmail.com\n')
+            repo.index.add(['changed.txt', 'unchanged.txt'])
+            repo.index.commit('initial')
+            with open(changed_file, 'w') as f:
+                f.write('old foo@gmail.com\nnew bar@gmail.com\n')
+            with open(os.path.join(repo_path, 'image.png'), 'wb') as f:
+                f.write(b'\x89PNG\r\n\x1a\n\0\xff\xfe baz@gmail.com')
+            repo.index.add(['changed.txt', 'image.png'])
+
+            result = scan_secrets(git_repo=repo_path, staged=True, custom_pattern=custom_pattern, no_cache=True)
+            self.assertEqual(list(result['scan_results']), [changed_file])
+            self.assertEqual(len(result['scan_results'][changed_file]), 2)
+
+            result = scan_secrets(git_repo=repo_path, staged=True, added_only=True, custom_pattern=custom_pattern,
+                                  no_cache=True)
+            secrets = result['scan_results'][changed_file]
+            self.assertEqual([secret['secret_value'] for secret in secrets], ['bar'])
+            start, end = secrets[0]['secret_index']
+            self.assertEqual('old foo@gmail.com\nnew bar@gmail.com\n'[start:end], 'bar')
+
+            repo.index.commit('add bar')
+            result = scan_secrets(git_repo=repo_path, git_target='HEAD~1', added_only=True,
+                                  custom_pattern=custom_pattern, no_cache=True)
+            self.assertEqual([secret['secret_value'] for secret in result['scan_results'][changed_file]], ['bar'])
+
+            with self.assertRaises(ValueError):
+                scan_secrets(git_repo=repo_path, staged=True, git_target='HEAD~1')
+            with self.assertRaises(ValueError):
+                scan_secrets(file_path=changed_file, added_only=True)
+        finally:
+            shutil.rmtree(repo_path, ignore_errors=True)
+
+    def test_scan_large_file_in_chunks(self):
+        custom_pattern = json.dumps({"Include": [{"Pattern": r"(?<refine>[\w.%#+-]+)(%40|@)([a-z0-9.-]*.[a-z]{2,})",
+                                                  "Name": "EmailAddress"}]})
+        lines = ['línea {0} of user{0}@gmail.com\r\n{1}'.format(i, 'x' * (i % 97)) for i in range(20000)]
+        tmpdir = tempfile.mkdtemp()
+        large_file = os.path.join(tmpdir, 'large.txt')
+        try:
+            with open(large_file, 'w', encoding='utf8', newline='') as f:
+                f.write('\n'.join(lines))
+            self.assertGreater(os.path.getsize(large_file), 1024 * 1024)
+            expected = scan_secrets(file_path=large_file, custom_pattern=custom_pattern, no_cache=True)
+            with mock.patch('azdev.operations.secret.SCAN_CHUNK_SIZE', 64 * 1024), \
+                    mock.patch('azdev.operations.secret.MAX_MATCH_LENGTH', 64), \
+                    mock.patch('azdev.operations.secret._scan_secrets_for_string',
+                               wraps=_scan_secrets_for_string) as scan:
+                result = scan_secrets(file_path=large_file, custom_pattern=custom_pattern, no_cache=True,
+                                      large_file_size=1)
+            self.assertGreater(scan.call_count, 1)
+            self.assertEqual(len(result['scan_results'][large_file]), 20000)
+            self.assertEqual(result['scan_results'], expected['scan_results'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_scan_git_history(self):
+        import git
+        custom_pattern = json.dumps({"Include": [{"Pattern": r"(?<refine>[\w.%#+-]+)(%40|@)([a-z0-9.-]*.[a-z]{2,})",
+                                                  "Name": "EmailAddress"}]})
+        repo_path = tempfile.mkdtemp()
+        try:
+            repo = git.Repo.init(repo_path)
+            with repo.config_writer() as config:
+                config.set_value('user', 'name', 'azdev')
+                config.set_value('user', 'email', 'azdev@example.com')
+
+            def commit(files, message):
+                for name, content in files.items():
+                    with open(os.path.join(repo_path, name), 'wb') as f:
+                        f.write(content)
+                repo.index.add(list(files))
+                return repo.index.commit(message).hexsha
+
+            first = commit({'a.txt': b'no secret\nfoo@gmail.com\n', 'image.bin': b'\0bar@gmail.com'}, 'first')
+            second = commit({'a.txt': b'no secret\n', 'b.txt': b'no secret\nfoo@gmail.com\n'}, 'second')
+            third = commit({'c.txt': b'\n\nbaz@gmail.com\n', 'd.txt': b'caf\xe9\nqux@gmail.com\n'}, 'third')
+
+            with mock.patch('azdev.operations.secret._scan_secrets_for_string',
+                            wraps=_scan_secrets_for_string) as scan:
+                result = scan_secrets(git_history=repo_path, custom_pattern=custom_pattern, no_cache=True)
+            # the same blob in a.txt and b.txt is scanned once, the binary blob is skipped
+            self.assertEqual(scan.call_count, 4)
+            scan_results = result['scan_results']
+            self.assertEqual(set(scan_results), {first + ':a.txt', second + ':b.txt', third + ':c.txt',
+                                                 third + ':d.txt'})
+            # not UTF-8
+            self.assertEqual(scan_results[third + ':d.txt'][0]['line'], 2)
+            secret = scan_results[second + ':b.txt'][0]
+            self.assertEqual((secret['commit'], secret['path'], secret['line'], secret['secret_value']),
+                             (second, 'b.txt', 2, 'foo'))
+            self.assertEqual(scan_results[third + ':c.txt'][0]['line'], 3)
+
+            result = scan_secrets(git_history=repo_path, since=second, custom_pattern=custom_pattern, jobs=2,
+                                  no_cache=True)
+            self.assertEqual(set(result['scan_results']), {third + ':c.txt', third + ':d.txt'})
+
+            with self.assertRaises(ValueError):
+                scan_secrets(git_history=repo_path, file_path=os.path.join(repo_path, 'a.txt'))
+        finally:
+            shutil.rmtree(repo_path, ignore_errors=True)
+
+    def test_mask_spans(self):
+        data = 'key abcdef and abcdef again'
+        secrets = [
+            {'secret_name': 'Key', 'secret_value': 'abcdef', 'secret_index': [4, 10], 'redaction_token': '+++'},
+            {'secret_name': 'Inner', 'secret_value': 'cdef a', 'secret_index': [6, 12], 'redaction_token': '---'},
+        ]
+        # only the detected spans are masked, overlapping secrets once
+        self.assertEqual(_mask_string(data, secrets, 'FIXED_VALUE'), 'key ***nd abcdef again')
+        self.assertEqual(_mask_string(data, secrets, 'FIXED_LENGTH'), 'key ********nd abcdef again')
+        self.assertEqual(_mask_string(data, secrets, 'SECRET_NAME'), 'key Keynd abcdef again')
+        self.assertEqual(_mask_string(data, secrets, 'CUSTOM'), 'key +++nd abcdef again')
+        self.assertEqual(_mask_string(data, secrets[1:] + secrets[:1], 'SECRET_NAME'), 'key Keynd abcdef again')
+
+        # a result which does not match the content masks every occurrence of the secrets
+        stale = [{'secret_name': 'Key', 'secret_value': 'abcdef', 'secret_index': [0, 6], 'redaction_token': '+++'}]
+        self.assertEqual(_mask_string(data, stale, 'FIXED_VALUE'), 'key *** and *** again')
+
+        tmpdir = tempfile.mkdtemp()
+        file_path = os.path.join(tmpdir, 'secret.txt')
+        try:
+            with open(file_path, 'w') as f:
+                f.write(data)
+            os.chmod(file_path, 0o640)
+            _mask_file(file_path, secrets, 'FIXED_LENGTH')
+            with open(file_path) as f:
+                self.assertEqual(f.read(), 'key ********nd abcdef again')
+            self.assertEqual(os.stat(file_path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(tmpdir), ['secret.txt'])
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_mask(self):
         test_data = "This is a test string with email fooabc@gmail.com and sas sv=2022-11-02&sr=c&sig=a9Y5mpQgKUiiPzHFNdDm53Na6UndTrNMCsRZd6b2oV4%3D"
         result = mask_secrets(data=test_data, yes=True)
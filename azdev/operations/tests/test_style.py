@@ -5,10 +5,19 @@
 # -----------------------------------------------------------------------------
 
 import configparser
+import os
+import shutil
+import subprocess
+import tempfile
 import unittest
 from unittest import mock
 
-from azdev.operations.style import _config_file_path
+from knack.util import CommandResultItem
+
+from azdev.operations.style import (
+    _config_file_path, _combine_command_result, _get_cross_file_checks, _pylint_tasks, _select_paths,
+    _sets_msg_template, _CrossFileTask, allocate_processes,
+    get_path_weights, shard_paths)
 
 
 class TestConfigFilePath(unittest.TestCase):
@@ -112,3 +121,112 @@ class TestConfigFilePath(unittest.TestCase):
             self.assertTrue(r1[1].endswith("/config_files/ext.flake8"))
             self.assertTrue(r2[0].endswith("/config_files/cli_pylintrc"))
             self.assertTrue(r2[1].endswith("/config_files/ext_pylintrc"))
+
+
+class TestPylintMsgTemplate(unittest.TestCase):
+    def test_sets_msg_template(self):
+        fd, rcfile = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('[REPORTS]\n# msg-template=ignored\nmsg-template = {path}: {msg}\n')
+            self.assertTrue(_sets_msg_template(rcfile))
+            with open(rcfile, 'w') as f:
+                f.write('[REPORTS]\n# msg-template=ignored\n')
+            self.assertFalse(_sets_msg_template(rcfile))
+        finally:
+            os.remove(rcfile)
+        self.assertFalse(_sets_msg_template(rcfile))
+
+    def test_no_msg_template_without_cache(self):
+        modules = {'core': {}, 'mod': {'vm': os.path.join('repo', 'vm')}, 'ext': {}}
+        with mock.patch('azdev.operations.style._config_file_path', return_value=('cli_pylintrc', 'ext_pylintrc')):
+            tasks = _pylint_tasks(modules, 2)
+        self.assertEqual(len(tasks), 1)
+        self.assertNotIn('--msg-template', tasks[0].build_command(tasks[0].paths, tasks[0].config_file, 2))
+
+
+class TestPylintCrossFileChecks(unittest.TestCase):
+    def test_cross_file_checks(self):
+        fd, rcfile = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('[MESSAGES CONTROL]\ndisable=\n    missing-docstring,\n    R0801\n')
+            self.assertEqual(_get_cross_file_checks(rcfile), ['cyclic-import'])
+        finally:
+            os.remove(rcfile)
+        self.assertEqual(_get_cross_file_checks(rcfile), ['duplicate-code', 'cyclic-import'])
+        self.assertEqual(_get_cross_file_checks(rcfile, disable_all=True, enable=['duplicate-code', 'other']),
+                         ['duplicate-code'])
+
+    def test_sharded_pylint(self):
+        modules = {'core': {}, 'mod': {name: os.path.join('repo', name) for name in ['vm', 'network']}, 'ext': {}}
+        with mock.patch('azdev.operations.style._config_file_path', return_value=('cli_pylintrc', 'ext_pylintrc')):
+            tasks = _pylint_tasks(modules, 4)
+            self.assertEqual(len(_pylint_tasks(modules, 1)), 1)
+        # the checks which need all the files in one process run once, not in each shard
+        self.assertEqual(len(tasks), 3)
+        self.assertIsInstance(tasks[0], _CrossFileTask)
+        self.assertEqual(sorted(tasks[0].paths), sorted(modules['mod'].values()))
+        self.assertIn('--disable=all --enable=duplicate-code,cyclic-import',
+                      tasks[0].build_command(tasks[0].paths, tasks[0].config_file, 1))
+        for task in tasks[1:]:
+            self.assertIn('--disable=duplicate-code,cyclic-import',
+                          task.build_command(task.paths, task.config_file, 1))
+
+
+class TestStyleSharding(unittest.TestCase):
+    def test_shard_paths_balanced(self):
+        weights = {"network": 10.0, "vm": 6.0, "storage": 5.0, "acr": 2.0, "ams": 1.0}
+        shards = shard_paths(list(weights), 2, weights)
+        self.assertEqual(shards, [(["network", "acr"], 12.0), (["vm", "storage", "ams"], 12.0)])
+
+    def test_shard_paths_fewer_paths_than_shards(self):
+        shards = shard_paths(["a", "b"], 8, {"a": 1.0, "b": 3.0})
+        self.assertEqual(shards, [(["b"], 3.0), (["a"], 1.0)])
+
+    def test_allocate_processes(self):
+        self.assertEqual(allocate_processes([6.0, 3.0, 1.0], 8), [4, 3, 1])
+        self.assertEqual(sum(allocate_processes([10.0, 1.0, 1.0, 0.5], 5)), 5)
+        self.assertEqual(allocate_processes([2.0, 1.0, 1.0], 2), [1, 1, 1])
+        self.assertEqual(allocate_processes([0.0, 0.0], 4), [2, 2])
+
+    def test_select_paths(self):
+        module = tempfile.mkdtemp()
+        try:
+            files = [os.path.join(module, '{}.py'.format(name)) for name in 'abcd']
+            for path in files:
+                with open(path, 'w') as f:
+                    f.write('')
+            cache = mock.Mock()
+            cache.get.side_effect = lambda path, _: None if path in stale else ['{}:1:0: C0000: x'.format(path)]
+
+            stale = files[:1]
+            paths, messages, cached_count = _select_paths([module], 'rc', cache)
+            self.assertEqual((paths, len(messages), cached_count), (files[:1], 3, 3))
+            with mock.patch('azdev.operations.style.MAX_STALE_PATHS_LENGTH', 10):
+                self.assertEqual(_select_paths([module], 'rc', cache), ([module], [], 0))
+            # most files are stale, the module is checked again as a whole
+            stale = files[:3]
+            self.assertEqual(_select_paths([module], 'rc', cache), ([module], [], 0))
+            stale = []
+            self.assertEqual(_select_paths([module], 'rc', cache)[0], [])
+        finally:
+            shutil.rmtree(module)
+
+    def test_path_weights(self):
+        with mock.patch("azdev.operations.style._count_python_files", side_effect=lambda p: {"a": 10, "b": 4}[p]):
+            self.assertEqual(get_path_weights(["a", "b"], {}), {"a": 10.0, "b": 4.0})
+            # the unknown path is estimated from the time per file of the recorded ones
+            self.assertEqual(get_path_weights(["a", "b"], {"a": 5.0}), {"a": 5.0, "b": 2.0})
+
+    def test_combine_command_result(self):
+        failed = [subprocess.CalledProcessError(1, "pylint", output=b"E1"),
+                  subprocess.CalledProcessError(2, "pylint", output=b"E2")]
+        result = _combine_command_result(
+            CommandResultItem("ok", exit_code=0),
+            CommandResultItem(b"E1", exit_code=1, error=failed[0]),
+            None,
+            CommandResultItem(b"E2", exit_code=2, error=failed[1]))
+        self.assertEqual(result.exit_code, 3)
+        self.assertEqual(result.result, "ok\nE1\nE2")
+        self.assertEqual(result.error.output, b"E1\nE2")
@@ -0,0 +1,90 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from azdev.operations.style_cache import (
+    build_import_graph, find_python_files, get_dependency_keys, get_dependents, get_exit_code, parse_messages)
+
+
+class TestStyleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.files = {
+            'pkg/__init__.py': '',
+            'pkg/a.py': 'from .b import VALUE\n',
+            'pkg/b.py': 'from pkg import (\n    c,  # helper\n)\nVALUE = 1\n',
+            'pkg/c.py': 'import os\n',
+            'pkg/sub/__init__.py': '',
+            'pkg/sub/d.py': 'from ..c import os\n',
+        }
+        for name, content in self.files.items():
+            path = self._path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        self.graph = build_import_graph(find_python_files([self.temp_dir]))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir, *name.split('/'))
+
+    def test_import_graph(self):
+        self.assertEqual(self.graph[self._path('pkg/a.py')], {self._path('pkg/b.py')})
+        self.assertEqual(self.graph[self._path('pkg/b.py')], {self._path('pkg/__init__.py'), self._path('pkg/c.py')})
+        self.assertEqual(self.graph[self._path('pkg/c.py')], set())
+        self.assertEqual(self.graph[self._path('pkg/sub/d.py')], {self._path('pkg/c.py')})
+
+    def test_import_graph_search_files(self):
+        files = find_python_files([self.temp_dir])
+        graph = build_import_graph([self._path('pkg/a.py')], search_files=files)
+        self.assertEqual(set(graph), {self._path(name) for name in ['pkg/a.py', 'pkg/b.py', 'pkg/__init__.py',
+                                                                    'pkg/c.py']})
+        hashes = {path: path for path in graph}
+        keys = get_dependency_keys(graph, hashes)
+        hashes[self._path('pkg/c.py')] = 'changed'
+        self.assertNotEqual(keys[self._path('pkg/a.py')], get_dependency_keys(graph, hashes)[self._path('pkg/a.py')])
+
+    def test_dependents(self):
+        self.assertEqual(get_dependents(self.graph, [self._path('pkg/c.py')]),
+                         {self._path(name) for name in ['pkg/a.py', 'pkg/b.py', 'pkg/c.py', 'pkg/sub/d.py']})
+        self.assertEqual(get_dependents(self.graph, [self._path('pkg/a.py')]), {self._path('pkg/a.py')})
+
+    def test_dependency_keys(self):
+        hashes = {path: path for path in self.graph}
+        keys = get_dependency_keys(self.graph, hashes)
+        hashes[self._path('pkg/c.py')] = 'changed'
+        changed = get_dependency_keys(self.graph, hashes)
+        self.assertEqual({path for path in keys if keys[path] != changed[path]},
+                         get_dependents(self.graph, [self._path('pkg/c.py')]))
+
+    def test_dependency_keys_cycle(self):
+        graph = {'a': {'b'}, 'b': {'a'}, 'c': {'a'}}
+        keys = get_dependency_keys(graph, {'a': '1', 'b': '2', 'c': '3'})
+        changed = get_dependency_keys(graph, {'a': '1', 'b': '4', 'c': '3'})
+        self.assertNotEqual(keys['a'], keys['b'])
+        self.assertTrue(all(keys[path] != changed[path] for path in graph))
+
+    def test_parse_messages(self):
+        path = self._path('pkg/c.py')
+        output = '************* Module c\n{0}:1:0: W0611: Unused import os (unused-import)\n' \
+                 '{0}:2:0: C0304: Final newline missing (missing-final-newline)\n\nrated at 5.00/10'.format(path)
+        messages = parse_messages(output)
+        self.assertEqual(list(messages), [path])
+        self.assertEqual(len(messages[path]), 2)
+        self.assertEqual(get_exit_code('pylint', messages[path]), 4 | 16)
+        self.assertEqual(get_exit_code('flake8', ['{}:1:1: F401 unused'.format(path)]), 1)
+        self.assertEqual(get_exit_code('flake8', []), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,9 +22,10 @@ from azdev.utilities import (
     COMMAND_MODULE_PREFIX, EXTENSION_PREFIX,
     make_dirs, get_azdev_config_dir,
     get_path_table, require_virtual_env, get_name_index)
-from .pytest_runner import get_test_runner
-from .profile_context import ProfileContext, current_profile
+from .pytest_runner import get_test_runner, get_preload_modules
+from .profile_context import ProfileContext, current_profile, SUPPORTED_PROFILES
 from .incremental_strategy import CLIAzureDevOpsContext
+from .rerun import get_failed_tests, to_node_id, merge_results
 
 logger = get_logger(__name__)
 
@@ -34,13 +35,19 @@ def run_tests(tests, xml_path=None, discover=False, in_series=False,
               run_live=False, profile=None, last_failed=False, pytest_args=None,
               no_exit_first=False, mark=None,
               git_source=None, git_target=None, git_repo=None,
-              cli_ci=False):
+              cli_ci=False, worker_memory=None, warm_workers=False, no_result_cache=False, retries=None):
 
     require_virtual_env()
 
     DEFAULT_RESULT_FILE = 'test_results.xml'
     DEFAULT_RESULT_PATH = os.path.join(get_azdev_config_dir(), DEFAULT_RESULT_FILE)
 
+    profiles = [p.strip() for p in profile.split(',') if p.strip()] if profile else [current_profile()]
+    unsupported = [p for p in profiles if p not in SUPPORTED_PROFILES]
+    if unsupported:
+        raise CLIError('unsupported profile(s): {}. Allowed values: {}'.format(
+            ', '.join(unsupported), ', '.join(SUPPORTED_PROFILES)))
+
     heading('Run Tests')
 
     path_table = get_path_table()
@@ -55,16 +62,12 @@ def run_tests(tests, xml_path=None, discover=False, in_series=False,
     else:
         target_tests = set(tests)
 
-    test_index = _get_test_index(profile or current_profile(), discover, target_tests=target_tests)
-
-    # filter out tests whose modules haven't changed
-    modified_mods = _filter_by_git_diff(tests, test_index, git_source, git_target, git_repo)
-    if modified_mods:
-        display('\nTest on modules: {}\n'.format(', '.join(modified_mods)))
-
-    if cli_ci is True:
-        ctx = CLIAzureDevOpsContext(git_repo, git_source, git_target)
-        modified_mods = ctx.filter(test_index)
+    # each profile has its own test index, as the tests of a module live in a folder per profile
+    profile_test_paths = {}
+    for name in profiles:
+        test_paths = _get_test_paths(tests, name, discover, target_tests, git_source, git_target, git_repo, cli_ci)
+        if test_paths:
+            profile_test_paths[name] = test_paths
 
     # resolve the path at which to dump the XML results
     xml_path = xml_path or DEFAULT_RESULT_PATH
@@ -76,6 +79,132 @@ def run_tests(tests, xml_path=None, discover=False, in_series=False,
         logger.warning('RUNNING TESTS LIVE')
         os.environ[ENV_VAR_TEST_LIVE] = 'True'
 
+    exit_code = 0
+
+    # Tests have been collected. Now run them.
+    if not profile_test_paths:
+        logger.warning('No tests selected to run.')
+        sys.exit(exit_code)
+
+    def _get_runner(name, test_paths, log_path, concurrent_runs, retry=False, max_workers=None):
+        config_dir = get_azdev_config_dir()
+        return get_test_runner(parallel=not in_series and max_workers != 1,
+                               log_path=log_path,
+                               last_failed=last_failed and not retry,
+                               # with retries, run all the tests first: only the failed ones are run again
+                               no_exit_first=no_exit_first or retry or bool(retries),
+                               mark=mark,
+                               durations_path=os.path.join(config_dir, 'test_durations', '{}.json'.format(name)),
+                               worker_memory=worker_memory,
+                               preload_modules=get_preload_modules(test_paths) if warm_workers else None,
+                               # live runs depend on the service, not only on the sources
+                               result_cache_path=None if no_result_cache or run_live else os.path.join(
+                                   config_dir, 'test_result_cache', '{}.json'.format(name)),
+                               concurrent_runs=concurrent_runs,
+                               max_workers=max_workers)
+
+    def _run_profile(name, test_paths, log_path, concurrent_runs=1, **kwargs):
+        runner = _get_runner(name, test_paths, log_path, concurrent_runs)
+        # concurrent profiles each run in their own configuration, the current profile included
+        with ProfileContext(name, isolated=len(profile_test_paths) > 1) as ctx:
+            exit_code = runner(test_paths=test_paths, pytest_args=pytest_args, env=ctx.env, **kwargs)
+
+            # re-run only the failed tests of the previous attempt
+            retry_log_paths = []
+            last_log_path = log_path
+            for attempt in range(1, (retries or 0) + 1):
+                if not exit_code or not os.path.isfile(last_log_path):
+                    break
+                rootdir, node_ids = _get_failed_node_ids(last_log_path, test_paths)
+                if not node_ids:
+                    break
+                display('Retrying {} failed test(s) against profile "{}" ({}/{})'.format(
+                    len(node_ids), name, attempt, retries))
+                last_log_path = '{}_retry{}.xml'.format(os.path.splitext(log_path)[0], attempt)
+                # fewer workers, so that failures caused by an overloaded machine are not reproduced
+                runner = _get_runner(name, node_ids, last_log_path, concurrent_runs, retry=True,
+                                     max_workers=max(1, min(len(node_ids), (os.cpu_count() or 1) // 2)))
+                # keep the rootdir, so that the junit classnames of the retries match the original ones
+                exit_code = runner(test_paths=node_ids, pytest_args=(pytest_args or []) + ['--rootdir', rootdir],
+                                   env=ctx.env, **kwargs)
+                retry_log_paths.append(last_log_path)
+
+            if retry_log_paths:
+                flaky, failed = merge_results(log_path, retry_log_paths)
+                _display_retry_summary(name, flaky, failed)
+                exit_code = exit_code or (1 if failed else 0)
+        return exit_code
+
+    if len(profile_test_paths) == 1:
+        name, test_paths = next(iter(profile_test_paths.items()))
+        exit_code = _run_profile(name, test_paths, xml_path)
+        sys.exit(0 if not exit_code else 1)
+
+    # run the profiles side by side, each with its own configuration, results and log
+    from concurrent.futures import ThreadPoolExecutor
+
+    make_dirs(os.path.dirname(os.path.abspath(xml_path)))
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(profile_test_paths)) as executor:
+        for name, test_paths in profile_test_paths.items():
+            profile_xml_path = '{}_{}.xml'.format(os.path.splitext(xml_path)[0], name)
+            log_path = os.path.splitext(profile_xml_path)[0] + '.log'
+            display('Running tests against profile "{}". Output: {}'.format(name, log_path))
+            results[name] = (executor.submit(_run_and_log, _run_profile, name, test_paths, profile_xml_path,
+                                             log_path, len(profile_test_paths)), profile_xml_path, log_path)
+
+    subheading('Results')
+    for name, (future, profile_xml_path, log_path) in results.items():
+        profile_exit_code = future.result()
+        exit_code = exit_code or profile_exit_code
+        display('{}: {}\n    results: {}\n    log: {}'.format(
+            name, 'FAILED' if profile_exit_code else 'PASSED', profile_xml_path, log_path))
+
+    sys.exit(0 if not exit_code else 1)
+
+
+def _get_failed_node_ids(xml_path, test_paths):
+    """ Returns the pytest rootdir of the run and the node IDs of its failed tests. """
+    rootdir = None
+    node_ids = []
+    for classname, name in get_failed_tests(xml_path):
+        root, node_id = to_node_id(classname, name, test_paths)
+        if node_id:
+            rootdir = rootdir or root
+            node_ids.append(node_id)
+        else:
+            logger.warning("Unable to locate failed test '%s.%s'. It will not be retried.", classname, name)
+    return rootdir, node_ids
+
+
+def _display_retry_summary(profile, flaky, failed):
+    subheading('Retry Summary ({})'.format(profile))
+    display('Flaky (passed on retry): {}'.format(len(flaky)))
+    for test in flaky:
+        display('    {}'.format(test))
+    display('Failed: {}'.format(len(failed)))
+    for test in failed:
+        display('    {}'.format(test))
+
+
+def _run_and_log(run, name, test_paths, xml_path, log_path, concurrent_runs):
+    from subprocess import STDOUT
+    with open(log_path, 'w') as f:
+        return run(name, test_paths, xml_path, concurrent_runs=concurrent_runs, stdout=f, stderr=STDOUT)
+
+
+def _get_test_paths(tests, profile, discover, target_tests, git_source, git_target, git_repo, cli_ci):
+    test_index = _get_test_index(profile, discover, target_tests=target_tests)
+
+    # filter out tests whose modules haven't changed
+    modified_mods = _filter_by_git_diff(tests, test_index, git_source, git_target, git_repo)
+    if modified_mods:
+        display('\nTest on modules: {}\n'.format(', '.join(modified_mods)))
+
+    if cli_ci is True:
+        ctx = CLIAzureDevOpsContext(git_repo, git_source, git_target)
+        modified_mods = ctx.filter(test_index)
+
     def _find_test(index, name):
         name_comps = name.split('.')
         num_comps = len(name_comps)
@@ -102,24 +231,7 @@ def run_tests(tests, xml_path=None, discover=False, in_series=False,
         except KeyError:
             logger.warning("'%s' not found. If newly added, re-run with --discover", t)
             continue
-
-    exit_code = 0
-
-    # Tests have been collected. Now run them.
-    if not test_paths:
-        logger.warning('No tests selected to run.')
-        sys.exit(exit_code)
-
-    exit_code = 0
-    with ProfileContext(profile):
-        runner = get_test_runner(parallel=not in_series,
-                                 log_path=xml_path,
-                                 last_failed=last_failed,
-                                 no_exit_first=no_exit_first,
-                                 mark=mark)
-        exit_code = runner(test_paths=test_paths, pytest_args=pytest_args)
-
-    sys.exit(0 if not exit_code else 1)
+    return test_paths
 
 
 def _filter_by_git_diff(tests, test_index, git_source, git_target, git_repo):
@@ -4,44 +4,86 @@
 # license information.
 # -----------------------------------------------------------------------------
 
+import configparser
 import os
+import shutil
 import traceback
 
 from knack.log import get_logger
 from knack.util import CLIError
 
-from azdev.utilities import call, cmd
-from azdev.utilities import display
+from azdev.utilities import display, get_azure_config, get_azure_config_dir, copy_azure_config_dir
 
 
 logger = get_logger(__name__)
 os.environ['AZURE_CORE_COLLECT_TELEMETRY'] = 'False'
 
+SUPPORTED_PROFILES = ['latest', '2017-03-09-profile', '2018-03-01-hybrid', '2019-03-01-hybrid', '2020-09-01-hybrid']
+
 
 class ProfileContext:
-    def __init__(self, profile_name=None):
-        self.target_profile = profile_name
+    """ Run tests against a profile without changing the user's Azure CLI configuration.
 
+    When the target profile differs from the current one, or `isolated` is set, e.g. when several profiles run
+    concurrently, the configuration is copied into a temporary AZURE_CONFIG_DIR in which the target profile is set.
+    `env` holds the environment the tests should run with.
+    """
+    def __init__(self, profile_name=None, isolated=False):
+        self.target_profile = profile_name
+        self.isolated = isolated
         self.origin_profile = current_profile()
+        self.config_dir = None
+        self.env = None
 
     def __enter__(self):
-        if self.target_profile is None or self.target_profile == self.origin_profile:
+        self.env = os.environ.copy()
+        target_profile = self.target_profile or self.origin_profile
+        if target_profile == self.origin_profile and not self.isolated:
             display('The tests are set to run against current profile "{}"'.format(self.origin_profile))
         else:
-            result = cmd('az cloud update --profile {}'.format(self.target_profile),
-                         'Switching to target profile "{}"...'.format(self.target_profile))
-            if result.exit_code != 0:
-                raise CLIError(result.error.output.decode('utf-8'))
+            if target_profile not in SUPPORTED_PROFILES:
+                raise CLIError('unsupported profile: {}. Allowed values: {}'.format(
+                    target_profile, ', '.join(SUPPORTED_PROFILES)))
+            self.config_dir = _create_profile_config_dir(target_profile)
+            display('The tests are set to run against profile "{}" with configuration in "{}"'.format(
+                target_profile, self.config_dir))
+            # extensions are installed in the original configuration directory by default
+            self.env.setdefault('AZURE_EXTENSION_DIR', os.path.join(get_azure_config_dir(), 'cliextensions'))
+            self.env['AZURE_CONFIG_DIR'] = self.config_dir
+        return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.target_profile is not None and self.target_profile != self.origin_profile:
-            display('Switching back to origin profile "{}"...'.format(self.origin_profile))
-            call('az cloud update --profile {}'.format(self.origin_profile))
+        if self.config_dir:
+            shutil.rmtree(self.config_dir, ignore_errors=True)
+            self.config_dir = None
 
         if exc_tb:
             display('')
             traceback.print_exception(exc_type, exc_val, exc_tb)
 
 
+def _get_cloud_name():
+    return get_azure_config().get('cloud', 'name', 'AzureCloud')
+
+
 def current_profile():
-    return cmd('az cloud show --query profile -otsv', show_stderr=False).result
+    """ Returns the profile of the current cloud, read from the Azure CLI configuration rather than `az`. """
+    clouds_config = configparser.ConfigParser()
+    clouds_config.read(os.path.join(get_azure_config_dir(), 'clouds.config'))
+    return clouds_config.get(_get_cloud_name(), 'profile', fallback='latest')
+
+
+def _create_profile_config_dir(profile):
+    """ Copy the Azure CLI configuration files into a temporary directory and set the profile of the current cloud. """
+    config_dir = copy_azure_config_dir('azdev_{}_'.format(profile))
+
+    cloud_name = _get_cloud_name()
+    clouds_config_path = os.path.join(config_dir, 'clouds.config')
+    clouds_config = configparser.ConfigParser()
+    clouds_config.read(clouds_config_path)
+    if not clouds_config.has_section(cloud_name):
+        clouds_config.add_section(cloud_name)
+    clouds_config.set(cloud_name, 'profile', profile)
+    with open(clouds_config_path, 'w') as f:
+        clouds_config.write(f)
+    return config_dir
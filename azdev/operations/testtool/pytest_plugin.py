@@ -0,0 +1,279 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""pytest plugin loaded into the pytest process spawned by `azdev test`.
+
+It records how long each test took and, when requested, reorders the collected tests so that the longest ones
+are scheduled first. This keeps the long live/recorded scenario tests from ending up at the tail of a parallel run.
+
+It can also pre-import the heavy azure-cli modules once in every long-lived test worker. With `--forked`, each test
+then runs in a fork of that warm worker instead of importing those modules again in every forked child.
+
+Finally, it can skip the tests which passed before with exactly the same test file, recording, module source and
+CLI version. Those tests are reported as skipped with the `CACHED_REASON` reason.
+"""
+
+import gc
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import tempfile
+import warnings
+
+import pytest
+
+CACHED_REASON = 'azdev: passed previously with the same sources (cached)'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('azdev')
+    group.addoption('--azdev-durations', dest='azdev_durations', default=None,
+                    help='Path of the JSON file in which the test durations are recorded.')
+    group.addoption('--azdev-longest-first', dest='azdev_longest_first', action='store_true', default=False,
+                    help='Run the tests with the longest recorded durations first.')
+    group.addoption('--azdev-preload', dest='azdev_preload', default=None,
+                    help='Comma-separated list of modules to import in each test worker before running the tests.')
+    group.addoption('--azdev-result-cache', dest='azdev_result_cache', default=None,
+                    help='Path of the JSON file in which the passing tests are cached. Cached tests are skipped.')
+
+
+def pytest_configure(config):
+    preload = config.getoption('azdev_preload')
+    # the xdist controller does not run tests itself, so it does not need to be warm
+    if preload and (hasattr(config, 'workerinput') or not getattr(config.option, 'numprocesses', None)):
+        preload_modules(preload.split(','))
+
+    durations_path = config.getoption('azdev_durations')
+    # under xdist, reports are gathered by the controller so only record there
+    if durations_path and not hasattr(config, 'workerinput'):
+        config.pluginmanager.register(DurationRecorder(config, durations_path), 'azdev_duration_recorder')
+
+    result_cache_path = config.getoption('azdev_result_cache')
+    if result_cache_path:
+        config.pluginmanager.register(ResultCache(config, result_cache_path), 'azdev_result_cache')
+
+
+def pytest_collection_modifyitems(config, items):
+    durations_path = config.getoption('azdev_durations')
+    if not durations_path or not config.getoption('azdev_longest_first'):
+        return
+
+    durations = load_json(durations_path)
+    if not durations:
+        return
+
+    # tests without history are assumed to be of average length
+    default = sum(durations.values()) / len(durations)
+    # the sort is stable, so every xdist worker ends up with the same order
+    items.sort(key=lambda item: durations.get(node_key(config, item.nodeid), default), reverse=True)
+
+
+def preload_modules(names):
+    """ Import the modules, and the `commands` of command modules and extensions, into the current process.
+    Their other submodules, e.g. `custom`, are left to the tests which use them. """
+    for name in names:
+        try:
+            module = importlib.import_module(name)
+            # the command table, which every test loads, imports `commands` lazily
+            if name not in ('azure.cli.core', 'azure.cli.testsdk') and hasattr(module, '__path__') and \
+                    importlib.util.find_spec(name + '.commands'):
+                importlib.import_module(name + '.commands')
+        except Exception as ex:  # pylint: disable=broad-except
+            # a module which cannot be imported fails its own tests, not the whole worker
+            warnings.warn('azdev: unable to preload {}: {}'.format(name, ex))
+
+    # keep the preloaded objects out of the garbage collector so forked children share their memory pages
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+
+
+def node_key(config, nodeid):
+    """ Key a node ID by its absolute path, as the pytest rootdir differs between runs. """
+    return '{}/{}'.format(config.rootpath.as_posix(), nodeid)
+
+
+def load_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_json(path, updates, removed=()):
+    """ Merge `updates` into the JSON object at `path` and drop the `removed` keys. The file is replaced atomically. """
+    content = load_json(path)
+    content.update(updates)
+    for key in removed:
+        content.pop(key, None)
+    dir_name = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_name, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ''
+
+
+def _get_module_root(test_dir):
+    """ The module of a test is the package which contains its `tests` folder. """
+    path = test_dir
+    while os.path.basename(path) != 'tests':
+        parent = os.path.dirname(path)
+        if parent == path:
+            return test_dir
+        path = parent
+    return os.path.dirname(path)
+
+
+def _hash_source_tree(root):
+    """ Hash the python sources under `root`, excluding the tests. """
+    sha = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(d for d in dir_names if d not in ('tests', '__pycache__'))
+        for file_name in sorted(file_names):
+            if file_name.endswith('.py'):
+                file_path = os.path.join(dir_path, file_name)
+                sha.update(os.path.relpath(file_path, root).encode('utf-8'))
+                sha.update(_hash_file(file_path).encode('utf-8'))
+    return sha.hexdigest()
+
+
+class DurationRecorder:
+
+    def __init__(self, config, path):
+        self.config = config
+        self.path = path
+        self.durations = {}
+
+    def pytest_runtest_logreport(self, report):
+        # skipped tests, including the cached ones, say nothing about how long a test takes
+        if report.skipped:
+            return
+        key = node_key(self.config, report.nodeid)
+        # accumulate the setup, call and teardown phases
+        self.durations[key] = self.durations.get(key, 0.0) + report.duration
+
+    def pytest_sessionfinish(self):
+        if self.durations:
+            update_json(self.path, {k: round(v, 3) for k, v in self.durations.items()})
+
+
+class ResultCache:  # pylint: disable=too-many-instance-attributes
+    """ Skip the tests which passed before with the same test file, recording, module source and CLI version. """
+
+    def __init__(self, config, path):
+        self.config = config
+        self.path = path
+        self.entries = load_json(path)
+        self.passed = {}
+        self.failed = set()
+        self.cached = 0
+        self._tree_hashes = {}
+        self._file_hashes = {}
+        self._environment = None
+        workerinput = getattr(config, 'workerinput', None)
+        if workerinput is None:
+            # hash the source trees once here rather than in every xdist worker, see pytest_configure_node
+            self._hash_test_paths(config.args)
+        else:
+            self._tree_hashes.update(workerinput.get('azdev_tree_hashes', {}))
+            self._environment = workerinput.get('azdev_environment')
+
+    @property
+    def environment(self):
+        """ Sources of the core packages every test depends on. They include the installed CLI version. """
+        if self._environment is None:
+            parts = []
+            for name in ('azure.cli.core', 'azure.cli.testsdk'):
+                try:
+                    spec = importlib.util.find_spec(name)
+                except ImportError:
+                    spec = None
+                locations = list(spec.submodule_search_locations or []) if spec else []
+                parts.append(self._tree_hash(locations[0]) if locations else '')
+            self._environment = ':'.join(parts)
+        return self._environment
+
+    def _hash_test_paths(self, test_paths):
+        """ Hash the modules of the test paths, e.g. `<module>` or `<module>/tests/latest`, and the core packages. """
+        for test_path in test_paths:
+            path = os.path.abspath(test_path.split('::')[0])
+            test_dir = path if os.path.isdir(path) else os.path.dirname(path)
+            root = _get_module_root(test_dir)
+            # a path which is neither in nor above a tests folder may be a whole repo, so leave it to the tests
+            if root != test_dir or os.path.isdir(os.path.join(test_dir, 'tests')):
+                self._tree_hash(root)
+        self._environment = None
+        return self.environment
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        """ Hand the source hashes of the xdist controller over to each worker. """
+        node.workerinput['azdev_tree_hashes'] = self._tree_hashes
+        node.workerinput['azdev_environment'] = self.environment
+
+    def _tree_hash(self, root):
+        root = os.path.normpath(root)
+        if root not in self._tree_hashes:
+            self._tree_hashes[root] = _hash_source_tree(root)
+        return self._tree_hashes[root]
+
+    def _file_hash(self, path):
+        if path not in self._file_hashes:
+            self._file_hashes[path] = _hash_file(path)
+        return self._file_hashes[path]
+
+    def key(self, nodeid):
+        """ Content address of a test: the hash of everything its result depends on. """
+        test_file = os.path.join(str(self.config.rootpath), nodeid.split('::')[0])
+        test_dir = os.path.dirname(test_file)
+        test_name = nodeid.split('::')[-1].split('[')[0]
+        recording = os.path.join(test_dir, 'recordings', '{}.yaml'.format(test_name))
+
+        sha = hashlib.sha256()
+        for part in (nodeid, self._file_hash(test_file), self._file_hash(recording),
+                     self._tree_hash(_get_module_root(test_dir)),
+                     self.environment):
+            sha.update(part.encode('utf-8'))
+        return sha.hexdigest()
+
+    def pytest_collection_modifyitems(self, items):
+        skip = pytest.mark.skip(reason=CACHED_REASON)
+        for item in items:
+            if self.entries.get(node_key(self.config, item.nodeid)) == self.key(item.nodeid):
+                item.add_marker(skip)
+
+    def pytest_runtest_logreport(self, report):
+        if hasattr(self.config, 'workerinput'):
+            return
+        node = node_key(self.config, report.nodeid)
+        if report.skipped and CACHED_REASON in str(report.longrepr):
+            self.cached += 1
+        elif report.failed:
+            self.failed.add(node)
+            self.passed.pop(node, None)
+        elif report.when == 'call' and report.passed and node not in self.failed:
+            self.passed[node] = self.key(report.nodeid)
+
+    def pytest_sessionfinish(self):
+        if not hasattr(self.config, 'workerinput') and (self.passed or self.failed):
+            update_json(self.path, self.passed, removed=self.failed)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.cached:
+            terminalreporter.write_line('{} test(s) skipped as cached passes. Use --no-result-cache to run them.'
+                                        .format(self.cached))
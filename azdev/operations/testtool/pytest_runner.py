@@ -5,18 +5,26 @@
 # -----------------------------------------------------------------------------
 
 import os
+import re
 import sys
 
 from knack.log import get_logger
 
 from azdev.utilities import call
 
+logger = get_logger(__name__)
 
-def get_test_runner(parallel, log_path, last_failed, no_exit_first, mark):
-    """Create a pytest execution method"""
-    def _run(test_paths, pytest_args):
+PYTEST_PLUGIN = 'azdev.operations.testtool.pytest_plugin'
+
+_MOD_PATH_REGEX = re.compile(r'azure[/\\]cli[/\\]command_modules[/\\](\w+)')
+_EXT_PATH_REGEX = re.compile(r'(azext_\w+)')
 
-        logger = get_logger(__name__)
+
+# pylint: disable=too-many-arguments
+def get_test_runner(parallel, log_path, last_failed, no_exit_first, mark, durations_path=None, worker_memory=None,
+                    preload_modules=None, result_cache_path=None, concurrent_runs=1, max_workers=None):
+    """Create a pytest execution method"""
+    def _run(test_paths, pytest_args, **kwargs):
 
         if os.name == 'posix':
             arguments = ['-x', '-v', '--forked', '-p no:warnings', '--log-level=WARN', '--junit-xml', log_path]
@@ -29,15 +37,89 @@ def get_test_runner(parallel, log_path, last_failed, no_exit_first, mark):
         if mark:
             arguments.append('-m "{}"'.format(mark))
 
+        plugin_args = []
+        if durations_path:
+            plugin_args += ['--azdev-durations', durations_path]
+        if preload_modules:
+            # each (forked) test then starts from a worker which already imported the heavy modules
+            plugin_args += ['--azdev-preload', ','.join(preload_modules)]
+        if result_cache_path:
+            plugin_args += ['--azdev-result-cache', result_cache_path]
+        if plugin_args:
+            arguments += ['-p', PYTEST_PLUGIN] + plugin_args
+
         arguments.extend(test_paths)
         if parallel:
-            arguments += ['-n', 'auto']
+            # load hands out the first tests round-robin and then one at a time as workers finish, so the longest
+            # tests are spread across the workers
+            workers = get_worker_count(worker_memory, concurrent_runs, max_workers)
+            arguments += ['-n', str(workers), '--dist', 'load']
+            if durations_path:
+                arguments.append('--azdev-longest-first')
         if last_failed:
             arguments.append('--lf')
         if pytest_args:
             arguments += pytest_args
         cmd = sys.executable + ' -m pytest {}'.format(' '.join(arguments))
         logger.info('Running: %s', cmd)
-        return call(cmd)
+        return call(cmd, **kwargs)
 
     return _run
+
+
+def get_preload_modules(test_paths):
+    """ Returns the import names of the modules to pre-import in each test worker for the given test paths. """
+    modules = ['azure.cli.core', 'azure.cli.testsdk']
+    for path in test_paths:
+        mod_match = _MOD_PATH_REGEX.search(path)
+        ext_match = _EXT_PATH_REGEX.search(path)
+        if mod_match:
+            name = 'azure.cli.command_modules.{}'.format(mod_match.group(1))
+        elif ext_match:
+            name = ext_match.group(1)
+        else:
+            continue
+        if name not in modules:
+            modules.append(name)
+    return modules
+
+
+def get_worker_count(worker_memory=None, concurrent_runs=1, max_workers=None):
+    """ Number of xdist workers to use.
+
+    :param worker_memory: Memory (MB) expected to be used by each worker. If provided, the number of workers is
+        capped so that they all fit in the available memory.
+    :param concurrent_runs: Number of pytest runs sharing the CPUs and memory of the machine.
+    :param max_workers: Upper limit of the number of workers.
+    :returns: 'auto' or (int) number of workers.
+    """
+    if not worker_memory and concurrent_runs == 1 and not max_workers:
+        return 'auto'
+
+    workers = (os.cpu_count() or 1) // concurrent_runs
+    if worker_memory:
+        available = _get_available_memory()
+        if available is None:
+            logger.warning('Unable to determine the available memory. Ignoring --worker-memory.')
+        else:
+            workers = min(workers, available // (worker_memory * 1024 * 1024 * concurrent_runs))
+    if max_workers:
+        workers = min(workers, max_workers)
+    return max(1, workers)
+
+
+def _get_available_memory():
+    """ Returns the available physical memory in bytes, or None if it cannot be determined. """
+    try:
+        # MemAvailable accounts for the reclaimable page cache, unlike SC_AVPHYS_PAGES
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
@@ -0,0 +1,110 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Helpers to re-run the failed tests of a run from its junit XML results and merge the outcomes."""
+
+import os
+import xml.etree.ElementTree as ET
+
+FAILED_OUTCOMES = ('failure', 'error')
+
+
+def _outcome(testcase):
+    for outcome in ('failure', 'error', 'skipped'):
+        if testcase.find(outcome) is not None:
+            return outcome
+    return 'passed'
+
+
+def _key(testcase):
+    return testcase.get('classname', ''), testcase.get('name', '')
+
+
+def get_failed_tests(xml_path):
+    """ Returns the (classname, name) of the failed and errored testcases of a junit XML file. """
+    failed = []
+    for testcase in ET.parse(xml_path).getroot().iter('testcase'):
+        key = _key(testcase)
+        if _outcome(testcase) in FAILED_OUTCOMES and key not in failed:
+            failed.append(key)
+    return failed
+
+
+def _candidate_roots(test_paths):
+    """ The pytest rootdir is an ancestor of the test paths. """
+    roots = []
+    for test_path in test_paths:
+        path = os.path.abspath(test_path.split('::')[0])
+        while True:
+            if path not in roots:
+                roots.append(path)
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+    return roots
+
+
+def to_node_id(classname, name, test_paths):
+    """ Reverse the junit classname, i.e. the dotted file path relative to the rootdir followed by the classes, into
+    an absolute pytest node ID.
+
+    :returns: (rootdir, node ID), or (None, None) if the test file cannot be found under any of the test paths.
+    """
+    parts = classname.split('.')
+    for root in _candidate_roots(test_paths):
+        for i in range(len(parts), 0, -1):
+            file_path = os.path.join(root, *parts[:i]) + '.py'
+            if os.path.isfile(file_path):
+                return root, '::'.join([file_path] + parts[i:] + [name])
+    return None, None
+
+
+def merge_results(xml_path, retry_xml_paths):
+    """ Replace the testcases of the junit XML file at `xml_path` with their latest retried outcome.
+
+    :param xml_path: Path of the junit XML file of the original run. It is updated in place.
+    :param retry_xml_paths: Paths of the junit XML files of the retries, in order.
+    :returns: (flaky, failed) lists of the 'classname::name' of the tests which passed on a retry and of those which
+        still fail.
+    """
+    latest = {}
+    for retry_xml_path in retry_xml_paths:
+        if not os.path.isfile(retry_xml_path):
+            continue
+        for testcase in ET.parse(retry_xml_path).getroot().iter('testcase'):
+            latest[_key(testcase)] = testcase
+
+    tree = ET.parse(xml_path)
+    flaky = []
+    failed = []
+    root = tree.getroot()
+    suites = [root] if root.tag == 'testsuite' else list(root.iter('testsuite'))
+    for suite in suites:
+        for index, testcase in enumerate(list(suite)):
+            if testcase.tag != 'testcase':
+                continue
+            key = _key(testcase)
+            outcome = _outcome(testcase)
+            if key in latest and outcome in FAILED_OUTCOMES:
+                testcase = latest[key]
+                suite[index] = testcase
+                if _outcome(testcase) not in FAILED_OUTCOMES:
+                    flaky.append('::'.join(key))
+            if _outcome(testcase) in FAILED_OUTCOMES:
+                failed.append('::'.join(key))
+        _update_counts(suite)
+
+    tree.write(xml_path, encoding='utf-8', xml_declaration=True)
+    return flaky, failed
+
+
+def _update_counts(suite):
+    outcomes = [_outcome(testcase) for testcase in suite.iter('testcase')]
+    suite.set('tests', str(len(outcomes)))
+    suite.set('failures', str(outcomes.count('failure')))
+    suite.set('errors', str(outcomes.count('error')))
+    suite.set('skipped', str(outcomes.count('skipped')))
@@ -4,11 +4,16 @@
 # license information.
 # -----------------------------------------------------------------------------
 
+import configparser
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 from knack.util import CLIError
 
-from azdev.operations.testtool.profile_context import ProfileContext
+from azdev.operations.testtool.profile_context import ProfileContext, current_profile
 
 
 class TestProfileContext(unittest.TestCase):
@@ -31,3 +36,50 @@ class TestProfileContext(unittest.TestCase):
         with self.assertRaises(Exception):
             with ProfileContext('latest'):
                 raise Exception('inner Exception')
+
+
+class TestIsolatedProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.clouds_config_path = os.path.join(self.config_dir, 'clouds.config')
+        with open(os.path.join(self.config_dir, 'config'), 'w') as f:
+            f.write('[cloud]\nname = AzureCloud\n')
+        with open(self.clouds_config_path, 'w') as f:
+            f.write('[AzureCloud]\nprofile = latest\n')
+        self.env_patch = mock.patch.dict(os.environ, {'AZURE_CONFIG_DIR': self.config_dir})
+        self.env_patch.start()
+
+    def tearDown(self):
+        self.env_patch.stop()
+        shutil.rmtree(self.config_dir)
+
+    def test_current_profile(self):
+        self.assertEqual(current_profile(), 'latest')
+
+    def test_isolated_config_dir(self):
+        with ProfileContext('2020-09-01-hybrid') as ctx:
+            isolated_dir = ctx.env['AZURE_CONFIG_DIR']
+            self.assertNotEqual(isolated_dir, self.config_dir)
+            clouds_config = configparser.ConfigParser()
+            clouds_config.read(os.path.join(isolated_dir, 'clouds.config'))
+            self.assertEqual(clouds_config.get('AzureCloud', 'profile'), '2020-09-01-hybrid')
+            self.assertTrue(os.path.isfile(os.path.join(isolated_dir, 'config')))
+
+        # the user's configuration is left untouched and the isolated one is removed
+        self.assertEqual(current_profile(), 'latest')
+        self.assertEqual(os.environ['AZURE_CONFIG_DIR'], self.config_dir)
+        self.assertFalse(os.path.exists(isolated_dir))
+
+    def test_current_profile_is_not_isolated(self):
+        with ProfileContext('latest') as ctx:
+            self.assertEqual(ctx.env['AZURE_CONFIG_DIR'], self.config_dir)
+
+    def test_current_profile_isolated(self):
+        with ProfileContext('latest', isolated=True) as ctx:
+            isolated_dir = ctx.env['AZURE_CONFIG_DIR']
+            self.assertNotEqual(isolated_dir, self.config_dir)
+            clouds_config = configparser.ConfigParser()
+            clouds_config.read(os.path.join(isolated_dir, 'clouds.config'))
+            self.assertEqual(clouds_config.get('AzureCloud', 'profile'), 'latest')
+        self.assertFalse(os.path.exists(isolated_dir))
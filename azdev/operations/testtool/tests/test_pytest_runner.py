@@ -0,0 +1,210 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+from pathlib import PurePosixPath
+from unittest import mock
+
+from azdev.operations.testtool import pytest_plugin
+from azdev.operations.testtool.pytest_runner import get_test_runner, get_worker_count, get_preload_modules
+
+
+class TestWorkerCount(unittest.TestCase):
+
+    def test_no_memory_limit(self):
+        self.assertEqual(get_worker_count(), 'auto')
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_memory_limit(self, _):
+        with mock.patch('azdev.operations.testtool.pytest_runner._get_available_memory',
+                        return_value=3 * 1024 * 1024 * 1024):
+            self.assertEqual(get_worker_count(1024), 3)
+            self.assertEqual(get_worker_count(512), 6)
+            self.assertEqual(get_worker_count(256), 8)
+            self.assertEqual(get_worker_count(4096), 1)
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_unknown_memory(self, _):
+        with mock.patch('azdev.operations.testtool.pytest_runner._get_available_memory', return_value=None):
+            self.assertEqual(get_worker_count(1024), 8)
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_concurrent_runs(self, _):
+        self.assertEqual(get_worker_count(concurrent_runs=3), 2)
+        with mock.patch('azdev.operations.testtool.pytest_runner._get_available_memory',
+                        return_value=3 * 1024 * 1024 * 1024):
+            self.assertEqual(get_worker_count(512, concurrent_runs=2), 3)
+
+
+class TestRunnerArguments(unittest.TestCase):
+
+    def test_parallel_with_durations(self):
+        runner = get_test_runner(parallel=True, log_path='results.xml', last_failed=False, no_exit_first=False,
+                                 mark=None, durations_path='durations.json')
+        with mock.patch('azdev.operations.testtool.pytest_runner.call', return_value=0) as call:
+            runner(test_paths=['tests'], pytest_args=None)
+        command = call.call_args[0][0]
+        self.assertIn('-n auto --dist load --azdev-longest-first', command)
+        self.assertIn('-p {} --azdev-durations durations.json'.format(pytest_plugin.__name__), command)
+
+    def test_in_series(self):
+        runner = get_test_runner(parallel=False, log_path='results.xml', last_failed=False, no_exit_first=False,
+                                 mark=None, durations_path='durations.json')
+        with mock.patch('azdev.operations.testtool.pytest_runner.call', return_value=0) as call:
+            runner(test_paths=['tests'], pytest_args=None)
+        command = call.call_args[0][0]
+        self.assertNotIn('-n ', command)
+        self.assertNotIn('--azdev-longest-first', command)
+
+    def test_warm_workers(self):
+        runner = get_test_runner(parallel=True, log_path='results.xml', last_failed=False, no_exit_first=False,
+                                 mark=None, preload_modules=['azure.cli.core', 'azext_foo'])
+        with mock.patch('azdev.operations.testtool.pytest_runner.call', return_value=0) as call:
+            runner(test_paths=['tests'], pytest_args=None)
+        command = call.call_args[0][0]
+        self.assertIn('-p {} --azdev-preload azure.cli.core,azext_foo'.format(pytest_plugin.__name__), command)
+
+
+class TestPreloadModules(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for path, content in (('azext_broken/__init__.py', 'raise RuntimeError("broken")'),
+                              ('azext_ok/__init__.py', ''), ('azext_ok/commands.py', ''),
+                              ('azext_ok/custom.py', '')):
+            os.makedirs(os.path.dirname(os.path.join(self.temp_dir, path)), exist_ok=True)
+            with open(os.path.join(self.temp_dir, path), 'w') as f:
+                f.write(content)
+        sys.path.insert(0, self.temp_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.temp_dir)
+        for name in [n for n in sys.modules if n.startswith(('azext_broken', 'azext_ok'))]:
+            del sys.modules[name]
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_preload_modules(self):
+        test_paths = [
+            '/cli/src/azure-cli/azure/cli/command_modules/vm/tests/latest',
+            '/cli/src/azure-cli/azure/cli/command_modules/vm/tests/latest/test_vm.py::VMTest::test_vm',
+            '/ext/src/containerapp/azext_containerapp/tests/latest/test_containerapp.py',
+            '/cli/src/azure-cli-core/azure/cli/core/tests/test_help.py',
+        ]
+        self.assertEqual(get_preload_modules(test_paths),
+                         ['azure.cli.core', 'azure.cli.testsdk', 'azure.cli.command_modules.vm', 'azext_containerapp'])
+
+    def test_preload_modules(self):
+        with mock.patch('gc.freeze', create=True), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            pytest_plugin.preload_modules(['azext_broken', 'azext_ok'])
+        self.assertEqual(len(caught), 1)
+        self.assertIn('unable to preload azext_broken: broken', str(caught[0].message))
+        self.assertIn('azext_ok.commands', sys.modules)
+        self.assertNotIn('azext_ok.custom', sys.modules)
+
+
+class TestLongestFirst(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.durations_path = os.path.join(self.temp_dir, 'durations.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _config(self):
+        options = {'azdev_durations': self.durations_path, 'azdev_longest_first': True}
+        return mock.MagicMock(rootpath=PurePosixPath('/repo'), getoption=options.get)
+
+    def test_save_merges_history(self):
+        pytest_plugin.update_json(self.durations_path, {'a': 1.0, 'b': 2.0})
+        pytest_plugin.update_json(self.durations_path, {'b': 3.0})
+        self.assertEqual(pytest_plugin.load_json(self.durations_path), {'a': 1.0, 'b': 3.0})
+
+    def test_sort_longest_first(self):
+        pytest_plugin.update_json(self.durations_path, {
+            '/repo/test_a.py::A::test_fast': 1.0,
+            '/repo/test_a.py::A::test_slow': 30.0,
+            '/repo/test_b.py::B::test_medium': 5.0,
+        })
+        items = [mock.MagicMock(nodeid=nodeid) for nodeid in
+                 ['test_a.py::A::test_fast', 'test_a.py::A::test_new', 'test_a.py::A::test_slow',
+                  'test_b.py::B::test_medium']]
+        pytest_plugin.pytest_collection_modifyitems(self._config(), items)
+        # the new test is assumed to take the average time of 12s
+        self.assertEqual([item.nodeid for item in items],
+                         ['test_a.py::A::test_slow', 'test_a.py::A::test_new', 'test_b.py::B::test_medium',
+                          'test_a.py::A::test_fast'])
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_dir = os.path.join(self.temp_dir, 'mod', 'tests', 'latest')
+        os.makedirs(os.path.join(self.test_dir, 'recordings'))
+        self._write(os.path.join(self.temp_dir, 'mod', 'custom.py'), 'x = 1')
+        self._write(os.path.join(self.test_dir, 'test_mod.py'), 'def test_a(): pass')
+        self._write(os.path.join(self.test_dir, 'recordings', 'test_a.yaml'), 'interactions: []')
+        self.nodeid = 'mod/tests/latest/test_mod.py::test_a'
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _write(path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _config(self, workerinput=None):
+        config = mock.MagicMock(rootpath=PurePosixPath(self.temp_dir), args=[])
+        if workerinput is None:
+            del config.workerinput
+        else:
+            config.workerinput = workerinput
+        return config
+
+    def _key(self):
+        return pytest_plugin.ResultCache(self._config(), os.path.join(self.temp_dir, 'cache.json')).key(self.nodeid)
+
+    def test_key_is_stable(self):
+        self.assertEqual(self._key(), self._key())
+
+    def test_key_changes_with_sources(self):
+        key = self._key()
+        self._write(os.path.join(self.test_dir, 'recordings', 'test_a.yaml'), 'interactions: [1]')
+        recording_key = self._key()
+        self.assertNotEqual(key, recording_key)
+        self._write(os.path.join(self.temp_dir, 'mod', 'custom.py'), 'x = 2')
+        self.assertNotEqual(recording_key, self._key())
+
+    def test_key_ignores_other_tests(self):
+        key = self._key()
+        self._write(os.path.join(self.test_dir, 'recordings', 'test_b.yaml'), 'interactions: [1]')
+        self.assertEqual(key, self._key())
+
+    def test_workers_reuse_controller_hashes(self):
+        config = self._config()
+        config.args = [os.path.join(self.test_dir, 'test_mod.py::test_a')]
+        controller = pytest_plugin.ResultCache(config, os.path.join(self.temp_dir, 'cache.json'))
+        self.assertIn(os.path.join(self.temp_dir, 'mod'), controller._tree_hashes)  # pylint: disable=protected-access
+
+        node = mock.MagicMock(workerinput={})
+        controller.pytest_configure_node(node)
+        with mock.patch.object(pytest_plugin, '_hash_source_tree') as hash_source_tree:
+            worker = pytest_plugin.ResultCache(self._config(node.workerinput),
+                                               os.path.join(self.temp_dir, 'cache.json'))
+            self.assertEqual(worker.key(self.nodeid), controller.key(self.nodeid))
+        hash_source_tree.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
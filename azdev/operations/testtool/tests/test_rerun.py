@@ -0,0 +1,75 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from azdev.operations.testtool.rerun import get_failed_tests, to_node_id, merge_results
+
+RESULTS = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="1" failures="2" skipped="0" tests="4">
+<testcase classname="mod.tests.latest.test_mod.ModTest" name="test_pass" />
+<testcase classname="mod.tests.latest.test_mod.ModTest" name="test_flaky"><failure message="timeout" /></testcase>
+<testcase classname="mod.tests.latest.test_mod.ModTest" name="test_broken"><failure message="assert" /></testcase>
+<testcase classname="mod.tests.latest.test_mod" name="test_error"><error message="fixture" /></testcase>
+</testsuite></testsuites>
+"""
+
+RETRY_RESULTS = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="0" failures="1" skipped="0" tests="3">
+<testcase classname="mod.tests.latest.test_mod.ModTest" name="test_flaky" />
+<testcase classname="mod.tests.latest.test_mod.ModTest" name="test_broken"><failure message="assert" /></testcase>
+<testcase classname="mod.tests.latest.test_mod" name="test_error" />
+</testsuite></testsuites>
+"""
+
+
+class TestRerun(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_dir = os.path.join(self.temp_dir, 'mod', 'tests', 'latest')
+        os.makedirs(self.test_dir)
+        self.test_file = os.path.join(self.test_dir, 'test_mod.py')
+        self.xml_path = os.path.join(self.temp_dir, 'results.xml')
+        self.retry_xml_path = os.path.join(self.temp_dir, 'results_retry1.xml')
+        for path, content in [(self.test_file, ''), (self.xml_path, RESULTS), (self.retry_xml_path, RETRY_RESULTS)]:
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_failed_tests(self):
+        self.assertEqual(get_failed_tests(self.xml_path), [
+            ('mod.tests.latest.test_mod.ModTest', 'test_flaky'),
+            ('mod.tests.latest.test_mod.ModTest', 'test_broken'),
+            ('mod.tests.latest.test_mod', 'test_error'),
+        ])
+
+    def test_to_node_id(self):
+        test_paths = [self.test_dir]
+        self.assertEqual(to_node_id('mod.tests.latest.test_mod.ModTest', 'test_flaky', test_paths),
+                         (self.temp_dir, '{}::ModTest::test_flaky'.format(self.test_file)))
+        self.assertEqual(to_node_id('test_mod', 'test_error', test_paths),
+                         (self.test_dir, '{}::test_error'.format(self.test_file)))
+        self.assertEqual(to_node_id('other.test_other', 'test_error', test_paths), (None, None))
+
+    def test_merge_results(self):
+        flaky, failed = merge_results(self.xml_path, [self.retry_xml_path])
+        self.assertEqual(flaky, ['mod.tests.latest.test_mod.ModTest::test_flaky',
+                                 'mod.tests.latest.test_mod::test_error'])
+        self.assertEqual(failed, ['mod.tests.latest.test_mod.ModTest::test_broken'])
+
+        suite = ET.parse(self.xml_path).getroot().find('testsuite')
+        self.assertEqual(suite.get('tests'), '4')
+        self.assertEqual(suite.get('failures'), '1')
+        self.assertEqual(suite.get('errors'), '0')
+        self.assertEqual([testcase.get('name') for testcase in suite.iter('testcase')],
+                         ['test_pass', 'test_flaky', 'test_broken', 'test_error'])
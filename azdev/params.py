@@ -12,6 +12,7 @@ from knack.arguments import ArgumentsContext, CLIArgumentType
 from azdev.completer import get_test_completion
 from azdev.operations.linter import linter_severity_choices
 from azdev.operations.command_change import diff_export_format_choices
+from azdev.operations.testtool.profile_context import SUPPORTED_PROFILES
 
 
 class Flag:
@@ -44,13 +45,17 @@ def load_arguments(self, _):
         c.argument('discover', options_list='--discover', action='store_true', help='Build an index of test names so that you don\'t need to specify fully qualified test paths.')
         c.argument('xml_path', options_list='--xml-path', help='Path and filename at which to store the results in XML format. If omitted, the file will be saved as `test_results.xml` in your `.azdev` directory.')
         c.argument('in_series', options_list='--series', action='store_true', help='Disable test parallelization.')
+        c.argument('worker_memory', options_list='--worker-memory', type=int, help='Memory (MB) expected to be used by each parallel test worker. If provided, the number of workers is capped so that they fit in the available memory.')
+        c.argument('warm_workers', options_list='--warm-workers', action='store_true', help='Import azure.cli.core, azure.cli.testsdk and the target modules once in each long-lived test worker, so that every forked test starts warm instead of importing them again.')
+        c.argument('retries', options_list='--retries', type=int, help='Number of times to re-run the failed tests, with fewer parallel workers. Implies --no-exitfirst. The outcomes are merged into the XML results and flaky tests are reported separately from real failures.')
+        c.argument('no_result_cache', options_list='--no-result-cache', action='store_true', help='Run all selected tests. By default, tests which passed before with the same test file, recording, module source and CLI version are skipped and reported as cached.')
         c.argument('run_live', options_list='--live', action='store_true', help='Run all tests live.')
 
         c.positional('tests', nargs='*',
                      help="Space-separated list of tests to run. Can specify module or extension names, test filenames, class name or individual method names. "
                           "Omit to check all or use 'CLI' or 'EXT' to check only CLI modules or extensions respectively.",
                      completer=get_test_completion)
-        c.argument('profile', options_list='--profile', choices=['latest', '2017-03-09-profile', '2018-03-01-hybrid', '2019-03-01-hybrid', '2020-09-01-hybrid'], help='Run automation against a specific profile. If omit, the tests will run against current profile.')
+        c.argument('profile', options_list='--profile', help='Comma-separated list of profiles to run automation against. Several profiles run concurrently, each in its own temporary Azure CLI configuration. If omit, the tests will run against current profile. Allowed values: {}.'.format(', '.join(SUPPORTED_PROFILES)))
         c.argument('pytest_args', nargs=argparse.REMAINDER, options_list=['--pytest-args', '-a'], help='Denotes the remaining args will be passed to pytest.')
         c.argument('last_failed', options_list='--lf', action='store_true', help='Re-run the last tests that failed.')
         c.argument('no_exit_first', options_list='--no-exitfirst', action='store_true', help='Do not exit on first error or failed test')
@@ -71,6 +76,13 @@ def load_arguments(self, _):
         c.positional('modules', modules_type)
         c.argument('pylint', action='store_true', help='Run pylint.')
         c.argument('pep8', action='store_true', help='Run flake8 to check PEP8.')
+        c.argument('jobs', options_list=['--jobs', '-j'], type=int,
+                   help='Number of processes to share between the pylint and flake8 shards, which run concurrently. '
+                        'Modules are split into shards balanced by their recorded check time or number of files. '
+                        'Defaults to the number of CPUs.')
+        c.argument('no_cache', action='store_true',
+                   help='Check all files instead of reusing the results of the files which did not change since they '
+                        'were last checked with the same tool version and config file.')
 
     with ArgumentsContext(self, 'cli check-versions') as c:
         c.argument('update', action='store_true', help='If provided, the command will update the versions in azure-cli\'s setup.py file.')
@@ -124,7 +136,10 @@ def load_arguments(self, _):
                        help='Path for the file you want to save the result in. '
                             'If specified, --save-scan-result will be True anyway. '
                             'If not speficied but set --save-scan-result to True, '
-                            'the file will be saved as `scan_result_YYYYmmddHHMMSS.json` in your `.azdev` directory ')
+                            'the file will be saved as `scan_result_YYYYmmddHHMMSS.ndjson` in your `.azdev` directory. '
+                            'With a `.ndjson` or `.jsonl` extension, the result of each file is written as one JSON line '
+                            'once the file is scanned. With any other extension, e.g. `.json`, all the results are '
+                            'held in memory and saved as a single JSON document.')
             c.argument('confidence_level', choices=['HIGH', 'MEDIUM', 'LOW'], default='HIGH',
                        help='Which confidence level can you accept for built-in scanning patterns. If you choose HIGH, '
                             'we will only scan with high confidence level patterns. If you choose MEDIUM, '
@@ -136,13 +151,38 @@ def load_arguments(self, _):
                        help='If not, the operation will terminate quickly on encountering file operation errors. '
                             'If true, the operation will warning the error for specific file and proceed with other files. '
                             'If not set the default value is false.')
+            c.argument('jobs', options_list=['--jobs', '-j'], type=int,
+                       help='Number of processes to scan the files with. Idle processes take the next few files, '
+                            'so large files do not hold up the others. Defaults to scanning in this process.')
+            c.argument('no_cache', action='store_true',
+                       help='Scan all the contents, instead of reusing the results of the contents scanned before '
+                            'with the same patterns, cached in the `secret_scan_cache` of your `.azdev` directory.')
+            c.argument('large_file_size', type=int,
+                       help='Size in MB above which files are scanned in overlapping chunks instead of being read '
+                            'at once. Defaults to 32.')
+
+    with ArgumentsContext(self, 'scan') as c:
+        c.argument('prefilter_stats', action='store_true',
+                   help='Report how many files contain a literal required by some pattern, e.g. `AzCa`, and so are '
+                        'scanned with more than the patterns without any such literal.')
+        c.argument('staged', action='store_true', arg_group='Git',
+                   help='Scan the files staged in the index of --repo, e.g. in a pre-commit hook.')
+        c.argument('added_only', action='store_true', arg_group='Git',
+                   help='Only scan the lines added between --tgt and --src, or staged with --staged.')
+        c.argument('git_history', arg_group='Git History',
+                   help='Path of a git repo whose history to scan. Each distinct blob added by a commit on any ref is '
+                        'scanned once, and the secrets are reported for each commit and path which added it, with '
+                        'their line. Merge commits are not diffed.')
+        c.argument('since', arg_group='Git History',
+                   help='Only scan the commits which are not reachable from this ref, e.g. a release tag.')
 
     with ArgumentsContext(self, 'mask') as c:
         c.argument('yes', options_list=['--yes', '-y'], action='store_true', help='Answer "yes" to all prompts.')
         c.argument('redaction_type', options_list=['--redaction-type', '--type'],
                    choices=['FIXED_VALUE', 'FIXED_LENGTH', 'SECRET_NAME', 'CUSTOM'])
         c.argument('saved_scan_result_path', options_list=['--saved-scan-result-path', '--saved-result'],
-                   help='Path of the file you saved the scan result in')
+                   help='Path of the file you saved the scan result in. '
+                        'A `.ndjson` or `.jsonl` result is read one file at a time.')
     # endregion
 
     # region statistics
@@ -187,9 +227,48 @@ def load_arguments(self, _):
     with ArgumentsContext(self, 'perf') as c:
         c.argument('runs', type=int, help='Number of runs to average performance over.')
 
+    with ArgumentsContext(self, 'perf load-times') as c:
+        c.argument('import_time', action='store_true', help='Profile the full import tree of `az -h` with `python -X importtime` and attribute self and cumulative time to each command module and package.')
+        c.argument('top', type=int, help='With --import-time, show the N packages with the highest cumulative import time. 0 for all.')
+        c.argument('loaders', action='store_true', help='Time the command table and arguments loading of each command module and extension loader in-process, and check the cold command table load against per-module budgets.')
+        c.argument('warm_runs', type=int, help='With --loaders, number of warm loads following the cold one in each run.')
+        c.argument('budgets', help='With --loaders, YAML file of the budgets (ms) with `default`, `total` and per-module `modules` keys. Defaults to the budgets shipped with azdev.')
+
     with ArgumentsContext(self, 'perf benchmark') as c:
         c.positional('commands', nargs="*", help="Command prefix to run benchmark. Omit to check all commands with --help.")
         c.argument('top', type=int, help='Show N slowest commands. 0 for all.')
+        c.argument('concurrency', type=int, help='Number of runs executed at the same time. Concurrent runs compete for CPU and disk and skew each other.')
+        c.argument('warmup', type=int, help='Number of discarded runs executed before measuring each command.')
+        c.argument('time_budget', type=int, help='Time budget (seconds) of the whole benchmark. The commands not measured within it are skipped. 0 for no limit.')
+        c.argument('profile', action='store_true', help='Run each command once more under cProfile and a stack sampler, write its .pstats and collapsed stacks (for flamegraph.pl or speedscope) files and show its top cumulative functions.')
+        c.argument('profile_dir', help='With --profile, directory of the profile files. Defaults to perf_profiles in the azdev config directory.')
+        c.argument('phases', action='store_true', help='Instrument the commands to report the median time of each phase of their invocation: interpreter startup, import of azure.cli.core, command index, command table and arguments loading, parsing, execution and output.')
+
+    with ArgumentsContext(self, 'perf memory') as c:
+        c.positional('commands', nargs="*", help="Commands to measure. Omit to measure the load of the whole command table and all commands with --help.")
+        c.argument('trace', action='store_true', help='Trace the allocations of each command with tracemalloc in an additional run and report the modules holding the most memory.')
+        c.argument('top', type=int, help='With --trace, show the N modules holding the most memory. 0 for all.')
+
+    with ArgumentsContext(self, 'perf extension-load') as c:
+        c.argument('extensions', options_list=['--extensions', '-e'], nargs='+', help='Names of the dev extensions to measure. Omit to measure all the installed ones.')
+        c.argument('commands', nargs='+', help='Commands to time with and without each extension. The peak memory is measured for the first one. Default: "-h" "version".')
+
+    with ArgumentsContext(self, 'perf compare') as c:
+        c.argument('base', help='CLI commit (or prefix) or YYYY-MM-DD date of the baseline samples.')
+        c.argument('head', help='CLI commit (or prefix) or YYYY-MM-DD date of the samples to check. Defaults to the commit of the latest recorded samples.')
+        c.argument('kind', choices=['benchmark', 'load-time', 'memory'], help='Samples to compare: `azdev perf benchmark` command timings, `azdev perf load-times` module load times or `azdev perf memory` peak memory.')
+        c.argument('threshold', type=float, help='Minimum relative change of the median (e.g. 0.05 for 5%%) to report a regression.')
+        c.argument('alpha', type=float, help='Significance level of the Mann-Whitney U test.')
+
+    with ArgumentsContext(self, 'perf ab') as c:
+        c.positional('commands', nargs='+', help='Commands to benchmark, e.g. "version" "vm create -h".')
+        c.argument('base', help='Git ref of the azure-cli repo to compare against.')
+        c.argument('head', help='Git ref of the azure-cli repo to check.')
+        c.argument('warmup', type=int, help='Number of discarded rounds executed before measuring.')
+        c.argument('workspace', help='Directory of the worktrees and their virtual environments. Those of a commit are reused by later runs. Defaults to perf_ab in the azdev config directory.')
+        c.argument('threshold', type=float, help='Minimum relative change of the median (e.g. 0.05 for 5%%) to report a regression or improvement.')
+        c.argument('alpha', type=float, help='Significance level of the Mann-Whitney U test.')
+        c.argument('seed', type=int, help='Seed of the randomized order of the runs.')
 
     with ArgumentsContext(self, 'extension') as c:
         c.argument('dist_dir', help='Name of a directory in which to save the resulting WHL files.')
@@ -18,6 +18,27 @@ def performance_benchmark_data_transformer(result):
         item["Max"] = r["Max"]
         item["Media"] = r["Media"]
         item["Std"] = r["Std"]
+        item["P90"] = r["P90"]
+        item["P99"] = r["P99"]
+        item["CI95"] = r["CI95"]
+        for phase, duration in r.get("Phases", {}).items():
+            item[phase] = duration
+        output.append(item)
+
+    return output
+
+
+def performance_memory_data_transformer(result):
+    from collections import OrderedDict
+
+    output = []
+
+    for r in result:
+        item = OrderedDict()
+        item["Command"] = r["Command"]
+        item["Min (MB)"] = r["Min"]
+        item["Media (MB)"] = r["Media"]
+        item["Max (MB)"] = r["Max"]
         output.append(item)
 
     return output
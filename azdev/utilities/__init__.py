@@ -7,6 +7,7 @@
 from .config import (
     get_azure_config,
     get_azure_config_dir,
+    copy_azure_config_dir,
     get_azdev_config,
     get_azdev_config_dir,
 )
@@ -36,12 +37,16 @@ from .git_util import (
     diff_branches,
     filter_by_git_diff,
     diff_branch_file_patch,
-    diff_branches_detail
+    diff_branches_detail,
+    diff_branch_blobs,
+    get_history_blobs,
+    iter_blob_contents
 )
 from .path import (
     extract_module_name,
     find_file,
     find_files,
+    walk_files,
     make_dirs,
     get_env_path,
     get_azdev_repo_path,
@@ -56,6 +61,13 @@ from .tools import (
     require_virtual_env,
     require_azure_cli
 )
+from .tracing import (
+    span,
+    traced,
+    start_tracing,
+    stop_tracing,
+    write_trace
+)
 
 
 __all__ = [
@@ -75,6 +87,7 @@ __all__ = [
     'test_cmd',
     'get_env_path',
     'get_azure_config_dir',
+    'copy_azure_config_dir',
     'get_azure_config',
     'get_azdev_config_dir',
     'get_azdev_config',
@@ -86,6 +99,7 @@ __all__ = [
     'extract_module_name',
     'find_file',
     'find_files',
+    'walk_files',
     'make_dirs',
     'get_azdev_repo_path',
     'get_cli_repo_path',
@@ -96,5 +110,13 @@ __all__ = [
     'require_azure_cli',
     'diff_branches_detail',
     'diff_branch_file_patch',
+    'diff_branch_blobs',
+    'get_history_blobs',
+    'iter_blob_contents',
     'calc_selected_mod_names',
+    'span',
+    'traced',
+    'start_tracing',
+    'stop_tracing',
+    'write_trace',
 ]
@@ -5,6 +5,8 @@
 # -----------------------------------------------------------------------------
 
 import os
+import shutil
+import tempfile
 
 from knack.config import CLIConfig
 
@@ -21,7 +23,7 @@ def get_azdev_config_dir():
     """ Returns the user's .azdev directory. """
     from azdev.utilities import get_env_path
     env_name = None
-    _, env_name = os.path.splitdrive(get_env_path())
+    _, env_name = os.path.splitdrive(get_env_path() or '')
     azdev_dir = os.getenv('AZDEV_CONFIG_DIR', None) or os.path.expanduser(os.path.join('~', '.azdev'))
     if not env_name:
         return azdev_dir
@@ -31,3 +33,19 @@ def get_azdev_config_dir():
 def get_azure_config_dir():
     """ Returns the user's Azure directory. """
     return os.getenv('AZURE_CONFIG_DIR', None) or os.path.expanduser(os.path.join('~', '.azure'))
+
+
+def copy_azure_config_dir(prefix):
+    """ Copy the Azure CLI configuration files into a new temporary directory. Only the top-level files (config,
+    credentials, ...) are copied, not the logs, telemetry or extensions.
+
+    :returns: Path (str) to the temporary directory, to remove once done.
+    """
+    config_dir = tempfile.mkdtemp(prefix=prefix)
+    origin_dir = get_azure_config_dir()
+    if os.path.isdir(origin_dir):
+        for name in os.listdir(origin_dir):
+            path = os.path.join(origin_dir, name)
+            if os.path.isfile(path):
+                shutil.copy2(path, config_dir)
+    return config_dir
@@ -5,21 +5,29 @@
 # -----------------------------------------------------------------------------
 
 import os
+import re
 
 from knack.log import get_logger
 from knack.util import CLIError
 
+from .tracing import span
+
 logger = get_logger(__name__)
 
+# as git, blobs with a NUL byte in their first 8000 bytes are binary
+BINARY_CHECK_SIZE = 8000
+HUNK_HEADER_REGEX = re.compile(r'^@@ -\d+(?:,\d+)? \+(?P<start>\d+)(?:,(?P<count>\d+))? @@', re.MULTILINE)
+
 
-def filter_by_git_diff(selected_modules, git_source, git_target, git_repo):
+def filter_by_git_diff(selected_modules, git_source, git_target, git_repo, files_changed=None):
     if not any([git_source, git_target, git_repo]):
         return selected_modules
 
     if not all([git_target, git_repo]):
         raise CLIError('usage error: [--src NAME]  --tgt NAME --repo PATH')
 
-    files_changed = diff_branches(git_repo, git_target, git_source)
+    if files_changed is None:
+        files_changed = diff_branches(git_repo, git_target, git_source)
     mods_changed = summarize_changed_mods(files_changed)
 
     repo_path = str(os.path.abspath(git_repo)).lower()
@@ -89,7 +97,8 @@ def diff_branches(repo, target, source):
     logger.info('cd %s', repo)
     logger.info('git --no-pager diff %s..%s --name-only -- .\n', target_commit, source_commit)
 
-    diff_index = target_commit.diff(source_commit)
+    with span('git diff', 'git', target=str(target_commit), source=str(source_commit)):
+        diff_index = target_commit.diff(source_commit)
     return [diff.b_path for diff in diff_index]
 
 
@@ -125,7 +134,8 @@ def diff_branches_detail(repo, target, source):
     logger.info('cd %s', repo)
     logger.info('git --no-pager diff %s..%s --name-only -- .\n', target_commit, source_commit)
 
-    diff_index = target_commit.diff(source_commit)
+    with span('git diff', 'git', target=str(target_commit), source=str(source_commit)):
+        diff_index = target_commit.diff(source_commit)
     return diff_index
 
 
@@ -161,5 +171,150 @@ def diff_branch_file_patch(repo, target, source):
     logger.info('cd %s', repo)
     logger.info('git --no-pager diff %s..%s --name-only -- .\n', target_commit, source_commit)
 
-    diff_index = target_commit.diff(source_commit, create_patch=True)
+    with span('git diff', 'git', target=str(target_commit), source=str(source_commit)):
+        diff_index = target_commit.diff(source_commit, create_patch=True)
     return diff_index
+
+
+def _get_added_line_ranges(patch):
+    """ The (first line, line count) of the lines added by a patch without context lines. """
+    ranges = []
+    for match in HUNK_HEADER_REGEX.finditer(patch):
+        count = int(match.group('count')) if match.group('count') is not None else 1
+        if count:
+            ranges.append((int(match.group('start')), count))
+    return ranges
+
+
+def diff_branch_blobs(repo, target=None, source=None, staged=False, added_lines=False):
+    """ Returns the content of the files added or modified in a given repo between two branches, or staged in the
+        index, read from the git objects rather than the working tree.
+
+    :returns: A list of (absolute file path, content bytes, (first line, line count) ranges of the added lines if
+        `added_lines`, else None). Binary blobs are skipped.
+    """
+    try:
+        import git  # pylint: disable=unused-import,unused-variable
+        import git.exc as git_exc
+        import gitdb
+        from git.diff import Diffable
+    except ImportError as ex:
+        raise CLIError(ex)
+
+    from git import Repo
+    try:
+        git_repo = Repo(repo)
+    except (git_exc.NoSuchPathError, git_exc.InvalidGitRepositoryError):
+        raise CLIError('invalid git repo: {}'.format(repo))
+
+    def get_commit(branch):
+        try:
+            return git_repo.commit(branch)
+        except gitdb.exc.BadName:
+            raise CLIError('usage error, invalid branch: {}'.format(branch))
+
+    diff_options = {'create_patch': True, 'unified': 0} if added_lines else {}
+    if staged:
+        logger.info('git --no-pager diff --cached --name-only -- .\n')
+        with span('git diff', 'git', target='HEAD', source='index'):
+            diff_index = git_repo.head.commit.diff(Diffable.INDEX, **diff_options)
+    else:
+        source_commit = get_commit(source) if source else git_repo.head.commit
+        target_commit = get_commit(target)
+        logger.info('git --no-pager diff %s..%s --name-only -- .\n', target_commit, source_commit)
+        with span('git diff', 'git', target=str(target_commit), source=str(source_commit)):
+            diff_index = target_commit.diff(source_commit, **diff_options)
+
+    repo_path = os.path.abspath(git_repo.working_tree_dir)
+    blobs = []
+    with span('read blobs', 'git', files=len(diff_index)):
+        for diff in diff_index:
+            if diff.b_blob is None or diff.deleted_file:
+                continue
+            line_ranges = None
+            if added_lines:
+                patch = diff.diff.decode('utf-8', errors='replace') if isinstance(diff.diff, bytes) else diff.diff
+                line_ranges = _get_added_line_ranges(patch)
+                if not line_ranges:
+                    continue
+            content = diff.b_blob.data_stream.read()
+            if b'\0' in content[:BINARY_CHECK_SIZE]:
+                continue
+            path = os.path.normpath(os.path.join(repo_path, diff.b_path))
+            blobs.append((path, content, line_ranges))
+    return blobs
+
+
+def get_history_blobs(repo, since=None):
+    """ Returns the blobs added or modified by the commits of a given repo, on all refs or since a given ref.
+        Merge commits are not diffed.
+
+    :returns: An ordered dict of each blob sha to the (commit sha, path) where it was added, newest commits first.
+    """
+    import subprocess
+    command = ['git', 'log', '--all', '--raw', '--no-abbrev', '--no-renames', '--root', '-z', '--format=commit %H']
+    if since:
+        command += ['--not', since]
+    logger.info('cd %s', repo)
+    logger.info('%s\n', ' '.join(command))
+    try:
+        with span('git log', 'git', since=since):
+            output = subprocess.check_output(command, cwd=repo)
+    except (OSError, subprocess.CalledProcessError) as ex:
+        raise CLIError('unable to read the history of {}: {}'.format(repo, ex))
+
+    blobs = {}
+    commit = None
+    tokens = iter(output.decode('utf-8', errors='replace').split('\0'))
+    for token in tokens:
+        token = token.lstrip('\n')
+        if token.startswith('commit '):
+            commit = token[len('commit '):]
+        elif token.startswith(':'):
+            path = next(tokens, '')
+            _, new_mode, _, new_sha, status = token[1:].split(' ')
+            # deleted files and submodules
+            if status == 'D' or new_mode == '160000' or not new_sha.strip('0'):
+                continue
+            blobs.setdefault(new_sha, []).append((commit, path))
+    return blobs
+
+
+def iter_blob_contents(repo, shas):
+    """ Yields the (sha, content bytes) of the blobs of a given repo, streamed through a single
+        `git cat-file --batch` process. Missing blobs are skipped. """
+    import subprocess
+    import threading
+
+    def write_shas(stdin):
+        try:
+            for sha in shas:
+                stdin.write(sha.encode('ascii') + b'\n')
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    with subprocess.Popen(['git', 'cat-file', '--batch'], cwd=repo,
+                          stdin=subprocess.PIPE, stdout=subprocess.PIPE) as process:
+        # written while reading, so that neither pipe fills up
+        writer = threading.Thread(target=write_shas, args=(process.stdin,), daemon=True)
+        writer.start()
+        try:
+            while True:
+                header = process.stdout.readline()
+                if not header:
+                    break
+                parts = header.split()
+                if len(parts) < 3:
+                    logger.debug('skip blob: %s', header.decode('utf-8', errors='replace').strip())
+                    continue
+                content = process.stdout.read(int(parts[2]))
+                process.stdout.read(1)
+                yield parts[0].decode('ascii'), content
+        finally:
+            process.kill()
+            writer.join()
@@ -3,8 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for
 # license information.
 # -----------------------------------------------------------------------------
+import fnmatch
 import logging
 import os
+import re
 from glob import glob
 
 from knack.util import CLIError
@@ -16,8 +18,6 @@ logger = logging.getLogger(__name__)
 
 def extract_module_name(path):
 
-    import re
-
     _CORE_NAME_REGEX = re.compile(r'azure-cli-(?P<name>[^/\\]+)[/\\]azure[/\\]cli')
     _MOD_NAME_REGEX = re.compile(r'azure-cli[/\\]azure[/\\]cli[/\\]command_modules[/\\](?P<name>[^/\\]+)')
     _EXT_NAME_REGEX = re.compile(r'.*(?P<name>azext_[^/\\]+).*')
@@ -91,19 +91,193 @@ def find_file(file_name):
     return None
 
 
+# directories of version control systems, never searched
+VCS_DIRS = ('.git', '.hg', '.svn')
+
+
+def _compile_name_patterns(patterns):
+    """ One regex matching the names which match any of the fnmatch patterns, None if there is no pattern. """
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    return re.compile('|'.join(fnmatch.translate(os.path.normcase(pattern)) for pattern in patterns))
+
+
+def _translate_gitignore_pattern(pattern):
+    regex = ''
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith('**/', index):
+            regex += '(?:.*/)?'
+            index += 3
+            continue
+        if pattern.startswith('**', index):
+            regex += '.*'
+            index += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            regex += '[' + pattern[index + 1:end].replace('!', '^', 1).replace('\\', '\\\\') + ']'
+            index = end
+        elif char == '\\' and index + 1 < len(pattern):
+            index += 1
+            regex += re.escape(pattern[index])
+        else:
+            regex += re.escape(char)
+        index += 1
+    return regex
+
+
+def read_gitignore(directory):
+    """ The (regex, negated, directories only) rules of the .gitignore file of a directory. The regexes match paths
+    relative to the directory with `/` separators. """
+    try:
+        with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip(' ') if not line.endswith('\\ ') else line
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        line = line[1:] if negated else line
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # a pattern with a slash before its end is relative to the directory, else it matches at any depth
+        regex = _translate_gitignore_pattern(line.lstrip('/'))
+        if '/' not in line:
+            regex = '(?:.*/)?' + regex
+        rules.append((re.compile(regex + '$'), negated, dir_only))
+    return rules
+
+
+def _is_gitignored(gitignores, path, is_dir):
+    ignored = False
+    for directory, rules in gitignores:
+        relative_path = os.path.relpath(path, directory).replace(os.sep, '/')
+        for regex, negated, dir_only in rules:
+            if (is_dir or not dir_only) and regex.match(relative_path):
+                ignored = not negated
+    return ignored
+
+
+class _FileWalker:  # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, patterns=None, exclude_patterns=None, ignore_dirs=VCS_DIRS, use_gitignore=False,
+                 skip_virtual_envs=False, match_dirs=False, include_hidden=True, recursive=True):
+        self.patterns = _compile_name_patterns(patterns)
+        self.exclude_patterns = _compile_name_patterns(exclude_patterns)
+        self.ignore_dirs = _compile_name_patterns(ignore_dirs)
+        self.use_gitignore = use_gitignore
+        self.skip_virtual_envs = skip_virtual_envs
+        self.match_dirs = match_dirs
+        self.include_hidden = include_hidden
+        self.recursive = recursive
+
+    def _is_match(self, name):
+        if not self.include_hidden and name.startswith('.'):
+            return False
+        name = os.path.normcase(name)
+        if self.patterns and not self.patterns.match(name):
+            return False
+        return not (self.exclude_patterns and self.exclude_patterns.match(name))
+
+    def _is_pruned(self, entry):
+        if entry.is_symlink() or (self.ignore_dirs and self.ignore_dirs.match(os.path.normcase(entry.name))):
+            return True
+        return self.skip_virtual_envs and os.path.isfile(os.path.join(entry.path, 'pyvenv.cfg'))
+
+    def scan(self, directory, gitignores=()):
+        """ List a directory.
+
+        :returns: The matching paths, and the (subdirectory, .gitignore rules) to descend into.
+        """
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError as ex:
+            logger.debug('Unable to list %s: %s', directory, ex)
+            return [], []
+        if self.use_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            gitignores = tuple(gitignores) + ((directory, read_gitignore(directory)),)
+        matched, subdirectories = [], []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if gitignores and _is_gitignored(gitignores, entry.path, is_dir):
+                continue
+            if (not is_dir or self.match_dirs) and self._is_match(entry.name):
+                matched.append(entry.path)
+            if is_dir and self.recursive and not self._is_pruned(entry):
+                subdirectories.append((entry.path, gitignores))
+        return matched, subdirectories
+
+    def walk(self, root_paths, jobs=None):
+        if isinstance(root_paths, str):
+            root_paths = [root_paths]
+        paths = []
+        if jobs and jobs > 1:
+            # breadth first, listing the directories of each level concurrently
+            from concurrent.futures import ThreadPoolExecutor
+            level = [(root_path, ()) for root_path in root_paths]
+            with ThreadPoolExecutor(jobs) as executor:
+                while level:
+                    results = list(executor.map(lambda args: self.scan(*args), level))
+                    level = []
+                    for matched, subdirectories in results:
+                        paths.extend(matched)
+                        level.extend(subdirectories)
+            return paths
+        # depth first, in the order of os.walk
+        pending = [(root_path, ()) for root_path in reversed(root_paths)]
+        while pending:
+            matched, subdirectories = self.scan(*pending.pop())
+            paths.extend(matched)
+            pending.extend(reversed(subdirectories))
+        return paths
+
+
+def walk_files(root_paths, patterns=None, exclude_patterns=None, ignore_dirs=VCS_DIRS, use_gitignore=False,
+               skip_virtual_envs=False, match_dirs=False, include_hidden=True, recursive=True, jobs=None):
+    """ Returns the paths of the files below the given directories whose name matches any of the patterns. The
+    ignored directories are pruned before descending into them, and symbolic links to directories are not followed.
+
+    :param patterns: The fnmatch patterns of the names to return, all files if None.
+    :param exclude_patterns: The fnmatch patterns of the names not to return.
+    :param ignore_dirs: The fnmatch patterns of the names of the directories not to descend into.
+    :param use_gitignore: Skip the files and directories ignored by the .gitignore files found on the way.
+    :param skip_virtual_envs: Do not descend into Python virtual environments.
+    :param match_dirs: Also return the directories whose name matches the patterns, as glob does.
+    :param include_hidden: Whether to return the names starting with a dot.
+    :param recursive: Whether to descend into the subdirectories.
+    :param jobs: The number of threads listing the directories of each level concurrently, breadth first.
+    :returns: Paths ([str]) of the matching files.
+    """
+    walker = _FileWalker(patterns, exclude_patterns=exclude_patterns, ignore_dirs=ignore_dirs,
+                         use_gitignore=use_gitignore, skip_virtual_envs=skip_virtual_envs, match_dirs=match_dirs,
+                         include_hidden=include_hidden, recursive=recursive)
+    return walker.walk(root_paths, jobs=jobs)
+
+
 def find_files(root_paths, file_pattern):
     """ Returns the paths to all files that match a given pattern.
 
     :returns: Paths ([str]) to files matching the given pattern.
     """
-    if isinstance(root_paths, str):
-        root_paths = [root_paths]
-    paths = []
-    for root_path in root_paths:
-        for path, _, _ in os.walk(root_path):
-            pattern = os.path.join(path, file_pattern)
-            paths.extend(glob(pattern))
-    return paths
+    # as glob, also match directories, e.g. `*.egg-info`, and skip hidden names unless the pattern starts with a dot
+    return walk_files(root_paths, file_pattern, match_dirs=True, include_hidden=file_pattern.startswith('.'))
 
 
 def make_dirs(path):
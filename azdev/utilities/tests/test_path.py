@@ -7,8 +7,10 @@
 
 import unittest
 import os
+import shutil
+import tempfile
 
-from azdev.utilities import get_path_table
+from azdev.utilities import find_files, get_path_table, walk_files
 
 
 class TestGetPathTable(unittest.TestCase):
@@ -48,5 +50,46 @@ class TestGetPathTable(unittest.TestCase):
             self.assertTrue(os.path.isdir(mod_path))
 
 
+class TestWalkFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for name in ['a.py', '.hidden.py', 'b.txt', 'pkg/c.py', 'pkg/build/d.py', 'pkg/keep/e.py',
+                     'pkg.egg-info/PKG-INFO', '.git/f.py', 'venv/pyvenv.cfg', 'venv/g.py', '__pycache__/h.py']:
+            path = self._path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('')
+        with open(self._path('pkg/.gitignore'), 'w') as f:
+            f.write('# comment\nbuild/\n*.py\n!c.py\n/keep/e.py\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir, *name.split('/'))
+
+    def _walk(self, **kwargs):
+        return sorted(os.path.relpath(path, self.temp_dir).replace(os.sep, '/')
+                      for path in walk_files(self.temp_dir, **kwargs))
+
+    def test_walk_files(self):
+        self.assertEqual(self._walk(patterns='*.py'),
+                         ['.hidden.py', '__pycache__/h.py', 'a.py', 'pkg/build/d.py', 'pkg/c.py', 'pkg/keep/e.py',
+                          'venv/g.py'])
+        self.assertEqual(self._walk(patterns=['*.py', '*.txt'], exclude_patterns='.*', recursive=False),
+                         ['a.py', 'b.txt'])
+        self.assertEqual(self._walk(patterns='*.py', ignore_dirs=['.git', '__pycache__'], use_gitignore=True,
+                                    skip_virtual_envs=True, include_hidden=False),
+                         ['a.py', 'pkg/c.py'])
+        self.assertEqual(self._walk(patterns='*.py', jobs=4), self._walk(patterns='*.py'))
+
+    def test_find_files(self):
+        self.assertEqual(find_files(self.temp_dir, '*.egg-info'), [self._path('pkg.egg-info')])
+        self.assertEqual(find_files(self.temp_dir, 'c.py'), [self._path('pkg/c.py')])
+        self.assertEqual(find_files(self.temp_dir, '.hidden.py'), [self._path('.hidden.py')])
+        self.assertNotIn(self._path('.hidden.py'), find_files(self.temp_dir, '*.py'))
+
+
 if __name__ == '__main__':
     unittest.main()
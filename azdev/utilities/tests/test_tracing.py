@@ -0,0 +1,78 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import unittest
+
+from azdev.__main__ import _get_trace_out
+from azdev.utilities import span, traced, start_tracing, stop_tracing, write_trace
+
+
+class TestTracing(unittest.TestCase):
+
+    def tearDown(self):
+        stop_tracing()
+
+    def test_span_disabled(self):
+        with span('ignored'):
+            pass
+        self.assertEqual(stop_tracing(), [])
+
+    def test_span_events(self):
+        start_tracing()
+        with span('outer', 'test', path='a.py'):
+            with self.assertRaises(ValueError):
+                with span('inner'):
+                    raise ValueError()
+        events = stop_tracing()
+
+        self.assertEqual(len(events), 2)
+        inner, outer = events[0], events[1]
+        self.assertEqual(outer['name'], 'outer')
+        self.assertEqual(outer['cat'], 'test')
+        self.assertEqual(outer['ph'], 'X')
+        self.assertEqual(outer['args'], {'path': 'a.py'})
+        self.assertEqual(inner['args'], {'error': 'ValueError'})
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['dur'], inner['dur'])
+
+    def test_traced(self):
+        @traced(category='test')
+        def _add(a, b):
+            return a + b
+
+        start_tracing()
+        self.assertEqual(_add(1, 2), 3)
+        events = stop_tracing()
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0]['name'].endswith('_add'))
+        self.assertEqual(events[0]['cat'], 'test')
+
+    def test_write_trace(self):
+        start_tracing()
+        with span('write'):
+            pass
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            write_trace(path, stop_tracing())
+            with open(path) as f:
+                trace = json.load(f)
+        finally:
+            os.remove(path)
+        self.assertEqual([event['name'] for event in trace['traceEvents']], ['write'])
+
+    def test_get_trace_out(self):
+        self.assertEqual(_get_trace_out(['style', '--trace-out', 'out.json']), 'out.json')
+        self.assertEqual(_get_trace_out(['style', '--trace-out=out.json', '--pylint']), 'out.json')
+        self.assertIsNone(_get_trace_out(['style', '--trace-out']))
+        self.assertIsNone(_get_trace_out(['style']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# -----------------------------------------------------------------------------
+
+"""Lightweight spans recorded in the Chrome trace event format, viewable in Perfetto or chrome://tracing.
+
+Spans are only recorded once `start_tracing` was called, e.g. by the global `--trace-out` argument. Otherwise a span
+costs a global lookup on enter and exit.
+"""
+
+import functools
+import json
+import os
+import threading
+import timeit
+
+_events = None
+
+
+def start_tracing():
+    global _events  # pylint: disable=global-statement
+    _events = []
+
+
+def stop_tracing():
+    """ Stop recording and return the recorded trace events. """
+    global _events  # pylint: disable=global-statement
+    events, _events = _events or [], None
+    return events
+
+
+def is_tracing():
+    return _events is not None
+
+
+def write_trace(path, events):
+    """ Write the events as a Chrome trace file. """
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+class span:  # pylint: disable=invalid-name
+    """ Record the duration of a block as a complete trace event.
+
+    with span('load command table', 'linter', modules=3):
+        ...
+    """
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category='azdev', **args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        if _events is not None:
+            self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if _events is not None and self.start is not None:
+            end = timeit.default_timer()
+            event = {
+                'name': self.name,
+                'cat': self.category,
+                'ph': 'X',
+                'ts': self.start * 1e6,
+                'dur': (end - self.start) * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+            }
+            if self.args or exc_type:
+                event['args'] = dict(self.args, error=exc_type.__name__) if exc_type else self.args
+            _events.append(event)
+        return False
+
+
+def traced(name=None, category='azdev'):
+    """ Decorator recording each call of the function as a span. """
+    def _decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with span(span_name, category):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
@@ -64,6 +64,7 @@ setup(
         'azdev.operations.command_change',
         'azdev.operations.breaking_change',
         'azdev.operations.cmdcov',
+        'azdev.operations.performance',
         'azdev.utilities',
     ],
     install_requires=[
@@ -95,6 +96,7 @@ setup(
         'azdev.operations.linter.rules': ['ci_exclusions.yml'],
         'azdev.operations.linter': ["data/*"],
         'azdev.operations.cmdcov': ['*.*'],
+        'azdev.operations.performance': ['load_budgets.yml'],
         'azdev.operations.breaking_change': ['*.*'],
     },
     include_package_data=True,